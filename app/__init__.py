@@ -1,5 +0,0 @@
-from .api import *
-from .core import *
-from .models import *
-from .services import *
-from .tests import *
\ No newline at end of file
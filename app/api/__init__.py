@@ -1 +1,6 @@
-from .endpoints import *
\ No newline at end of file
+def __getattr__(name):
+    # The router (and the services behind it) load on first access
+    if name == "router":
+        from .endpoints import router
+        return router
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
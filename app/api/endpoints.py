@@ -1,57 +1,170 @@
-from fastapi import APIRouter, HTTPException
-import psutil
+import asyncio
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, WebSocket, WebSocketDisconnect
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 from app.services.database import db
-from app.services.websocket import binance_ws
+from app.services import websocket as exchange_feed
+from app.services.broadcast import broadcaster, split_param, sse_events, Message
+from app.services.diagnostics import authorized, format_collapsed, loop_monitor, profile_loop
+from app.services.startup import startup
+from app.services.history import COLLECTIONS, FORMATS, MEDIA_TYPES, export, parse_fields, primed
+from app.services.repository import decode_cursor
 from app.core.config import settings
-from fastapi.responses import PlainTextResponse
+from app.core.metrics import SYSTEM_REGISTRY
+from app.core.serialization import dumps
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 
 router = APIRouter()
 
+def storage_ready():
+    # The API serves while startup runs; routes reading storage wait for it
+    if not startup.done("storage"):
+        raise HTTPException(status_code=503, detail="Storage is not ready")
+
 @router.get("/health")
 async def health_check():
-    if not binance_ws.is_healthy():
+    if startup.failed:
+        raise HTTPException(status_code=503, detail="Startup failed")
+    # Strategy workers have no exchange connection of their own
+    if settings.SERVICE_ROLE != "worker" and not exchange_feed.binance_ws.is_healthy():
         raise HTTPException(status_code=503, detail="WebSocket connection is down")
     return {"status": "healthy"}
 
+@router.get("/ready")
+async def readiness():
+    # 200 once storage, the bus and backfill are up; the stages either way
+    snapshot = startup.snapshot()
+    return JSONResponse(snapshot, status_code=200 if snapshot["ready"] else 503)
+
 @router.get("/metrics/trading")
-async def trading_metrics():
-    collection = db.client[settings.DB_NAME]["trading_signals"]
-    total_signals = await collection.count_documents({})
-    
-    collection = db.client[settings.DB_NAME]["positions"]
-    total_positions = await collection.count_documents({})
-    closed_positions = await collection.count_documents({"status": "CLOSED"})
-    
-    cursor = collection.find({"status": "CLOSED"})
-    total_pnl = sum([position.get("pnl", 0) async for position in cursor])
-    
-    return {
-        "total_signals": total_signals,
-        "total_positions": total_positions,
-        "closed_positions": closed_positions,
-        "total_pnl": total_pnl
-    }
-
-@router.get("/metrics/system", response_class=PlainTextResponse)
+async def trading_metrics(symbol: Optional[str] = None):
+    return db.trading_stats(symbol)
+
+@router.get("/metrics/cache")
+async def cache_metrics():
+    return db.cache_stats()
+
+@router.get("/metrics")
+async def prometheus_metrics():
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+@router.get("/metrics/system")
 async def system_metrics():
-    metrics = []
-    
-    # CPU usage metric
-    cpu = psutil.cpu_percent()
-    metrics.append(f"# HELP cpu_usage_percent Current CPU usage percentage")
-    metrics.append(f"# TYPE cpu_usage_percent gauge")
-    metrics.append(f"cpu_usage_percent {cpu}")
-    
-    # Memory usage metric
-    memory = psutil.virtual_memory().percent
-    metrics.append(f"# HELP memory_usage_percent Current memory usage percentage")
-    metrics.append(f"# TYPE memory_usage_percent gauge")
-    metrics.append(f"memory_usage_percent {memory}")
-    
-    # Disk usage metric
-    disk = psutil.disk_usage('/').percent
-    metrics.append(f"# HELP disk_usage_percent Current disk usage percentage")
-    metrics.append(f"# TYPE disk_usage_percent gauge")
-    metrics.append(f"disk_usage_percent {disk}")
-    
-    return "\n".join(metrics) 
\ No newline at end of file
+    # Gauges are refreshed by the collector task in main.py
+    return Response(generate_latest(SYSTEM_REGISTRY), media_type=CONTENT_TYPE_LATEST)
+
+# Diagnostics, only with PROFILE_TOKEN set and sent as X-Admin-Token
+
+def require_admin(token: Optional[str]):
+    if not settings.PROFILE_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not authorized(token):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+@router.get("/debug/loop")
+async def loop_stalls(x_admin_token: Optional[str] = Header(None)):
+    # Recent stalls with the stack that blocked the loop
+    require_admin(x_admin_token)
+    return {"monitoring": loop_monitor.running, "stalls": list(loop_monitor.reports)}
+
+@router.get("/debug/profile")
+async def profile(
+    seconds: float = Query(10.0, gt=0),
+    hz: int = Query(100, ge=1, le=1000),
+    mode: str = Query("cpu", pattern="^(cpu|wall)$"),
+    threads: str = Query("loop", pattern="^(loop|all)$"),
+    x_admin_token: Optional[str] = Header(None)
+):
+    # Samples the running service: CPU time on the loop, or wall-clock time
+    # on the loop or every thread. The response is collapsed stacks for
+    # flamegraph.pl or speedscope.
+    require_admin(x_admin_token)
+    try:
+        counts = await profile_loop(seconds, hz, mode, all_threads=threads == "all")
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return Response(format_collapsed(counts), media_type="text/plain")
+
+# History: /history/{prices,signals,orders,positions}?symbol=&start=&end=&fields=
+# JSON pages carry a next_cursor to pass back as ?cursor=; format=ndjson or
+# arrow streams every row from the cursor on, gzipped when accepted
+
+@router.get("/history/{collection}", dependencies=[Depends(storage_ready)])
+async def history(
+    collection: str,
+    request: Request,
+    symbol: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(None, ge=1, le=settings.HISTORY_MAX_PAGE_SIZE),
+    fields: Optional[str] = None,
+    fmt: str = Query("json", alias="format")
+):
+    if collection not in COLLECTIONS:
+        raise HTTPException(status_code=404, detail=f"Unknown history collection: {collection}")
+    if fmt not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unknown format: {fmt}")
+    table, _ = COLLECTIONS[collection]
+    symbol = symbol.upper() if symbol else None
+    compress = "gzip" in request.headers.get("accept-encoding", "")
+    try:
+        fields = parse_fields(collection, split_param(fields))
+        if fmt == "json":
+            documents, next_cursor = await db.get_history(
+                table, symbol, start, end, cursor, limit or settings.HISTORY_PAGE_SIZE, fields
+            )
+            return Response(dumps({"data": documents, "next_cursor": next_cursor}), media_type=MEDIA_TYPES[fmt])
+        chunks = await primed(export(
+            db, collection, symbol, start, end, decode_cursor(cursor) if cursor else None, fields, fmt, compress
+        ))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    headers = {"Content-Encoding": "gzip", "Vary": "Accept-Encoding"} if compress else {}
+    return StreamingResponse(chunks, media_type=MEDIA_TYPES[fmt], headers=headers)
+
+# Live stream: ?topics=tick,signal,order&symbols=BTCUSDT,ETHUSDT, both
+# optional (everything by default)
+
+async def _send_stream(websocket: WebSocket, subscriber):
+    while True:
+        for message in await subscriber.get():
+            await websocket.send_text(message.text)
+
+@router.websocket("/ws/stream")
+async def stream_socket(websocket: WebSocket, topics: Optional[str] = None, symbols: Optional[str] = None):
+    try:
+        subscriber = broadcaster.subscribe(split_param(topics), split_param(symbols))
+    except ValueError as e:
+        await websocket.close(code=1008, reason=str(e))
+        return
+    await websocket.accept()
+    sender = asyncio.create_task(_send_stream(websocket, subscriber))
+    try:
+        while True:
+            # {"topics": [...], "symbols": [...]} changes the subscription;
+            # errors are queued so only the sender writes to the socket
+            try:
+                request = await websocket.receive_json()
+                broadcaster.update(subscriber, request.get("topics"), request.get("symbols"))
+            except (ValueError, AttributeError, TypeError) as e:
+                subscriber.offer(Message("error", None, dumps({"topic": "error", "error": str(e)})))
+    except WebSocketDisconnect:
+        pass
+    finally:
+        sender.cancel()
+        broadcaster.unsubscribe(subscriber)
+
+@router.get("/stream/sse")
+async def stream_events(topics: Optional[str] = None, symbols: Optional[str] = None):
+    topics, symbols = split_param(topics), split_param(symbols)
+    try:
+        broadcaster.check(topics)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return StreamingResponse(
+        sse_events(topics, symbols),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -1,24 +1,120 @@
 import os
+from typing import List
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
     # API Configuration
     API_V1_STR: str = "/api/v1"
     
+    # Storage: "mongo", "memory" (nothing persisted) or "sqlite" (local file in WAL mode)
+    STORAGE_BACKEND: str = "mongo"
+    SQLITE_PATH: str = "wstrade.db"
+    MEMORY_MAX_TICKS: int = 1_000_000  # Ticks kept per symbol by the memory backend
+    
     # MongoDB
     MONGODB_URI: str = os.getenv("MONGODB_URI", "mongodb://localhost:27017")
     DB_NAME: str = "algotrading"
+    PRICE_CACHE_DEPTH: int = 1000  # Recent prices kept in memory per symbol
+    QUERY_PLAN_CHECK: str = "warn"  # off, warn or fail when a hot query isn't indexed
+    PRICE_DATA_TIMESERIES: bool = True  # Create price_data as a time-series collection
+    PRICE_DATA_TTL_SECONDS: int = 7 * 24 * 3600  # Raw tick retention, 0 keeps them forever
+    ROLLUP_ENABLED: bool = True  # Compact raw ticks into 1m/1h OHLCV bars
+    ROLLUP_INTERVAL: float = 60.0  # seconds between rollup passes
+    ROLLUP_SETTLE_SECONDS: float = 30.0  # Buckets are rolled up this long after they close
+    
+    # Write-behind persistence
+    WRITE_BEHIND_ENABLED: bool = True
+    WRITE_BATCH_SIZE: int = 500
+    WRITE_FLUSH_INTERVAL: float = 0.5  # seconds
+    WRITE_QUEUE_MAXSIZE: int = 10000
+    WRITE_MAX_ATTEMPTS: int = 5  # per batch and collection, before documents are dropped
+    WRITE_RETRY_BACKOFF: float = 0.5  # seconds before the first retry, doubling after each
+    
+    # Trading metrics
+    METRICS_CACHE_TTL: float = 1.0  # seconds a /metrics/trading snapshot is reused
+    METRICS_RECONCILE_INTERVAL: float = 300.0  # seconds between Mongo reconciliations
     
     # Redis
     REDIS_URI: str = os.getenv("REDIS_URI", "redis://localhost:6379")
     
+    # Horizontal scaling: "standalone" ingests and trades in one process,
+    # "ingest" publishes ticks to Redis, "worker" runs strategies from Redis
+    SERVICE_ROLE: str = "standalone"
+    BUS_PARTITIONS: int = 8
+    BUS_CONSUMER_GROUP: str = "strategy-workers"
+    BUS_STREAM_MAXLEN: int = 100000
+    BUS_WINDOW_DEPTH: int = 1000  # Recent prices kept in Redis per symbol
+    BUS_CLAIM_IDLE_MS: int = 30000  # Reclaim ticks left unacked this long by a dead worker
+    BUS_LEASE_MS: int = 10000  # A worker's hold on a partition, renewed while it runs
+    
     # Binance
     TRADING_PAIR: str = "BTCUSDT"
+    TRADING_PAIRS: List[str] = ["BTCUSDT"]
     KLINE_INTERVAL: str = "1s"  # 1 second interval for real-time data
+    BINANCE_WS_URL: str = "wss://stream.binance.com:9443"
+    MAX_STREAMS_PER_CONNECTION: int = 1024  # Binance combined stream limit
+    
+    # Ingest workers
+    INGEST_WORKERS: int = 4
+    INGEST_QUEUE_MAXSIZE: int = 10000
+    INGEST_CONFLATE: bool = False  # Keep only the latest unclosed kline per symbol when behind
+    JSON_DECODER: str = "auto"  # auto, orjson, msgspec or json
+    JSON_ENCODER: str = "auto"  # Live stream messages: auto, orjson, msgspec or json
+    KLINE_CLOSED_ONLY: bool = False  # Persist/evaluate only closed klines, keyed by open time
+    KLINE_STORE_OHLCV: bool = False  # Persist full OHLCV fields with each kline
+    
+    # Backfill of klines missed while down or disconnected
+    BACKFILL_ENABLED: bool = True
+    BACKFILL_KLINES: int = 1000  # Klines loaded per symbol at startup
+    BACKFILL_ARCHIVE_PATH: str = ""  # Directory of Binance kline dumps, tried before REST
+    BACKFILL_REST_ENABLED: bool = True
+    BACKFILL_CONCURRENCY: int = 4  # Symbols fetched at once
+    BACKFILL_REQUESTS_PER_SECOND: float = 10.0  # Well under Binance's REST weight limit
+    
+    # Live push of ticks, signals and orders on /ws/stream and /stream/sse
+    STREAM_QUEUE_SIZE: int = 256  # Messages buffered per client before the oldest are dropped
+    STREAM_HEARTBEAT_SECONDS: float = 15.0  # SSE keep-alive comment when idle
+    
+    # Event loop diagnostics
+    LOOP_LAG_INTERVAL: float = 0.1  # Seconds between loop lag samples
+    SLOW_CALLBACK_SECONDS: float = 0.1  # Report loop stalls longer than this, with the blocking stack
+    PROFILE_TOKEN: str = ""  # Enables /debug endpoints for requests with this X-Admin-Token
+    PROFILE_MAX_SECONDS: float = 60.0
+    
+    # History API
+    HISTORY_PAGE_SIZE: int = 1000  # Default rows per JSON page
+    HISTORY_MAX_PAGE_SIZE: int = 10_000
+    HISTORY_BATCH_SIZE: int = 5000  # Rows per storage read when streaming NDJSON or Arrow
+    
+    # Columnar archive of stored ticks, signals and orders (needs pyarrow)
+    ARCHIVE_ENABLED: bool = False  # Run the archiver next to the service
+    ARCHIVE_PATH: str = "archive"
+    ARCHIVE_FORMAT: str = "arrow"  # arrow (IPC, memory-mapped reads) or parquet (compressed)
+    ARCHIVE_INTERVAL_SECONDS: float = 300.0
+    ARCHIVE_SETTLE_SECONDS: float = 60.0  # Only documents older than this are archived
+    ARCHIVE_BATCH_SIZE: int = 50_000
     
     # Trading Parameters
     SHORT_TERM_PERIOD: int = 50
     LONG_TERM_PERIOD: int = 200
+    # Extra strategy variants run on every symbol next to the default SMA
+    # crossover, sharing one indicator graph per symbol, e.g.
+    # [{"type": "ema_cross", "fast": 12, "slow": 26}, {"type": "rsi", "period": 14}]
+    STRATEGIES: List[dict] = []
+    STRATEGY_EXECUTOR: str = "thread"  # Default for window strategies: inline, thread or process
+    STRATEGY_WORKERS: int = 2  # Threads or processes per pool
+    ORDER_QUANTITY: float = 1.0
+    
+    # Paper trading against a simulated exchange instead of mock fills
+    PAPER_TRADING: bool = False
+    PAPER_DEPTH_STREAM: bool = True  # Subscribe to partial book depth; otherwise a synthetic book
+    PAPER_BOOK_LEVELS: int = 20  # Depth levels per side (5, 10 or 20 from Binance)
+    PAPER_TAKER_FEE: float = 0.001
+    PAPER_MAKER_FEE: float = 0.001
+    PAPER_LATENCY_MS: float = 50.0  # Order submission to matching
+    PAPER_SPREAD_BPS: float = 1.0  # Synthetic book: spread
+    PAPER_STEP_BPS: float = 0.5  # Synthetic book: distance between levels
+    PAPER_LEVEL_QUANTITY: float = 1.0  # Synthetic book: quantity per level
     
     class Config:
         case_sensitive = True
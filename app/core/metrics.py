@@ -0,0 +1,62 @@
+from prometheus_client import REGISTRY, CollectorRegistry, Counter, Gauge, Histogram
+
+# Most stages take micro- to milliseconds, well below the default buckets
+STAGE_BUCKETS = (0.00001, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1.0)
+
+# Tick pipeline
+WEBSOCKET_MESSAGES = Counter('websocket_messages_total', 'Kline frames received per symbol', ['symbol'])
+WEBSOCKET_RECONNECTS = Counter('websocket_reconnects_total', 'Binance WebSocket reconnect attempts', ['connection'])
+TRADING_SIGNALS = Counter('trading_signals_total', 'Trading signals generated', ['symbol', 'signal_type'])
+STAGE_LATENCY = Histogram(
+    'tick_stage_latency_seconds', 'Time spent per tick in each pipeline stage (decode, persist, publish, sma, indicators, signal, order)',
+    ['stage', 'symbol'], buckets=STAGE_BUCKETS
+)
+EXCHANGE_LAG = Histogram(
+    'exchange_lag_seconds', 'Delay between the exchange event time (E) and processing', ['symbol'],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+)
+
+# MongoDB
+MONGO_OP_LATENCY = Histogram(
+    'mongodb_operation_latency_seconds', 'MongoDB operation latency', ['collection', 'operation'],
+    buckets=STAGE_BUCKETS
+)
+
+# Write-behind persistence
+WRITE_QUEUE_DEPTH = Gauge('write_queue_depth', 'Documents waiting in the write-behind queue')
+WRITE_FLUSH_LATENCY = Histogram('write_flush_latency_seconds', 'Time spent flushing a batch to MongoDB', ['collection'])
+WRITE_BATCH_SIZE = Histogram(
+    'write_batch_size', 'Documents per insert_many batch', ['collection'],
+    buckets=(1, 10, 50, 100, 250, 500, 1000, 2500, 5000)
+)
+WRITE_ERRORS = Counter('write_errors_total', 'Documents that failed to persist', ['collection'])
+
+# WebSocket ingest
+INGEST_QUEUE_DEPTH = Gauge('ingest_queue_depth', 'Frames waiting for an ingest worker')
+INGEST_QUEUE_LAG = Histogram(
+    'ingest_queue_lag_seconds', 'Time a frame waits between receive and processing',
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+)
+INGEST_CONFLATED = Counter('ingest_conflated_total', 'Unclosed kline frames superseded before processing')
+
+# Event loop
+LOOP_LAG = Histogram(
+    'event_loop_lag_seconds', 'How late a loop timer fires; time the loop spent blocked',
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+)
+SLOW_CALLBACKS = Counter('event_loop_slow_callbacks_total', 'Times the loop was blocked longer than SLOW_CALLBACK_SECONDS')
+
+# Live stream
+STREAM_SUBSCRIBERS = Gauge('stream_subscribers', 'Clients subscribed to the live stream')
+STREAM_MESSAGES = Counter('stream_messages_total', 'Messages published to live stream subscribers', ['topic'])
+STREAM_DROPPED = Counter('stream_dropped_total', 'Messages dropped for slow live stream clients', ['topic'])
+
+# Host gauges, refreshed by a background task rather than on every scrape.
+# They live in their own registry for /metrics/system and are also exposed
+# through the default one on /metrics.
+SYSTEM_REGISTRY = CollectorRegistry()
+CPU_USAGE = Gauge('cpu_usage_percent', 'Current CPU usage percentage', registry=SYSTEM_REGISTRY)
+MEMORY_USAGE = Gauge('memory_usage_percent', 'Current memory usage percentage', registry=SYSTEM_REGISTRY)
+DISK_USAGE = Gauge('disk_usage_percent', 'Current disk usage percentage', registry=SYSTEM_REGISTRY)
+for _gauge in (CPU_USAGE, MEMORY_USAGE, DISK_USAGE):
+    REGISTRY.register(_gauge)
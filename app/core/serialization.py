@@ -0,0 +1,59 @@
+import json
+from datetime import datetime
+from app.core.config import settings
+
+# Fastest first; "auto" picks the first one that is installed
+DECODER_BACKENDS = ("orjson", "msgspec", "json")
+
+def get_decoder(backend: str = "auto"):
+    if backend == "auto":
+        for candidate in DECODER_BACKENDS:
+            try:
+                return get_decoder(candidate)
+            except ImportError:
+                continue
+    if backend == "orjson":
+        import orjson
+        return orjson.loads
+    if backend == "msgspec":
+        import msgspec
+        return msgspec.json.Decoder().decode
+    if backend == "json":
+        return json.loads
+    raise ValueError(f"Unknown JSON decoder backend: {backend}")
+
+def available_decoders():
+    decoders = {}
+    for backend in DECODER_BACKENDS:
+        try:
+            decoders[backend] = get_decoder(backend)
+        except ImportError:
+            pass
+    return decoders
+
+def _default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+def get_encoder(backend: str = "auto"):
+    # Encoders return str, ready for a text WebSocket frame or an SSE event
+    if backend == "auto":
+        for candidate in DECODER_BACKENDS:
+            try:
+                return get_encoder(candidate)
+            except ImportError:
+                continue
+    if backend == "orjson":
+        import orjson
+        return lambda value: orjson.dumps(value).decode()
+    if backend == "msgspec":
+        import msgspec
+        encode = msgspec.json.Encoder().encode
+        return lambda value: encode(value).decode()
+    if backend == "json":
+        return lambda value: json.dumps(value, separators=(",", ":"), default=_default)
+    raise ValueError(f"Unknown JSON encoder backend: {backend}")
+
+loads = get_decoder(settings.JSON_DECODER)
+dumps = get_encoder(settings.JSON_ENCODER)
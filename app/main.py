@@ -1,38 +1,104 @@
 import asyncio
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from prometheus_client import start_http_server, Counter, Gauge, Histogram
 import psutil
 
+from app.core.config import settings
+from app.core.metrics import CPU_USAGE, MEMORY_USAGE, DISK_USAGE
+from app.services import websocket as exchange_feed
 from app.services.database import db
-from app.services.websocket import binance_ws
+from app.services.trading import strategies
+from app.services.bus import tick_bus, StrategyWorker
+from app.services.backfill import backfill
+from app.services.offload import strategy_executor
+from app.services.archive import TickArchiver
+from app.services.diagnostics import loop_monitor
+from app.services.startup import startup
 from app.api.endpoints import router
 
-# Initialize Prometheus metrics
-WEBSOCKET_MESSAGES = Counter('websocket_messages_total', 'Total WebSocket messages received')
-TRADING_SIGNALS = Counter('trading_signals_total', 'Total trading signals generated')
-LATENCY = Histogram('operation_latency_seconds', 'Time spent processing operations')
-CPU_USAGE = Gauge('cpu_usage_percent', 'Current CPU usage percentage')
-MEMORY_USAGE = Gauge('memory_usage_percent', 'Current memory usage percentage')
+def read_system_usage():
+    CPU_USAGE.set(psutil.cpu_percent())
+    MEMORY_USAGE.set(psutil.virtual_memory().percent)
+    DISK_USAGE.set(psutil.disk_usage('/').percent)
 
 async def collect_metrics():
     while True:
-        CPU_USAGE.set(psutil.cpu_percent())
-        MEMORY_USAGE.set(psutil.virtual_memory().percent)
+        # The /proc reads and statfs run off the loop; a slow disk shouldn't stall ticks
+        await asyncio.to_thread(read_system_usage)
         await asyncio.sleep(1)
 
+async def reconcile_trading_stats():
+    while True:
+        try:
+            await db.reconcile_stats()
+        except Exception as e:
+            print(f"Failed to reconcile trading stats: {str(e)}")
+        await asyncio.sleep(settings.METRICS_RECONCILE_INTERVAL)
+
+# Tasks that write to storage, cancelled at shutdown before it is flushed
+pipeline = []
+
+async def connect_storage():
+    await db.connect_to_database()
+    db.start_background_tasks()
+
+async def start_stages():
+    # Storage and the Redis bus connect concurrently. Backfill needs storage,
+    # and the live socket waits for it so strategies are seeded first, but
+    # starts even when it fails.
+    connections = [startup.run("storage", connect_storage())]
+    if settings.SERVICE_ROLE in ("ingest", "worker"):
+        connections.append(startup.run("bus", tick_bus.connect()))
+    await asyncio.gather(*connections)
+    pipeline.append(asyncio.create_task(reconcile_trading_stats()))
+    if settings.SERVICE_ROLE == "worker":
+        pipeline.append(asyncio.create_task(StrategyWorker(tick_bus, strategies).run()))
+        print("Strategy worker started")
+    else:
+        if settings.SERVICE_ROLE == "ingest":
+            exchange_feed.binance_ws.attach_bus(tick_bus)
+        if settings.BACKFILL_ENABLED:
+            # A REST outage shouldn't keep live ingest down; symbols the
+            # backfill didn't warm are warmed from storage by the socket
+            await startup.run(
+                "backfill", backfill.run(settings.TRADING_PAIRS, warm=settings.SERVICE_ROLE == "standalone"),
+                required=False
+            )
+        pipeline.append(asyncio.create_task(exchange_feed.binance_ws.start()))
+        print("Binance WebSocket started")
+    if settings.ARCHIVE_ENABLED and settings.SERVICE_ROLE != "worker":
+        # Workers share the ingest service's storage; one archiver is enough
+        pipeline.append(asyncio.create_task(TickArchiver(db).run_forever()))
+        print(f"Archiving to {settings.ARCHIVE_PATH}")
+    startup.finish()
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Startup
-    start_http_server(9090)
-    await db.connect_to_database()
-    asyncio.create_task(binance_ws.start())
-    print("Binance WebSocket connected")
+    # Startup: the API serves /health and /ready while the stages run
+    startup.begin()
+    loop_monitor.start()
     asyncio.create_task(collect_metrics())
     print("Metrics collector started")
+    stages = asyncio.create_task(start_stages())
     yield
     # Shutdown
+    stages.cancel()
+    await asyncio.gather(stages, return_exceptions=True)
+    # Stop ingest first and let the dispatchers finish their queued frames,
+    # so nothing is saved after the write-behind queue's final flush
+    for task in pipeline:
+        task.cancel()
+    await asyncio.gather(*pipeline, return_exceptions=True)
+    pipeline.clear()
+    if "binance_ws" in vars(exchange_feed):
+        await exchange_feed.binance_ws.stop()
+    await db.stop_background_tasks()
     await db.close_database_connection()
+    await tick_bus.close()
+    await backfill.close()
+    strategies.close()
+    strategy_executor.shutdown()
+    await loop_monitor.stop()
 
 app = FastAPI(title="WSTrade API", lifespan=lifespan)
-app.include_router(router) 
\ No newline at end of file
+app.include_router(router)
@@ -8,13 +8,91 @@ class PriceData(BaseModel):
     price: float
     quantity: float
     
+class KlineData(PriceData):
+    # PriceData with the rest of the kline; `timestamp` is the candle open
+    # time, `price` the close and `quantity` the volume.
+    open: float
+    high: float
+    low: float
+    close_time: datetime
+    trades: int
+    
+class Tick:
+    # Lightweight, unvalidated price update for the ingest hot path. Convert
+    # to PriceData only at the API boundary.
+    __slots__ = ("timestamp", "symbol", "price", "quantity")
+    
+    def __init__(self, timestamp: datetime, symbol: str, price: float, quantity: float):
+        self.timestamp = timestamp
+        self.symbol = symbol
+        self.price = price
+        self.quantity = quantity
+        
+    @classmethod
+    def from_document(cls, doc: dict):
+        return cls(doc["timestamp"], doc["symbol"], doc["price"], doc["quantity"])
+        
+    @classmethod
+    def from_price_data(cls, price_data: PriceData):
+        return cls(price_data.timestamp, price_data.symbol, price_data.price, price_data.quantity)
+        
+    def to_document(self):
+        return {
+            "timestamp": self.timestamp,
+            "symbol": self.symbol,
+            "price": self.price,
+            "quantity": self.quantity
+        }
+        
+    def to_price_data(self):
+        return PriceData.model_construct(**self.to_document())
+        
+class KlineTick(Tick):
+    __slots__ = ("open", "high", "low", "close_time", "trades")
+    
+    def __init__(self, timestamp: datetime, symbol: str, price: float, quantity: float,
+                 open: float, high: float, low: float, close_time: datetime, trades: int):
+        super().__init__(timestamp, symbol, price, quantity)
+        self.open = open
+        self.high = high
+        self.low = low
+        self.close_time = close_time
+        self.trades = trades
+        
+    def to_document(self):
+        document = super().to_document()
+        document.update(
+            open=self.open,
+            high=self.high,
+            low=self.low,
+            close_time=self.close_time,
+            trades=self.trades
+        )
+        return document
+        
+    def to_price_data(self):
+        return KlineData.model_construct(**self.to_document())
+        
+
+class PriceBar(BaseModel):
+    timestamp: datetime
+    symbol: str
+    open: float
+    high: float
+    low: float
+    close: float
+    volume: float
+    ticks: int
+    
 class TradingSignal(BaseModel):
     timestamp: datetime
     symbol: str
     signal_type: str  # "BUY" or "SELL"
     price: float
-    short_sma: float
-    long_sma: float
+    short_sma: Optional[float] = None
+    long_sma: Optional[float] = None
+    strategy: Optional[str] = None  # None for the default SMA crossover
+    indicators: Optional[dict] = None  # Indicator values the strategy acted on
     
 class Order(BaseModel):
     order_id: str
@@ -24,8 +102,10 @@ class Order(BaseModel):
     quantity: float
     price: float
     status: str
+    order_type: str = "MARKET"  # "MARKET" or "LIMIT"
     filled_quantity: Optional[float] = None
-    filled_price: Optional[float] = None
+    filled_price: Optional[float] = None  # Average fill price
+    fee: Optional[float] = None
     
 class Position(BaseModel):
     symbol: str
@@ -34,4 +114,6 @@ class Position(BaseModel):
     quantity: float
     timestamp: datetime
     pnl: Optional[float] = None
-    status: str  # "OPEN" or "CLOSED" 
\ No newline at end of file
+    status: str  # "OPEN" or "CLOSED"
+    strategy: Optional[str] = None
+    fees: Optional[float] = None  # Entry fees of the open quantity 
\ No newline at end of file
@@ -1,3 +1,15 @@
-from .database import Database
-from .trading import TradingStrategy
-from .websocket import BinanceWebsocket
+# Exports are resolved on first access, so importing one service doesn't
+# import (and build the singletons of) all the others
+_EXPORTS = {
+    "Repository": "app.services.repository",
+    "Database": "app.services.database",
+    "create_repository": "app.services.database",
+    "TradingStrategy": "app.services.trading",
+    "BinanceWebsocket": "app.services.websocket",
+}
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    import importlib
+    return getattr(importlib.import_module(_EXPORTS[name]), name)
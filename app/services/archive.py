@@ -0,0 +1,276 @@
+import argparse
+import asyncio
+import glob
+import json
+import os
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from app.core.config import settings
+from app.services.repository import as_utc
+from app.services.rollup import floor_time
+
+# pyarrow is optional and only imported by the archiver and its readers
+
+# Columns written per collection; symbol and date are partition keys and
+# live in the directory names (TABLE/date=YYYY-MM-DD/symbol=SYMBOL/).
+# Orders are archived as they were when archived; fills on orders resting
+# past ARCHIVE_SETTLE_SECONDS aren't picked up later.
+COLUMNS = {
+    "price_data": {
+        "timestamp": "timestamp", "price": "float", "quantity": "float", "open": "float", "high": "float",
+        "low": "float", "close_time": "timestamp", "trades": "int",
+    },
+    "trading_signals": {
+        "timestamp": "timestamp", "signal_type": "string", "price": "float", "short_sma": "float",
+        "long_sma": "float", "strategy": "string", "indicators": "json",
+    },
+    "orders": {
+        "timestamp": "timestamp", "order_id": "string", "side": "string", "order_type": "string",
+        "quantity": "float", "price": "float", "status": "string", "filled_quantity": "float",
+        "filled_price": "float", "fee": "float",
+    },
+}
+
+FORMATS = ("arrow", "parquet")
+
+def arrow_type(pa, kind: str):
+    return {
+        "timestamp": pa.timestamp("ms", tz="UTC"),
+        "float": pa.float64(),
+        "int": pa.int64(),
+        "string": pa.string(),
+        "json": pa.string(),
+    }[kind]
+
+def schema(table: str, columns: dict = None):
+    import pyarrow as pa
+    return pa.schema([(name, arrow_type(pa, kind)) for name, kind in (columns or COLUMNS[table]).items()])
+
+def _column(documents, name: str, kind: str):
+    values = [document.get(name) for document in documents]
+    if kind == "timestamp":
+        return [as_utc(value) if value is not None else None for value in values]
+    if kind == "json":
+        return [json.dumps(value) if value is not None else None for value in values]
+    if kind == "string":
+        return [str(value) if value is not None else None for value in values]
+    return values
+
+def to_table(table: str, documents, columns: dict = None):
+    import pyarrow as pa
+    columns = columns or COLUMNS[table]
+    return pa.Table.from_pydict(
+        {name: _column(documents, name, kind) for name, kind in columns.items()},
+        schema=schema(table, columns)
+    )
+
+def partition_dir(root: str, table: str, day: str, symbol: str):
+    return os.path.join(root, table, f"date={day}", f"symbol={symbol}")
+
+def write_part(path: str, table, fmt: str):
+    # Written next to the target and renamed, so readers never see a partial
+    # file; dataset discovery skips names starting with "."
+    import pyarrow as pa
+    directory, name = os.path.split(path)
+    tmp = os.path.join(directory, f".{name}.tmp")
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        pq.write_table(table, tmp)
+    else:
+        with pa.OSFile(tmp, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp, path)
+
+class TickArchiver:
+    # Copies price_data, trading_signals and orders into date and symbol
+    # partitioned Arrow IPC (memory-mappable) or Parquet files. Each table
+    # has a high-water mark: a run archives the documents after it up to
+    # ARCHIVE_SETTLE_SECONDS ago, which leaves time for buffered writes to
+    # land. Part files are named after the mark a run started from and the
+    # batch number, so a run that crashes before saving the new mark is
+    # redone in place. Ticks bulk loaded below the price_data mark later on
+    # (backfill, gap fills) are picked up from the repository's
+    # backfilled_since, and the days they fall in are archived again. That
+    # is only seen in the process that wrote them; the standalone archiver
+    # misses late ticks written by the service.
+    def __init__(self, database=None, root: str = None, fmt: str = None, settle_seconds: float = None,
+                 batch_size: int = None, tables=None):
+        if database is None:
+            from app.services.database import db as database
+        self.db = database
+        self.root = root or settings.ARCHIVE_PATH
+        self.format = fmt or settings.ARCHIVE_FORMAT
+        if self.format not in FORMATS:
+            raise ValueError(f"Unknown archive format: {self.format}")
+        self.settle = timedelta(seconds=settings.ARCHIVE_SETTLE_SECONDS if settle_seconds is None else settle_seconds)
+        self.batch_size = batch_size or settings.ARCHIVE_BATCH_SIZE
+        self.tables = list(tables or COLUMNS)
+
+    @property
+    def state_path(self):
+        return os.path.join(self.root, "_state.json")
+
+    def load_marks(self):
+        try:
+            with open(self.state_path) as f:
+                return {table: datetime.fromisoformat(mark) for table, mark in json.load(f).items()}
+        except FileNotFoundError:
+            return {}
+
+    def save_marks(self, marks: dict):
+        os.makedirs(self.root, exist_ok=True)
+        tmp = self.state_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({table: mark.isoformat() for table, mark in marks.items()}, f)
+        os.replace(tmp, self.state_path)
+
+    async def archive_table(self, table: str, since: datetime = None, until: datetime = None, written: set = None):
+        # Streams the documents after `since` into one part file per batch and
+        # partition; returns the number archived and the new mark. The paths
+        # of the part files are added to `written`.
+        count, mark = 0, since
+        start_ms = int(since.timestamp() * 1000) if since else 0
+        async for batch in self.db.iter_documents(table, since, until, self.batch_size):
+            groups = defaultdict(list)
+            for document in batch:
+                timestamp = as_utc(document["timestamp"])
+                groups[(timestamp.strftime("%Y-%m-%d"), document["symbol"])].append(document)
+                mark = timestamp if mark is None else max(mark, timestamp)
+            part = f"part-{start_ms}-{count // self.batch_size:05d}.{self.format}"
+            for (day, symbol), documents in groups.items():
+                directory = partition_dir(self.root, table, day, symbol)
+                await asyncio.to_thread(os.makedirs, directory, exist_ok=True)
+                path = os.path.join(directory, part)
+                await asyncio.to_thread(write_part, path, to_table(table, documents), self.format)
+                if written is not None:
+                    written.add(path)
+            count += len(batch)
+        return count, mark
+
+    async def rearchive(self, table: str, since: datetime, mark: datetime):
+        # Rewrites every partition from the day of `since` up to `mark`. The
+        # new parts are written before the old ones are removed, so a reader
+        # may briefly see duplicates but never a gap.
+        start = floor_time(as_utc(since), 86400)
+        days = []
+        while start + timedelta(days=len(days)) <= mark:
+            days.append((start + timedelta(days=len(days))).strftime("%Y-%m-%d"))
+        old = {
+            path for day in days
+            for path in glob.glob(os.path.join(self.root, table, f"date={day}", "symbol=*", f"part-*.{self.format}"))
+        }
+        written = set()
+        # Start just before midnight so the first tick of the day is included
+        count, _ = await self.archive_table(table, start - timedelta(microseconds=1), mark, written)
+        for path in old - written:
+            await asyncio.to_thread(os.remove, path)
+        return count
+
+    async def run_once(self, now: datetime = None):
+        until = (now or datetime.now(tz=timezone.utc)) - self.settle
+        marks = self.load_marks()
+        counts = {}
+        late, self.db.backfilled_since = self.db.backfilled_since, None
+        mark = marks.get("price_data")
+        if late is not None and mark is not None and late <= mark and "price_data" in self.tables:
+            try:
+                counts["rearchived"] = await self.rearchive("price_data", late, mark)
+            except Exception:
+                # Retried on the next run
+                pending = self.db.backfilled_since
+                self.db.backfilled_since = late if pending is None else min(pending, late)
+                raise
+        for table in self.tables:
+            counts[table], mark = await self.archive_table(table, marks.get(table), until)
+            if mark is not None:
+                marks[table] = mark
+                self.save_marks(marks)
+        return counts
+
+    async def run_forever(self, interval: float = None):
+        interval = interval or settings.ARCHIVE_INTERVAL_SECONDS
+        while True:
+            try:
+                counts = await self.run_once()
+                if any(counts.values()):
+                    print(f"Archived {counts}")
+            except Exception as e:
+                print(f"Archiving failed: {str(e)}")
+            await asyncio.sleep(interval)
+
+# Readers
+
+def _day(moment: datetime):
+    return as_utc(moment).strftime("%Y-%m-%d")
+
+def open_dataset(root: str, table: str, fmt: str = None):
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    from pyarrow import fs
+    fmt = fmt or settings.ARCHIVE_FORMAT
+    partitions = pa.schema([("date", pa.string()), ("symbol", pa.string())])
+    return ds.dataset(
+        os.path.join(root, table),
+        schema=pa.unify_schemas([schema(table), partitions]),
+        format="ipc" if fmt == "arrow" else "parquet",
+        partitioning=ds.partitioning(partitions, flavor="hive"),
+        # Arrow IPC files are memory-mapped instead of read into buffers
+        filesystem=fs.LocalFileSystem(use_mmap=True)
+    )
+
+def read_table(root: str, table: str, symbol: str = None, start: datetime = None, end: datetime = None,
+               columns=None, fmt: str = None):
+    # Rows with start <= timestamp < end. Symbol and date filters prune whole
+    # partitions; the timestamp filter is pushed into the file scan.
+    import pyarrow.dataset as ds
+    dataset = open_dataset(root, table, fmt)
+    condition = None
+    predicates = []
+    if symbol is not None:
+        predicates.append(ds.field("symbol") == symbol)
+    if start is not None:
+        predicates += [ds.field("date") >= _day(start), ds.field("timestamp") >= as_utc(start)]
+    if end is not None:
+        predicates += [ds.field("date") <= _day(end), ds.field("timestamp") < as_utc(end)]
+    for predicate in predicates:
+        condition = predicate if condition is None else condition & predicate
+    result = dataset.to_table(columns=columns, filter=condition)
+    # Parts of one symbol are already in time order (by date directory, then
+    # by the mark in the file name); only a mix of symbols needs sorting
+    if symbol is None and "timestamp" in result.column_names:
+        result = result.sort_by("timestamp")
+    return result
+
+def to_numpy_columns(table):
+    # A single-chunk numeric or timestamp column without nulls comes back as
+    # a view over the mapped file; anything else is copied
+    return {
+        name: (column.chunk(0) if column.num_chunks == 1 else column).to_numpy(zero_copy_only=False)
+        for name, column in zip(table.column_names, table.columns)
+    }
+
+def read_ticks(root: str, symbol: str, start: datetime = None, end: datetime = None,
+               columns=("timestamp", "price", "quantity"), fmt: str = None):
+    return to_numpy_columns(read_table(root, "price_data", symbol, start, end, list(columns), fmt))
+
+async def _run_cli(args):
+    from app.services.database import db
+    await db.connect_to_database()
+    try:
+        archiver = TickArchiver(db, root=args.path, fmt=args.format)
+        if args.once:
+            print(f"Archived {await archiver.run_once()}")
+        else:
+            await archiver.run_forever()
+    finally:
+        await db.close_database_connection()
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive stored ticks, signals and orders to Parquet or Arrow files")
+    parser.add_argument("--path", default=settings.ARCHIVE_PATH, help="Archive root directory")
+    parser.add_argument("--format", default=settings.ARCHIVE_FORMAT, choices=sorted(FORMATS))
+    parser.add_argument("--once", action="store_true", help="Archive up to the settle time and exit")
+    asyncio.run(_run_cli(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+import argparse
+import asyncio
+import glob
+import os
+import time
+from datetime import datetime, timezone
+from app.core.config import settings
+from app.models.models import Tick, KlineTick
+from app.services.database import db
+from app.services.repository import as_utc
+from app.services.trading import strategies
+
+UNIT_MS = {"s": 1000, "m": 60_000, "h": 3_600_000, "d": 86_400_000, "w": 604_800_000}
+
+def interval_ms(interval: str):
+    return int(interval[:-1]) * UNIT_MS[interval[-1]]
+
+def kline_tick(symbol: str, row):
+    # Row layout of both the REST klines endpoint and the archive dumps.
+    # Stamped like the socket stamps the kline's final update: with the open
+    # time for closed-only ingest, else with the close time (the event time
+    # of a kline's last update).
+    opened = datetime.fromtimestamp(int(row[0]) / 1000, tz=timezone.utc)
+    closed = datetime.fromtimestamp(int(row[6]) / 1000, tz=timezone.utc)
+    timestamp = opened if settings.KLINE_CLOSED_ONLY else closed
+    if settings.KLINE_STORE_OHLCV:
+        return KlineTick(
+            timestamp, symbol, float(row[4]), float(row[5]), float(row[1]), float(row[2]), float(row[3]),
+            closed, int(row[8])
+        )
+    return Tick(timestamp, symbol, float(row[4]), float(row[5]))
+
+class RateLimiter:
+    # Token bucket shared by every request to one API
+    def __init__(self, rate: float, burst: int = None):
+        self.rate = rate
+        self.capacity = burst or max(1, int(rate))
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+class KlineArchive:
+    # Directory of Binance kline dumps (data.binance.vision), named
+    # SYMBOL-INTERVAL-*.csv or .zip
+    def __init__(self, path: str):
+        self.path = path
+
+    def _read(self, symbol: str, interval: str, start_ms: int, end_ms: int):
+        # Runs in a thread; pandas is only loaded when an archive is used
+        import pandas as pd
+        from app.services.backtest import KLINE_COLUMNS
+        files = sorted(
+            glob.glob(os.path.join(self.path, f"{symbol}-{interval}-*.csv"))
+            + glob.glob(os.path.join(self.path, f"{symbol}-{interval}-*.zip"))
+        )
+        frames = []
+        for path in files:
+            df = pd.read_csv(path, header=None, names=KLINE_COLUMNS)
+            # Some dumps have a header row
+            df = df[pd.to_numeric(df["open_time"], errors="coerce").notna()].astype({"open_time": "int64", "close_time": "int64"})
+            # Dumps from 2025 on use microsecond timestamps
+            for column in ("open_time", "close_time"):
+                df.loc[df[column] > 10**14, column] //= 1000
+            frames.append(df[(df["open_time"] >= start_ms) & (df["open_time"] < end_ms)])
+        if not frames:
+            return []
+        rows = pd.concat(frames).drop_duplicates("open_time").sort_values("open_time")
+        return rows.values.tolist()
+
+    async def fetch(self, symbol: str, interval: str, start_ms: int, end_ms: int):
+        return await asyncio.to_thread(self._read, symbol, interval, start_ms, end_ms)
+
+class RestKlineSource:
+    # Binance REST klines through python-binance, paged and rate limited
+    PAGE_SIZE = 1000
+
+    def __init__(self, requests_per_second: float = None, client=None):
+        self.limiter = RateLimiter(requests_per_second or settings.BACKFILL_REQUESTS_PER_SECOND)
+        self.client = client
+
+    async def _client(self):
+        if self.client is None:
+            from binance import AsyncClient
+            self.client = await AsyncClient.create()
+        return self.client
+
+    async def fetch(self, symbol: str, interval: str, start_ms: int, end_ms: int):
+        client = await self._client()
+        rows = []
+        while start_ms < end_ms:
+            await self.limiter.acquire()
+            page = await client.get_klines(
+                symbol=symbol, interval=interval, startTime=start_ms, endTime=end_ms - 1, limit=self.PAGE_SIZE
+            )
+            rows.extend(page)
+            if len(page) < self.PAGE_SIZE:
+                break
+            start_ms = int(page[-1][0]) + 1
+        return rows
+
+    async def close(self):
+        if self.client is not None:
+            await self.client.close_connection()
+            self.client = None
+
+def default_sources():
+    sources = []
+    if settings.BACKFILL_ARCHIVE_PATH:
+        sources.append(KlineArchive(settings.BACKFILL_ARCHIVE_PATH))
+    if settings.BACKFILL_REST_ENABLED:
+        sources.append(RestKlineSource())
+    return sources
+
+class BackfillService:
+    # Loads closed klines the service missed (while down or disconnected)
+    # into storage and reseeds the strategies from them. Sources are tried in
+    # order, each only for the range the previous ones didn't cover, so a
+    # local archive can serve most of the history and REST the recent tail.
+    def __init__(self, database=None, strategies=None, sources=None, interval: str = None,
+                 klines: int = None, concurrency: int = None):
+        self.db = database or db
+        self.strategies = strategies
+        self.sources = sources if sources is not None else default_sources()
+        self.interval = interval or settings.KLINE_INTERVAL
+        self.step = interval_ms(self.interval)
+        self.klines = klines or settings.BACKFILL_KLINES
+        self.semaphore = asyncio.Semaphore(concurrency or settings.BACKFILL_CONCURRENCY)
+        self.warmed = set()  # Symbols whose strategies the backfill seeded
+
+    async def fetch(self, symbol: str, start_ms: int, end_ms: int):
+        rows = []
+        for source in self.sources:
+            if start_ms >= end_ms:
+                break
+            try:
+                found = await source.fetch(symbol, self.interval, start_ms, end_ms)
+            except Exception as e:
+                print(f"Backfill from {type(source).__name__} failed for {symbol}: {str(e)}")
+                continue
+            if found:
+                rows.extend(found)
+                start_ms = int(found[-1][0]) + self.step
+        return rows
+
+    async def fill(self, symbol: str, start_ms: int, end_ms: int, warm: bool = True):
+        # Inserts the klines opened in [start_ms, end_ms); returns how many
+        # were stored and the open time of the last one
+        rows = []
+        if start_ms < end_ms:
+            async with self.semaphore:
+                rows = await self.fetch(symbol, start_ms, end_ms)
+            if rows:
+                await self.db.save_ticks([kline_tick(symbol, row) for row in rows])
+        if rows and warm:
+            await self.warm_up(symbol)
+        return len(rows), int(rows[-1][0]) if rows else None
+
+    async def warm_up(self, symbol: str):
+        if self.strategies is not None:
+            await self.strategies.warm_up([symbol])
+            self.warmed.add(symbol)
+
+    def _current_open(self, now_ms: int = None):
+        # Open time of the kline still in progress, which is left to the socket
+        now_ms = now_ms or int(time.time() * 1000)
+        return now_ms - now_ms % self.step
+
+    async def backfill_symbol(self, symbol: str, now_ms: int = None, warm: bool = True):
+        end = self._current_open(now_ms)
+        start = end - self.klines * self.step
+        latest = await self.db.get_recent_ticks(symbol, 1)
+        if latest:
+            # Only the klines from the newest stored tick on. Its kline is
+            # refetched unless the tick is that kline's final one: a closed
+            # kline, or one stamped with its close time by a backfill.
+            latest_ms = int(as_utc(latest[0].timestamp).timestamp() * 1000)
+            opened = latest_ms - latest_ms % self.step
+            complete = settings.KLINE_CLOSED_ONLY or latest_ms - opened == self.step - 1
+            start = max(start, opened + self.step if complete else opened)
+        inserted, _ = await self.fill(symbol, start, end, warm=False)
+        # Seeded even when nothing was missing, so the socket needn't do it
+        if warm:
+            await self.warm_up(symbol)
+        return inserted
+
+    async def fill_gap(self, symbol: str, last_open_ms: int, now_ms: int = None, warm: bool = True):
+        # The last kline seen live is refetched unless it was seen closed
+        start = last_open_ms + self.step if settings.KLINE_CLOSED_ONLY else last_open_ms
+        return await self.fill(symbol, start, self._current_open(now_ms), warm)
+
+    async def run(self, symbols, warm: bool = True):
+        counts = await asyncio.gather(*(self.backfill_symbol(symbol, warm=warm) for symbol in symbols))
+        print(f"Backfilled {sum(counts)} klines for {len(symbols)} symbols")
+        return dict(zip(symbols, counts))
+
+    async def close(self):
+        for source in self.sources:
+            if hasattr(source, "close"):
+                await source.close()
+
+backfill = BackfillService(strategies=strategies)
+
+async def _run_cli(symbols, klines: int):
+    await db.connect_to_database()
+    service = BackfillService(db, klines=klines)
+    try:
+        await service.run(symbols, warm=False)
+    finally:
+        await service.close()
+        await db.close_database_connection()
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill recent klines into the configured storage backend")
+    parser.add_argument("--symbols", default=",".join(settings.TRADING_PAIRS), help="Comma separated symbols")
+    parser.add_argument("--klines", type=int, default=settings.BACKFILL_KLINES, help="Klines to load per symbol")
+    args = parser.parse_args()
+    asyncio.run(_run_cli(args.symbols.split(","), args.klines))
+
+if __name__ == "__main__":
+    main()
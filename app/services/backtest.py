@@ -0,0 +1,266 @@
+import argparse
+import asyncio
+import numpy as np
+import pandas as pd
+from app.core.config import settings
+
+# Column layout of Binance's public kline dumps (data.binance.vision), which have no header
+KLINE_COLUMNS = [
+    "open_time", "open", "high", "low", "close", "volume", "close_time",
+    "quote_volume", "trades", "taker_buy_volume", "taker_buy_quote_volume", "ignore"
+]
+
+def _normalize(df: pd.DataFrame):
+    if "price" not in df.columns:
+        df = df.rename(columns={"close": "price", "open_time": "timestamp"})
+    if "timestamp" in df.columns and np.issubdtype(df["timestamp"].dtype, np.number):
+        df["timestamp"] = pd.to_datetime(df["timestamp"], unit="ms", utc=True)
+    return df[["timestamp", "price"]].sort_values("timestamp", kind="stable").reset_index(drop=True)
+
+def load_prices_csv(path: str):
+    with open(path) as f:
+        has_header = any(c.isalpha() for c in f.readline())
+    df = pd.read_csv(path, header=0 if has_header else None, names=None if has_header else KLINE_COLUMNS)
+    return _normalize(df)
+
+def load_prices_parquet(path: str):
+    # Needs pyarrow (or fastparquet) installed
+    return _normalize(pd.read_parquet(path))
+
+def load_prices_archive(path: str, symbol: str, start=None, end=None):
+    # Reads the columnar archive written by app.services.archive (needs pyarrow)
+    from app.services.archive import read_ticks
+    columns = read_ticks(path, symbol, start, end, columns=("timestamp", "price"))
+    return pd.DataFrame({"timestamp": pd.to_datetime(columns["timestamp"], utc=True), "price": columns["price"]})
+
+async def load_prices_db(database, symbol: str, start=None, end=None):
+    rows = await database.get_price_series(symbol, start, end)
+    return pd.DataFrame(rows, columns=["timestamp", "price"])
+
+def prefix_sums(prices: np.ndarray):
+    # Shifting by the first price keeps the cumulative sum small, which keeps
+    # window sums accurate over tens of millions of rows.
+    offset = float(prices[0]) if len(prices) else 0.0
+    prefix = np.empty(len(prices) + 1)
+    prefix[0] = 0.0
+    np.cumsum(prices - offset, out=prefix[1:])
+    return prefix, offset
+
+def sma_from_prefix(prefix: np.ndarray, offset: float, window: int):
+    # Same semantics as the live RollingSMA: the mean of the last `window`
+    # prices, or of every price seen so far while the window is filling up.
+    end = np.arange(1, len(prefix))
+    start = np.maximum(end - window, 0)
+    return (prefix[end] - prefix[start]) / (end - start) + offset
+
+def crossover_signals(short_sma: np.ndarray, long_sma: np.ndarray, long_period: int):
+    # Mirrors SMACrossover.crossover: only evaluated once `long_period` ticks
+    # have been seen, comparing each tick with the one before it.
+    signals = np.zeros(len(short_sma), dtype=np.int8)
+    if len(short_sma) < 2:
+        return signals
+    prev_below = short_sma[:-1] < long_sma[:-1]
+    prev_above = short_sma[:-1] > long_sma[:-1]
+    now_above = short_sma[1:] > long_sma[1:]
+    now_below = short_sma[1:] < long_sma[1:]
+    signals[1:][prev_below & now_above] = 1
+    signals[1:][prev_above & now_below] = -1
+    signals[:max(long_period - 1, 1)] = 0
+    return signals
+
+class BacktestResult:
+    def __init__(self, signals, trades, equity, stats):
+        self.signals = signals
+        self.trades = trades
+        self.equity = equity
+        self.stats = stats
+
+def simulate(prices: np.ndarray, signals: np.ndarray, quantity: float = 1.0):
+    # Same fill semantics as TradingStrategy.execute_signal: every signal fills
+    # at its price, BUY opens (or replaces) the position, SELL closes it.
+    n = len(prices)
+    event_idx = np.flatnonzero(signals)
+    entry_idx, exit_idx = [], []
+    marker = np.full(n, -1)
+    open_entry = np.full(n, np.nan)
+    position = None
+    for i in event_idx:
+        if signals[i] == 1:
+            position = i
+            marker[i] = i
+            open_entry[i] = prices[i]
+        elif position is not None:
+            entry_idx.append(position)
+            exit_idx.append(i)
+            marker[i] = i
+            position = None
+
+    entry_idx = np.asarray(entry_idx, dtype=np.int64)
+    exit_idx = np.asarray(exit_idx, dtype=np.int64)
+    pnl = (prices[exit_idx] - prices[entry_idx]) * quantity
+
+    # Forward-fill the entry price of the open position (NaN when flat)
+    last_event = np.maximum.accumulate(marker)
+    entry_price = np.where(last_event >= 0, open_entry[np.maximum(last_event, 0)], np.nan)
+    unrealized = np.where(np.isnan(entry_price), 0.0, (prices - entry_price) * quantity)
+    realized = np.zeros(n)
+    realized[exit_idx] = pnl
+    equity = np.cumsum(realized) + unrealized
+    return entry_idx, exit_idx, pnl, equity, position
+
+def simulate_paper(prices: np.ndarray, signals: np.ndarray, seconds: np.ndarray, exchange,
+                   quantity: float = 1.0, symbol: str = "BACKTEST"):
+    # Like simulate, but each signal is sent to a SimulatedExchange and
+    # filled against its book as of the first price `exchange.latency`
+    # seconds later, paying the spread, depth slippage and fees. The unfilled
+    # rest of a partial exit stays open.
+    n = len(prices)
+    entry_idx, exit_idx, entry_price, exit_price, pnl = [], [], [], [], []
+    marker = np.full(n, -1)
+    open_entry = np.full(n, np.nan)
+    open_quantity = np.zeros(n)
+    position = None  # (signal index, fill price, quantity, entry fee)
+    for i in np.flatnonzero(signals):
+        j = min(int(np.searchsorted(seconds, seconds[i] + exchange.latency)), n - 1)
+        exchange.apply_price(symbol, float(prices[j]))
+        if signals[i] == 1:
+            order = exchange.execute(exchange.new_order(symbol, "BUY", quantity))
+            if not order.filled_quantity:
+                continue
+            position = (i, order.filled_price, order.filled_quantity, order.fee)
+        elif position is not None:
+            start, price, held, fee = position
+            order = exchange.execute(exchange.new_order(symbol, "SELL", held))
+            sold = order.filled_quantity
+            if not sold:
+                continue
+            entry_fee = fee * sold / held
+            entry_idx.append(start)
+            exit_idx.append(i)
+            entry_price.append(price)
+            exit_price.append(order.filled_price)
+            pnl.append((order.filled_price - price) * sold - entry_fee - order.fee)
+            position = (start, price, held - sold, fee - entry_fee) if held - sold > 1e-12 else None
+        else:
+            continue
+        marker[i] = i
+        if position is not None:
+            open_entry[i], open_quantity[i] = position[1], position[2]
+
+    entry_idx = np.asarray(entry_idx, dtype=np.int64)
+    exit_idx = np.asarray(exit_idx, dtype=np.int64)
+    pnl = np.asarray(pnl, dtype=np.float64)
+    last_event = np.maximum.accumulate(marker)
+    held = last_event >= 0
+    entry = np.where(held, open_entry[np.maximum(last_event, 0)], np.nan)
+    unrealized = np.where(np.isnan(entry), 0.0, (prices - entry) * open_quantity[np.maximum(last_event, 0)])
+    realized = np.zeros(n)
+    np.add.at(realized, exit_idx, pnl)
+    equity = np.cumsum(realized) + unrealized
+    open_idx = position[0] if position is not None else None
+    return entry_idx, exit_idx, pnl, equity, open_idx, np.asarray(entry_price), np.asarray(exit_price)
+
+def _seconds(df: pd.DataFrame):
+    if "timestamp" not in df.columns:
+        return np.arange(len(df), dtype=np.float64)
+    return pd.to_datetime(df["timestamp"], utc=True).to_numpy(dtype="datetime64[ns]").astype(np.int64) / 1e9
+
+def max_drawdown(equity: np.ndarray):
+    if not len(equity):
+        return 0.0
+    return float(np.max(np.maximum.accumulate(np.maximum(equity, 0.0)) - equity))
+
+def summarize(signals: np.ndarray, pnl: np.ndarray, equity: np.ndarray, open_idx):
+    return {
+        "rows": len(signals),
+        "signals": int(np.count_nonzero(signals)),
+        "trades": len(pnl),
+        "total_pnl": float(pnl.sum()),
+        "win_rate": float((pnl > 0).mean()) if len(pnl) else 0.0,
+        "max_drawdown": max_drawdown(equity),
+        "open_position": open_idx is not None
+    }
+
+def evaluate(prices: np.ndarray, short_sma: np.ndarray, long_sma: np.ndarray, long_period: int, quantity: float = 1.0):
+    signals = crossover_signals(short_sma, long_sma, long_period)
+    _, _, pnl, equity, open_idx = simulate(prices, signals, quantity)
+    return summarize(signals, pnl, equity, open_idx)
+
+def run_backtest(df: pd.DataFrame, short_period: int = None, long_period: int = None, quantity: float = 1.0,
+                 exchange=None):
+    # With a SimulatedExchange, fills come from its book instead of the signal price
+    short_period = short_period or settings.SHORT_TERM_PERIOD
+    long_period = long_period or settings.LONG_TERM_PERIOD
+    prices = df["price"].to_numpy(dtype=np.float64)
+    timestamps = df["timestamp"].to_numpy() if "timestamp" in df.columns else np.arange(len(prices))
+
+    prefix, offset = prefix_sums(prices)
+    short_sma = sma_from_prefix(prefix, offset, short_period)
+    long_sma = sma_from_prefix(prefix, offset, long_period)
+    signals = crossover_signals(short_sma, long_sma, long_period)
+    if exchange is None:
+        entry_idx, exit_idx, pnl, equity, open_idx = simulate(prices, signals, quantity)
+        entry_prices, exit_prices = prices[entry_idx], prices[exit_idx]
+    else:
+        entry_idx, exit_idx, pnl, equity, open_idx, entry_prices, exit_prices = simulate_paper(
+            prices, signals, _seconds(df), exchange, quantity
+        )
+
+    signal_idx = np.flatnonzero(signals)
+    signal_frame = pd.DataFrame({
+        "timestamp": timestamps[signal_idx],
+        "signal_type": np.where(signals[signal_idx] == 1, "BUY", "SELL"),
+        "price": prices[signal_idx],
+        "short_sma": short_sma[signal_idx],
+        "long_sma": long_sma[signal_idx]
+    })
+    trades = pd.DataFrame({
+        "entry_time": timestamps[entry_idx],
+        "exit_time": timestamps[exit_idx],
+        "entry_price": entry_prices,
+        "exit_price": exit_prices,
+        "pnl": pnl
+    })
+    stats = summarize(signals, pnl, equity, open_idx)
+    return BacktestResult(signal_frame, trades, equity, stats)
+
+async def _load_from_db(symbol: str):
+    # Reads from the configured STORAGE_BACKEND
+    from app.services.database import db
+    await db.connect_to_database()
+    try:
+        return await load_prices_db(db, symbol)
+    finally:
+        await db.close_database_connection()
+
+def load_prices(args):
+    if args.csv:
+        return load_prices_csv(args.csv)
+    if args.parquet:
+        return load_prices_parquet(args.parquet)
+    if args.archive:
+        return load_prices_archive(args.archive, args.symbol)
+    return asyncio.run(_load_from_db(args.symbol))
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtest the SMA crossover strategy on historical prices")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--csv", help="CSV file with timestamp/price columns or a Binance kline dump")
+    source.add_argument("--parquet", help="Parquet file with timestamp/price columns")
+    source.add_argument("--archive", help="Archive directory written by app.services.archive, read for --symbol")
+    parser.add_argument("--symbol", default=settings.TRADING_PAIR, help="Symbol to load from the configured storage backend or the archive")
+    parser.add_argument("--short", type=int, default=settings.SHORT_TERM_PERIOD)
+    parser.add_argument("--long", type=int, default=settings.LONG_TERM_PERIOD)
+    parser.add_argument("--paper", action="store_true", help="Fill through the simulated exchange (spread, slippage, fees, latency)")
+    args = parser.parse_args()
+
+    exchange = None
+    if args.paper:
+        from app.services.exchange import SimulatedExchange
+        exchange = SimulatedExchange()
+    result = run_backtest(load_prices(args), args.short, args.long, exchange=exchange)
+    for key, value in result.stats.items():
+        print(f"{key}: {value}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+import asyncio
+from collections import OrderedDict, defaultdict
+from app.core.config import settings
+from app.core.metrics import STREAM_SUBSCRIBERS, STREAM_MESSAGES, STREAM_DROPPED
+from app.core.serialization import dumps
+
+TOPICS = ("tick", "signal", "order")
+
+class Message:
+    # One published event, serialized once and shared by every subscriber
+    __slots__ = ("topic", "symbol", "text", "_sse")
+    
+    def __init__(self, topic: str, symbol: str, text: str):
+        self.topic = topic
+        self.symbol = symbol
+        self.text = text
+        self._sse = None
+        
+    @property
+    def sse(self):
+        if self._sse is None:
+            self._sse = f"event: {self.topic}\ndata: {self.text}\n\n"
+        return self._sse
+
+class Subscriber:
+    # A client's subscription and its bounded queue. Ticks are conflated to
+    # the latest per symbol; when the queue is full the oldest message is
+    # dropped, so a slow client only ever falls behind by `maxsize`.
+    def __init__(self, topics=None, symbols=None, maxsize: int = None):
+        self.topics = set(topics or TOPICS)
+        self.symbols = {symbol.upper() for symbol in symbols} if symbols else None  # None: every symbol
+        self.maxsize = maxsize or settings.STREAM_QUEUE_SIZE
+        self.pending = OrderedDict()
+        self.ready = asyncio.Event()
+        self.seq = 0
+        self.dropped = 0
+        self.conflated = 0
+        
+    def offer(self, message: Message):
+        if message.topic == "tick":
+            key = message.symbol
+            if key in self.pending:
+                self.pending[key] = message
+                self.conflated += 1
+                return
+        else:
+            self.seq += 1
+            key = self.seq
+        if len(self.pending) >= self.maxsize:
+            _, oldest = self.pending.popitem(last=False)
+            self.dropped += 1
+            STREAM_DROPPED.labels(oldest.topic).inc()
+        self.pending[key] = message
+        self.ready.set()
+        
+    async def get(self, timeout: float = None):
+        # Everything queued since the last call, oldest first; an empty list
+        # after `timeout` seconds without messages
+        if not self.pending:
+            self.ready.clear()
+            try:
+                await asyncio.wait_for(self.ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                return []
+        messages = list(self.pending.values())
+        self.pending.clear()
+        return messages
+
+class Broadcaster:
+    # Fans ticks, signals and orders out to live stream clients. Publishing
+    # never awaits: it serializes the event once, if anyone is subscribed,
+    # and hands it to each matching client's queue, so slow clients can't
+    # hold up ingest or the strategies.
+    def __init__(self):
+        # (topic, symbol) -> subscribers; symbol None subscribes to all
+        self.routes = defaultdict(set)
+        self.subscribers = set()
+        
+    def _routes(self, subscriber: Subscriber):
+        symbols = subscriber.symbols or (None,)
+        return [(topic, symbol) for topic in subscriber.topics for symbol in symbols]
+        
+    def check(self, topics):
+        unknown = set(topics or ()) - set(TOPICS)
+        if unknown:
+            raise ValueError(f"Unknown stream topics: {', '.join(sorted(unknown))}")
+            
+    def _route(self, subscriber: Subscriber):
+        for route in self._routes(subscriber):
+            self.routes[route].add(subscriber)
+            
+    def _unroute(self, subscriber: Subscriber):
+        for route in self._routes(subscriber):
+            subscribers = self.routes.get(route)
+            if subscribers is not None:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self.routes[route]
+        
+    def subscribe(self, topics=None, symbols=None, maxsize: int = None):
+        self.check(topics)
+        subscriber = Subscriber(topics, symbols, maxsize)
+        self._route(subscriber)
+        self.subscribers.add(subscriber)
+        STREAM_SUBSCRIBERS.set(len(self.subscribers))
+        return subscriber
+        
+    def update(self, subscriber: Subscriber, topics=None, symbols=None):
+        # Replaces the topics and/or symbols of a live subscription; an empty
+        # symbol list subscribes to every symbol. A bad request raises before
+        # anything changes, leaving the old subscription in place.
+        for name, values in (("topics", topics), ("symbols", symbols)):
+            if values is not None and not (isinstance(values, list) and all(isinstance(v, str) for v in values)):
+                raise ValueError(f"Stream {name} must be a list of strings")
+        self.check(topics)
+        new_topics = subscriber.topics if topics is None else set(topics or TOPICS)
+        new_symbols = subscriber.symbols if symbols is None else ({symbol.upper() for symbol in symbols} or None)
+        self._unroute(subscriber)
+        subscriber.topics, subscriber.symbols = new_topics, new_symbols
+        self._route(subscriber)
+        
+    def unsubscribe(self, subscriber: Subscriber):
+        self._unroute(subscriber)
+        self.subscribers.discard(subscriber)
+        STREAM_SUBSCRIBERS.set(len(self.subscribers))
+        
+    def wants(self, topic: str, symbol: str):
+        return (topic, symbol) in self.routes or (topic, None) in self.routes
+        
+    def publish(self, topic: str, symbol: str, data: dict):
+        if not self.wants(topic, symbol):
+            return None
+        message = Message(topic, symbol, dumps({"topic": topic, "symbol": symbol, "data": data}))
+        for route in ((topic, symbol), (topic, None)):
+            for subscriber in self.routes.get(route, ()):
+                subscriber.offer(message)
+        STREAM_MESSAGES.labels(topic).inc()
+        return message
+        
+    # The documents are only built when someone is listening
+    
+    def publish_tick(self, tick):
+        if self.wants("tick", tick.symbol):
+            self.publish("tick", tick.symbol, tick.to_document())
+            
+    def publish_signal(self, signal):
+        if self.wants("signal", signal.symbol):
+            self.publish("signal", signal.symbol, signal.model_dump(exclude_none=True))
+            
+    def publish_order(self, order):
+        if self.wants("order", order.symbol):
+            self.publish("order", order.symbol, order.model_dump(exclude_none=True))
+
+def split_param(value: str = None):
+    # "BTCUSDT,ETHUSDT" query parameters
+    return [part.strip() for part in value.split(",") if part.strip()] if value else None
+
+async def sse_events(topics=None, symbols=None, heartbeat: float = None):
+    # Server-sent events for one subscription; a comment line keeps idle
+    # connections open through proxies. The subscription is made on the first
+    # iteration, so a client gone before the response starts leaves nothing
+    # behind.
+    heartbeat = heartbeat or settings.STREAM_HEARTBEAT_SECONDS
+    subscriber = broadcaster.subscribe(topics, symbols)
+    try:
+        while True:
+            messages = await subscriber.get(timeout=heartbeat)
+            yield "".join(message.sse for message in messages) if messages else ": ping\n\n"
+    finally:
+        broadcaster.unsubscribe(subscriber)
+
+broadcaster = Broadcaster()
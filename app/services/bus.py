@@ -0,0 +1,288 @@
+import asyncio
+import os
+import socket
+import time
+import zlib
+from datetime import datetime, timezone
+from app.core.config import settings
+from app.core.metrics import STAGE_LATENCY
+from app.models.models import Position, Tick
+from app.services.indicators import SMACrossover
+
+def partition_for(symbol: str, partitions: int):
+    # crc32 rather than hash() so every process agrees on the partition
+    return zlib.crc32(symbol.encode()) % partitions
+
+def to_millis(moment: datetime):
+    return int(moment.timestamp() * 1000)
+
+class RedisTickBus:
+    # Ticks are published to partitioned Redis Streams and consumed by
+    # strategy workers through a consumer group. Each symbol's recent prices
+    # are also kept in a sorted set scored by timestamp, so any worker can
+    # rebuild a symbol's window as of any tick, and open positions live in
+    # a hash so a worker can take over a symbol from another one. Each
+    # partition is read by the one worker holding its lease, so a symbol's
+    # ticks are applied in order and its positions are never updated by two
+    # workers at once.
+    def __init__(self, url: str = None, client=None, partitions: int = None, group: str = None,
+                 consumer: str = None, window: int = None, maxlen: int = None, lease_ms: int = None):
+        self.url = url or settings.REDIS_URI
+        self.client = client
+        self.partitions = partitions or settings.BUS_PARTITIONS
+        self.group = group or settings.BUS_CONSUMER_GROUP
+        self.consumer = consumer or f"{socket.gethostname()}-{os.getpid()}"
+        self.window = window or settings.BUS_WINDOW_DEPTH
+        self.maxlen = maxlen or settings.BUS_STREAM_MAXLEN
+        self.lease_ms = lease_ms or settings.BUS_LEASE_MS
+        self.owned = set()  # Partitions this consumer holds the lease of
+        self._last_published = {}
+
+    async def connect(self):
+        if self.client is None:
+            import redis.asyncio as redis  # Only the ingest and worker roles need it
+            self.client = redis.from_url(self.url, decode_responses=True)
+        await self.client.ping()
+
+    async def close(self):
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+    def stream(self, partition: int):
+        return f"ticks:{partition}"
+
+    # Ingest side
+
+    async def publish(self, tick: Tick):
+        ts = to_millis(tick.timestamp)
+        window = f"window:{tick.symbol}"
+        pipe = self.client.pipeline(transaction=False)
+        # The window is written before the stream entry, so a worker always
+        # finds the tick it is processing in the window.
+        pipe.zadd(window, {f"{ts}:{tick.price}": ts})
+        pipe.zremrangebyrank(window, 0, -self.window - 1)
+        pipe.xadd(
+            self.stream(partition_for(tick.symbol, self.partitions)),
+            {
+                "s": tick.symbol,
+                "p": tick.price,
+                "q": tick.quantity,
+                "t": ts,
+                # Lets a worker tell whether it saw this symbol's previous tick
+                "prev": self._last_published.get(tick.symbol, "")
+            },
+            maxlen=self.maxlen,
+            approximate=True
+        )
+        await pipe.execute()
+        self._last_published[tick.symbol] = ts
+
+    # State store
+
+    async def get_window(self, symbol: str, until: int, limit: int):
+        # Prices up to and including `until` (ms), newest first
+        members = await self.client.zrevrangebyscore(f"window:{symbol}", until, "-inf", start=0, num=limit)
+        return [float(member.split(":", 1)[1]) for member in members]
+
+    async def get_position(self, symbol: str):
+        data = await self.client.hget("positions", symbol)
+        return Position.model_validate_json(data) if data else None
+
+    async def set_position(self, symbol: str, position: Position = None):
+        if position is None:
+            await self.client.hdel("positions", symbol)
+        else:
+            await self.client.hset("positions", symbol, position.model_dump_json())
+
+    # Worker side
+
+    async def ensure_groups(self):
+        from redis.exceptions import ResponseError
+        for partition in range(self.partitions):
+            try:
+                await self.client.xgroup_create(self.stream(partition), self.group, id="0", mkstream=True)
+            except ResponseError as e:
+                if "BUSYGROUP" not in str(e):
+                    raise
+
+    def lease(self, partition: int):
+        return f"lease:{self.group}:{partition}"
+
+    async def heartbeat(self):
+        # Registers this consumer and returns the number of live ones
+        key = f"workers:{self.group}"
+        now = int(time.time() * 1000)
+        pipe = self.client.pipeline(transaction=False)
+        pipe.zadd(key, {self.consumer: now})
+        pipe.zremrangebyscore(key, "-inf", now - self.lease_ms)
+        pipe.zcard(key)
+        *_, live = await pipe.execute()
+        return live
+
+    async def _if_held(self, partition: int, action: str):
+        # Extends ("pexpire") or drops ("delete") a lease, unless it expired
+        # and another consumer took it in the meantime
+        from redis.exceptions import WatchError
+        key = self.lease(partition)
+        async with self.client.pipeline(transaction=True) as pipe:
+            try:
+                await pipe.watch(key)
+                if await pipe.get(key) != self.consumer:
+                    return False
+                pipe.multi()
+                if action == "pexpire":
+                    pipe.pexpire(key, self.lease_ms)
+                else:
+                    pipe.delete(key)
+                await pipe.execute()
+                return True
+            except WatchError:
+                return False
+
+    async def balance(self):
+        # Renews this consumer's leases, gives back partitions over its fair
+        # share once other workers join, and takes free ones up to its share.
+        # A dead worker's partitions free up when its leases expire.
+        share = -(-self.partitions // await self.heartbeat())
+        owned = set()
+        for partition in sorted(self.owned):
+            if await self._if_held(partition, "pexpire"):
+                owned.add(partition)
+        for partition in sorted(owned)[share:]:
+            await self._if_held(partition, "delete")
+            owned.discard(partition)
+        for partition in range(self.partitions):
+            if len(owned) >= share:
+                break
+            if partition not in owned and await self.client.set(
+                self.lease(partition), self.consumer, nx=True, px=self.lease_ms
+            ):
+                owned.add(partition)
+        self.owned = owned
+        return owned
+
+    async def read(self, count: int = 100, block: int = 1000):
+        if not self.owned:
+            await asyncio.sleep(block / 1000)
+            return []
+        streams = {self.stream(partition): ">" for partition in sorted(self.owned)}
+        return await self.client.xreadgroup(self.group, self.consumer, streams, count=count, block=block)
+
+    async def claim_stale(self, min_idle_ms: int, count: int = 100):
+        # Take over entries delivered to workers that died before acking them
+        claimed = []
+        for partition in sorted(self.owned):
+            stream = self.stream(partition)
+            _, messages, *_ = await self.client.xautoclaim(
+                stream, self.group, self.consumer, min_idle_ms, start_id="0-0", count=count
+            )
+            if messages:
+                claimed.append((stream, messages))
+        return claimed
+
+    async def ack(self, stream: str, *ids):
+        await self.client.xack(stream, self.group, *ids)
+
+class StrategyWorker:
+    def __init__(self, bus: RedisTickBus, strategies, claim_idle_ms: int = None):
+        self.bus = bus
+        self.strategies = strategies
+        self.claim_idle_ms = claim_idle_ms or settings.BUS_CLAIM_IDLE_MS
+        # Timestamp of the last tick this worker applied per symbol
+        self.last_seen = {}
+
+    async def handle(self, fields: dict):
+        symbol = fields["s"]
+        price = float(fields["p"])
+        ts = int(fields["t"])
+        timestamp = datetime.fromtimestamp(ts / 1000, tz=timezone.utc)
+        last = self.last_seen.get(symbol)
+        if last is not None and ts <= int(last):
+            return None  # Redelivered, or older than a tick already applied
+        strategy = self.strategies.get(symbol)
+        if strategy.exchange is not None:
+            # Workers don't see depth, so paper fills use a synthetic book
+            await strategy.exchange.on_price(symbol, price)
+
+        in_sequence = self.last_seen.get(symbol) == fields.get("prev")
+        indicator = strategy.indicators.get(symbol)
+        if indicator is not None and in_sequence:
+            with STAGE_LATENCY.labels("sma", symbol).time():
+                indicator.update(price)
+        else:
+            # Another worker handled the previous tick (or this is a fresh
+            # worker): rebuild the window from Redis instead of Mongo.
+            prices = await self.bus.get_window(symbol, ts, strategy.long_period + 1)
+            indicator = SMACrossover(strategy.short_period, strategy.long_period)
+            indicator.seed(reversed(prices))
+            strategy.indicators[symbol] = indicator
+        self.last_seen[symbol] = str(ts)
+
+        signal = await strategy.check_signal(symbol, indicator, price, timestamp)
+        if signal:
+            strategy.current_position = await self.bus.get_position(symbol)
+            await strategy.execute_signal(signal)
+            await self.bus.set_position(symbol, strategy.current_position)
+        await self.handle_variants(symbol, price, ts, timestamp, in_sequence)
+        return signal
+
+    async def handle_variants(self, symbol: str, price: float, ts: int, timestamp: datetime, in_sequence: bool):
+        engine = self.strategies.engine(symbol)
+        if engine is None:
+            return
+        if engine.graph is not None and in_sequence:
+            engine.update(price)
+        else:
+            engine.seed(reversed(await self.bus.get_window(symbol, ts, engine.lookback + 1)))
+        for variant, signal in await engine.check_signals(price, timestamp):
+            # Variant positions are kept under "SYMBOL:name"
+            key = f"{symbol}:{variant.name}"
+            variant.current_position = await self.bus.get_position(key)
+            await variant.execute_signal(signal)
+            await self.bus.set_position(key, variant.current_position)
+
+    async def process(self, batches):
+        for stream, messages in batches:
+            for message_id, fields in messages:
+                try:
+                    await self.handle(fields)
+                except Exception as e:
+                    print(f"Error processing tick {message_id}: {str(e)}")
+                await self.bus.ack(stream, message_id)
+
+    async def discard(self, batches):
+        # Ticks a dead worker left unacked are at least claim_idle_ms old:
+        # they are acked without trading on them. The symbol's next tick is
+        # out of sequence and rebuilds the window from Redis, which has them.
+        for stream, messages in batches:
+            print(f"Skipping {len(messages)} stale ticks reclaimed from {stream}")
+            await self.bus.ack(stream, *(message_id for message_id, _ in messages))
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        ready = False
+        next_claim = next_balance = 0.0
+        failures = 0
+        while True:
+            try:
+                if not ready:
+                    await self.bus.ensure_groups()
+                    ready = True
+                if loop.time() >= next_balance:
+                    await self.bus.balance()
+                    next_balance = loop.time() + self.bus.lease_ms / 3000
+                if loop.time() >= next_claim:
+                    await self.discard(await self.bus.claim_stale(self.claim_idle_ms))
+                    next_claim = loop.time() + self.claim_idle_ms / 1000
+                await self.process(await self.bus.read())
+                failures = 0
+            except Exception as e:
+                failures += 1
+                delay = min(2 ** failures, 30)
+                print(f"Strategy worker error: {str(e)}, retrying in {delay} seconds")
+                await asyncio.sleep(delay)
+                # Leases may have lapsed while Redis was unreachable
+                next_balance = 0.0
+
+tick_bus = RedisTickBus()
@@ -0,0 +1,49 @@
+from collections import deque
+from itertools import islice
+
+class PriceCache:
+    def __init__(self, depth: int = 1000):
+        self.depth = depth
+        self.windows = {}
+        self.hits = 0
+        self.misses = 0
+        
+    def is_warm(self, symbol: str):
+        return symbol in self.windows
+        
+    def load(self, symbol: str, prices):
+        # `prices` come from Mongo newest first
+        window = deque(maxlen=self.depth)
+        window.extend(reversed(prices))
+        self.windows[symbol] = window
+        
+    def append(self, tick):
+        # Until a symbol has been loaded from Mongo we don't know its history,
+        # so writes only go through to an already warm window.
+        window = self.windows.get(tick.symbol)
+        if window is not None:
+            window.append(tick)
+            
+    def get(self, symbol: str, limit: int):
+        window = self.windows.get(symbol)
+        if window is None or limit > self.depth:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return list(islice(reversed(window), limit))
+        
+    def invalidate(self, symbol: str = None):
+        if symbol is None:
+            self.windows.clear()
+        else:
+            self.windows.pop(symbol, None)
+            
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "symbols": len(self.windows),
+            "depth": self.depth
+        }
@@ -1,12 +1,78 @@
-from motor.motor_asyncio import AsyncIOMotorClient
+from datetime import datetime, timezone
 from app.core.config import settings
-from app.models.models import PriceData, TradingSignal, Order, Position
+from app.core.metrics import MONGO_OP_LATENCY
+from app.models.models import PriceBar, Tick, Order, Position
+from app.services.persistence import WriteBehindQueue
+from app.services.repository import Repository
+from app.services.rollup import OHLCVRollup, RESOLUTIONS, RAW_FIELDS, BAR_FIELDS, ohlcv_pipeline
 
-class Database:
-    client: AsyncIOMotorClient = None
-    settings = settings
+# motor and pymongo are imported when a Mongo repository connects, so the
+# other backends (and anything importing `db`) don't pay for them
+ASCENDING, DESCENDING = 1, -1  # pymongo's sort directions
+
+# Indexes backing the hot queries, as (keys, options) for pymongo's
+# IndexModel; create_indexes is a no-op when they exist
+INDEXES = {
+    "price_data": [([("symbol", ASCENDING), ("timestamp", DESCENDING)], {})],
+    "trading_signals": [([("symbol", ASCENDING), ("timestamp", DESCENDING)], {})],
+    "orders": [([("order_id", ASCENDING)], {"unique": True})],
+    "positions": [([("symbol", ASCENDING), ("status", ASCENDING)], {})],
+    # $merge upserts rollup bars on (symbol, timestamp)
+    "price_data_1m": [([("symbol", ASCENDING), ("timestamp", ASCENDING)], {"unique": True})],
+    "price_data_1h": [([("symbol", ASCENDING), ("timestamp", ASCENDING)], {"unique": True})],
+}
+# History pages of one symbol walk (symbol, timestamp, _id) in order
+for _collection in ("price_data", "trading_signals", "orders", "positions"):
+    INDEXES[_collection].append(([("symbol", ASCENDING), ("timestamp", ASCENDING), ("_id", ASCENDING)], {}))
+
+# Hot queries whose plans are checked at startup: (collection, filter, sort)
+HOT_QUERIES = [
+    ("price_data", {"symbol": ""}, [("timestamp", DESCENDING)]),
+    ("positions", {"symbol": "", "status": "OPEN"}, None),
+    ("orders", {"order_id": ""}, None),
+]
+
+def _has_stage(plan, stage: str):
+    if isinstance(plan, dict):
+        if plan.get("stage") == stage:
+            return True
+        return any(_has_stage(value, stage) for value in plan.values())
+    if isinstance(plan, list):
+        return any(_has_stage(value, stage) for value in plan)
+    return False
+
+def _uses_collscan(planner: dict):
+    # Only the winning plan runs; rejected candidates often scan
+    return _has_stage(planner.get("winningPlan", planner), "COLLSCAN")
+
+def _range_query(symbol: str, start: datetime = None, end: datetime = None):
+    query = {"symbol": symbol} if symbol else {}
+    if start or end:
+        query["timestamp"] = {}
+        if start:
+            query["timestamp"]["$gte"] = start
+        if end:
+            query["timestamp"]["$lt"] = end
+    return query
+
+class Database(Repository):
+    # MongoDB storage backend
+    client = None  # AsyncIOMotorClient
+    
+    def __init__(self):
+        super().__init__()
+        self.writer = WriteBehindQueue(
+            self,
+            batch_size=settings.WRITE_BATCH_SIZE,
+            flush_interval=settings.WRITE_FLUSH_INTERVAL,
+            max_pending=settings.WRITE_QUEUE_MAXSIZE,
+            max_attempts=settings.WRITE_MAX_ATTEMPTS,
+            retry_backoff=settings.WRITE_RETRY_BACKOFF
+        )
+        self.rollup = OHLCVRollup(self, interval=settings.ROLLUP_INTERVAL, grace=settings.ROLLUP_SETTLE_SECONDS)
     
     async def connect_to_database(self):
+        from motor.motor_asyncio import AsyncIOMotorClient
         print(f"Connecting to MongoDB at {settings.MONGODB_URI}")
         self.client = AsyncIOMotorClient(settings.MONGODB_URI, serverSelectionTimeoutMS=5000)
         # Test the connection
@@ -16,50 +82,243 @@ class Database:
         except Exception as e:
             print(f"Failed to connect to MongoDB: {str(e)}")
             raise
+        await self.ensure_collections()
+        await self.ensure_indexes()
+        if self.settings.QUERY_PLAN_CHECK != "off":
+            await self.verify_query_plans()
+            
+    async def ensure_collections(self):
+        db = self.client[self.settings.DB_NAME]
+        if not self.settings.PRICE_DATA_TIMESERIES or "price_data" in await db.list_collection_names():
+            return
+        options = {"timeseries": {"timeField": "timestamp", "metaField": "symbol", "granularity": "seconds"}}
+        if self.settings.PRICE_DATA_TTL_SECONDS:
+            options["expireAfterSeconds"] = self.settings.PRICE_DATA_TTL_SECONDS
+        try:
+            await db.create_collection("price_data", **options)
+            print("Created price_data as a time-series collection")
+        except Exception as e:
+            # Time-series collections need MongoDB 5.0+; fall back to a plain collection
+            print(f"Could not create price_data as a time-series collection: {str(e)}")
+            
+    async def ensure_indexes(self):
+        from pymongo import IndexModel
+        from pymongo.errors import OperationFailure
+        db = self.client[self.settings.DB_NAME]
+        for collection, indexes in INDEXES.items():
+            try:
+                await db[collection].create_indexes([IndexModel(keys, **options) for keys, options in indexes])
+            except OperationFailure as e:
+                # An index over the same keys with other options (e.g. a
+                # non-unique order_id index) has to be dropped by hand.
+                print(f"Could not create indexes on {collection}: {str(e)}")
+                
+    async def verify_query_plans(self):
+        db = self.client[self.settings.DB_NAME]
+        for collection, query, sort in HOT_QUERIES:
+            cursor = db[collection].find(query).limit(1)
+            if sort:
+                cursor = cursor.sort(sort)
+            try:
+                plan = await cursor.explain()
+            except Exception as e:
+                print(f"Could not explain hot query on {collection}: {str(e)}")
+                continue
+            if _uses_collscan(plan.get("queryPlanner", plan)):
+                message = f"Hot query on {collection} {query} does a collection scan"
+                if self.settings.QUERY_PLAN_CHECK == "fail":
+                    raise RuntimeError(message)
+                print(message)
         
     async def close_database_connection(self):
         if self.client:
             self.client.close()
+            self.price_cache.invalidate()
             print("MongoDB connection closed")
             
-    async def save_price_data(self, price_data: PriceData):
+    def start_background_tasks(self):
+        if self.settings.WRITE_BEHIND_ENABLED:
+            self.writer.start()
+            print("Write-behind persistence started")
+        if self.settings.ROLLUP_ENABLED:
+            self.rollup.start()
+            print("OHLCV rollup started")
+            
+    async def stop_background_tasks(self):
+        await self.rollup.stop()
+        await self.writer.stop()
+        
+    async def flush(self):
+        if self.writer.depth:
+            await self.writer.flush()
+
+    def paused_writes(self):
+        return self.writer.paused()
+            
+    async def _insert(self, collection_name: str, data: dict):
+        # Hand off to the write-behind queue when it's running, otherwise
+        # write inline (tests, scripts).
+        if collection_name == "price_data":
+            self.rollup.mark(data["timestamp"])
+        if self.writer.running:
+            await self.writer.put(collection_name, data)
+        else:
+            collection = self.client[self.settings.DB_NAME][collection_name]
+            with MONGO_OP_LATENCY.labels(collection_name, "insert_one").time():
+                await collection.insert_one(data)
+            
+    async def save_ticks(self, ticks):
+        if not ticks:
+            return
         collection = self.client[self.settings.DB_NAME]["price_data"]
-        data = price_data.model_dump()
-        result = await collection.insert_one(data)
+        with MONGO_OP_LATENCY.labels("price_data", "insert_many").time():
+            await collection.insert_many([tick.to_document() for tick in ticks], ordered=False)
+        self.rollup.mark(min(tick.timestamp for tick in ticks))
+        self._mark_backfill(ticks)
+        for symbol in {tick.symbol for tick in ticks}:
+            self.price_cache.invalidate(symbol)
+            
+    async def _update_one(self, collection_name: str, query: dict, update_data: dict):
+        # The document may still be sitting in the write-behind queue
+        await self.flush()
+        collection = self.client[self.settings.DB_NAME][collection_name]
+        with MONGO_OP_LATENCY.labels(collection_name, "update_one").time():
+            result = await collection.update_one(query, {"$set": update_data})
+        return result.modified_count
         
-    async def save_trading_signal(self, signal: TradingSignal):
-        collection = self.client[self.settings.DB_NAME]["trading_signals"]
-        data = signal.model_dump()
-        result = await collection.insert_one(data)
+    async def _find_recent_ticks(self, symbol: str, limit: int):
+        collection = self.client[self.settings.DB_NAME]["price_data"]
+        cursor = collection.find({"symbol": symbol}).sort("timestamp", -1).limit(limit)
+        with MONGO_OP_LATENCY.labels("price_data", "find").time():
+            documents = await cursor.to_list(length=limit)
+        return [Tick.from_document(doc) for doc in documents]
         
-    async def save_order(self, order: Order):
-        collection = self.client[self.settings.DB_NAME]["orders"]
-        data = order.model_dump()
-        await collection.insert_one(data)
+    async def _find_ticks(self, symbol: str, start: datetime = None, end: datetime = None):
+        query = _range_query(symbol, start, end)
+        collection = self.client[self.settings.DB_NAME]["price_data"]
+        cursor = collection.find(query, {"_id": 0}).sort("timestamp", 1).batch_size(10000)
+        with MONGO_OP_LATENCY.labels("price_data", "find").time():
+            documents = await cursor.to_list(length=None)
+        return [Tick.from_document(doc) for doc in documents]
         
-    async def update_order(self, order_id: str, update_data: dict):
-        collection = self.client[self.settings.DB_NAME]["orders"]
-        await collection.update_one(
-            {"order_id": order_id},
-            {"$set": update_data}
-        )
+    async def get_price_series(self, symbol: str, start: datetime = None, end: datetime = None):
+        # Projected to the two columns a backtest needs
+        query = _range_query(symbol, start, end)
+        collection = self.client[self.settings.DB_NAME]["price_data"]
+        cursor = collection.find(query, {"_id": 0, "timestamp": 1, "price": 1}).sort("timestamp", 1).batch_size(10000)
+        with MONGO_OP_LATENCY.labels("price_data", "find").time():
+            return await cursor.to_list(length=None)
+            
+    async def iter_documents(self, collection_name: str, since: datetime = None, until: datetime = None,
+                             batch_size: int = 10_000):
+        query = {}
+        if since is not None:
+            query["$gt"] = since
+        if until is not None:
+            query["$lte"] = until
+        collection = self.client[self.settings.DB_NAME][collection_name]
+        cursor = collection.find({"timestamp": query} if query else {}, {"_id": 0}).sort("timestamp", 1).batch_size(batch_size)
+        batch = []
+        async for document in cursor:
+            batch.append(document)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+            
+    async def iter_history(self, collection_name: str, symbol: str = None, start: datetime = None, end: datetime = None,
+                           after=None, fields=None, batch_size: int = 1000):
+        query = _range_query(symbol, start, end)
+        if after is not None:
+            from bson import ObjectId
+            from bson.errors import InvalidId
+            timestamp, key = after
+            try:
+                key = ObjectId(key)
+            except InvalidId:
+                raise ValueError(f"Invalid cursor id: {key}")
+            query["$or"] = [{"timestamp": {"$gt": timestamp}}, {"timestamp": timestamp, "_id": {"$gt": key}}]
+        projection = {field: 1 for field in ("timestamp", *fields)} if fields else None
+        collection = self.client[self.settings.DB_NAME][collection_name]
+        cursor = collection.find(query, projection).sort([("timestamp", ASCENDING), ("_id", ASCENDING)])
+        # Without a symbol there is no index to sort on
+        cursor = cursor.batch_size(batch_size).allow_disk_use(not symbol)
+        batch = []
+        async for document in cursor:
+            document["id"] = str(document.pop("_id"))
+            batch.append(document)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+            
+    async def aggregate_stats(self):
+        db = self.client[self.settings.DB_NAME]
+        symbols = {}
+        async for row in db["trading_signals"].aggregate([
+            {"$group": {"_id": "$symbol", "total_signals": {"$sum": 1}}}
+        ]):
+            symbols.setdefault(row["_id"], {})["total_signals"] = row["total_signals"]
+        closed = {"$eq": ["$status", "CLOSED"]}
+        async for row in db["positions"].aggregate([
+            {"$group": {
+                "_id": "$symbol",
+                "total_positions": {"$sum": 1},
+                "closed_positions": {"$sum": {"$cond": [closed, 1, 0]}},
+                "total_pnl": {"$sum": {"$cond": [closed, {"$ifNull": ["$pnl", 0]}, 0]}}
+            }}
+        ]):
+            symbols.setdefault(row["_id"], {}).update(
+                total_positions=row["total_positions"],
+                closed_positions=row["closed_positions"],
+                total_pnl=float(row["total_pnl"])
+            )
+        return symbols
         
-    async def save_position(self, position: Position):
-        collection = self.client[self.settings.DB_NAME]["positions"]
-        data = position.model_dump()
-        await collection.insert_one(data)
+    async def get_order(self, order_id: str):
+        await self.flush()
+        document = await self.client[self.settings.DB_NAME]["orders"].find_one({"order_id": order_id}, {"_id": 0})
+        return Order(**document) if document else None
         
-    async def update_position(self, symbol: str, update_data: dict):
-        collection = self.client[self.settings.DB_NAME]["positions"]
-        await collection.update_one(
-            {"symbol": symbol, "status": "OPEN"},
-            {"$set": update_data}
+    async def get_open_position(self, symbol: str):
+        await self.flush()
+        document = await self.client[self.settings.DB_NAME]["positions"].find_one(
+            {"symbol": symbol, "status": "OPEN"}, {"_id": 0}
         )
+        return Position(**document) if document else None
         
-    async def get_recent_prices(self, symbol: str, limit: int = 200):
-        collection = self.client[self.settings.DB_NAME]["price_data"]
-        cursor = collection.find({"symbol": symbol}).sort("timestamp", -1).limit(limit)
-        documents = await cursor.to_list(length=limit)
-        return [PriceData(**doc) for doc in documents]
+    async def get_price_history(self, symbol: str, start: datetime, end: datetime, interval: int = 60):
+        # Read from the coarsest rollup whose bars divide `interval` and that
+        # has been rolled up past `end`; raw ticks are the fallback.
+        if end.tzinfo is None:
+            end = end.replace(tzinfo=timezone.utc)
+        if not self.rollup.watermarks:
+            await self.rollup.load_watermarks()
+        collection, fields = "price_data", RAW_FIELDS
+        for name, seconds, target, _ in reversed(RESOLUTIONS):
+            watermark = self.rollup.watermarks.get(name)
+            if interval % seconds == 0 and watermark is not None and watermark >= end:
+                collection, fields = target, BAR_FIELDS
+                break
+        match = {"symbol": symbol, "timestamp": {"$gte": start, "$lt": end}}
+        cursor = self.client[self.settings.DB_NAME][collection].aggregate(
+            ohlcv_pipeline(match, fields, interval), allowDiskUse=True
+        )
+        with MONGO_OP_LATENCY.labels(collection, "aggregate").time():
+            return [PriceBar(**doc) async for doc in cursor]
+
+def create_repository(backend: str = None):
+    backend = backend or settings.STORAGE_BACKEND
+    if backend == "mongo":
+        return Database()
+    if backend == "memory":
+        from app.services.memory_store import InMemoryRepository
+        return InMemoryRepository()
+    if backend == "sqlite":
+        from app.services.sqlite_store import SQLiteRepository
+        return SQLiteRepository()
+    raise ValueError(f"Unknown storage backend: {backend}")
 
-db = Database() 
\ No newline at end of file
+db = create_repository()
\ No newline at end of file
@@ -0,0 +1,186 @@
+import asyncio
+import secrets
+import signal
+import sys
+import threading
+import time
+import traceback
+from collections import Counter, deque
+from datetime import datetime, timezone
+from app.core.config import settings
+from app.core.metrics import LOOP_LAG, SLOW_CALLBACKS
+
+def frame_name(frame):
+    return f"{frame.f_globals.get('__name__', '?')}:{frame.f_code.co_qualname}"
+
+def collapse(frame):
+    # "root;...;leaf", the stack format flamegraph.pl and speedscope read
+    names = []
+    while frame is not None:
+        names.append(frame_name(frame))
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+def task_name(task):
+    if task is None:
+        return None
+    coro = task.get_coro()
+    return f"{task.get_name()} ({getattr(coro, '__qualname__', coro)})"
+
+class LoopMonitor:
+    # Two probes of the event loop. A timer coroutine measures how late it
+    # wakes up (event_loop_lag_seconds); its wake-ups are also a heartbeat
+    # for a watchdog thread, which, when the heartbeat is late by more than
+    # SLOW_CALLBACK_SECONDS, captures the loop thread's stack and current
+    # task while the loop is still blocked.
+    def __init__(self, interval: float = None, threshold: float = None, history: int = 50):
+        self.interval = interval or settings.LOOP_LAG_INTERVAL
+        self.threshold = threshold or settings.SLOW_CALLBACK_SECONDS
+        self.reports = deque(maxlen=history)
+        self.loop = None
+        self.thread_id = None
+        self.heartbeat = time.monotonic()
+        self._task = None
+        self._watchdog = None
+        self._stopped = threading.Event()
+        
+    @property
+    def running(self):
+        return self._task is not None and not self._task.done()
+        
+    def start(self):
+        if self.running:
+            return
+        self.loop = asyncio.get_running_loop()
+        self.thread_id = threading.get_ident()
+        self.heartbeat = time.monotonic()
+        self._stopped.clear()
+        self._task = asyncio.create_task(self._sample())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+        
+    async def stop(self):
+        self._stopped.set()
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._watchdog is not None:
+            await asyncio.to_thread(self._watchdog.join)
+            self._watchdog = None
+            
+    async def _sample(self):
+        while True:
+            start = time.monotonic()
+            await asyncio.sleep(self.interval)
+            self.heartbeat = now = time.monotonic()
+            LOOP_LAG.observe(max(0.0, now - start - self.interval))
+            
+    def _watch(self):
+        reported = None  # Heartbeat of the stall already reported
+        while not self._stopped.wait(self.threshold / 2):
+            heartbeat = self.heartbeat
+            blocked = time.monotonic() - heartbeat - self.interval
+            if blocked > self.threshold and heartbeat != reported:
+                reported = heartbeat
+                self.report(blocked)
+                
+    def report(self, blocked: float):
+        frame = sys._current_frames().get(self.thread_id)
+        if frame is None:
+            return None
+        report = {
+            "timestamp": datetime.now(tz=timezone.utc),
+            "blocked_seconds": round(blocked, 4),
+            # Reading another thread's current task is a plain dict lookup
+            "task": task_name(asyncio.current_task(self.loop)),
+            "stack": traceback.format_stack(frame)[-20:],
+        }
+        self.reports.append(report)
+        SLOW_CALLBACKS.inc()
+        print(f"Event loop blocked for {blocked:.3f}s in {report['task']}:\n{''.join(report['stack'])}")
+        return report
+
+class SamplingProfiler:
+    # Wall-clock sampler: a helper thread reads thread stacks (run() blocks,
+    # so call it off the loop) and counts identical ones. Only the loop
+    # thread by default; with thread_id None every other thread too,
+    # prefixed with the thread's name. The helper only gets the GIL when
+    # the sampled thread drops it, so stacks between two awaits are
+    # under-counted next to the selector; CPUProfiler doesn't have that bias.
+    def __init__(self, thread_id: int = None, hz: int = 100):
+        self.thread_id = thread_id
+        self.interval = 1 / hz
+        
+    def run(self, seconds: float):
+        counts = Counter()
+        me = threading.get_ident()
+        deadline = time.monotonic() + seconds
+        while (now := time.monotonic()) < deadline:
+            names = {thread.ident: thread.name for thread in threading.enumerate()} if self.thread_id is None else {}
+            for ident, frame in sys._current_frames().items():
+                if ident == me or (self.thread_id is not None and ident != self.thread_id):
+                    continue
+                stack = collapse(frame)
+                counts[f"{names.get(ident, ident)};{stack}" if self.thread_id is None else stack] += 1
+            time.sleep(max(0.0, self.interval - (time.monotonic() - now)))
+        return counts
+
+class CPUProfiler:
+    # SIGPROF fires every 1/hz seconds of process CPU time and its handler
+    # records the main thread's stack at the bytecode it interrupted, so an
+    # idle loop costs nothing and busy code is sampled where it runs.
+    # Signal handlers only run on the main thread, where uvicorn runs the loop.
+    # The timer counts CPU of every thread (strategy and to_thread pools,
+    # psutil reads), but the handler only sees the loop: a tick while the
+    # loop waits in the selector is another thread's, and is counted under
+    # OTHER_THREADS rather than as loop time. Ticks arriving before the loop
+    # wakes up collapse into one, so that bucket is a lower bound. CPU other
+    # threads use while the loop is busy is still charged to the loop's stack.
+    OTHER_THREADS = "[other threads]"
+
+    def __init__(self, hz: int = 100):
+        self.interval = 1 / hz
+        
+    @staticmethod
+    def available():
+        return hasattr(signal, "setitimer") and threading.current_thread() is threading.main_thread()
+        
+    async def run(self, seconds: float):
+        counts = Counter()
+        
+        def sample(signum, frame):
+            idle = frame.f_code.co_name == "select" and frame.f_code.co_filename.endswith("selectors.py")
+            counts[self.OTHER_THREADS if idle else collapse(frame)] += 1
+            
+        previous = signal.signal(signal.SIGPROF, sample)
+        signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            signal.setitimer(signal.ITIMER_PROF, 0)
+            signal.signal(signal.SIGPROF, previous)
+        return counts
+
+def format_collapsed(counts: Counter):
+    return "".join(f"{stack} {count}\n" for stack, count in counts.most_common())
+
+def authorized(token: str = None):
+    # /debug endpoints are off unless PROFILE_TOKEN is set
+    return bool(settings.PROFILE_TOKEN) and token is not None and secrets.compare_digest(token, settings.PROFILE_TOKEN)
+
+_profiling = asyncio.Lock()
+
+async def profile_loop(seconds: float, hz: int = 100, mode: str = "cpu", all_threads: bool = False):
+    # Collapsed stacks of the calling loop over `seconds`, one profile at a
+    # time. "cpu" falls back to "wall" when the loop isn't on the main thread.
+    if _profiling.locked():
+        raise RuntimeError("A profile is already running")
+    seconds = min(seconds, settings.PROFILE_MAX_SECONDS)
+    async with _profiling:
+        if mode == "cpu" and not all_threads and CPUProfiler.available():
+            return await CPUProfiler(hz).run(seconds)
+        profiler = SamplingProfiler(None if all_threads else threading.get_ident(), hz)
+        return await asyncio.to_thread(profiler.run, seconds)
+
+loop_monitor = LoopMonitor()
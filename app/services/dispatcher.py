@@ -0,0 +1,92 @@
+import asyncio
+import time
+from app.core.metrics import INGEST_QUEUE_DEPTH, INGEST_QUEUE_LAG, INGEST_CONFLATED
+
+def route_key(frame):
+    # Cheap routing without decoding the whole frame: combined streams start
+    # with the stream name, raw streams carry the symbol in "s".
+    if isinstance(frame, dict):
+        return frame.get('stream') or frame.get('s', '')
+    for marker in ('"stream":"', '"s":"'):
+        start = frame.find(marker)
+        if start != -1:
+            start += len(marker)
+            return frame[start:frame.find('"', start)]
+    return ''
+
+def is_closed(frame):
+    if isinstance(frame, dict):
+        data = frame.get('data', frame)
+        return bool(data.get('k', {}).get('x'))
+    return '"x":true' in frame
+
+class _Slot:
+    __slots__ = ("key", "frame", "final", "enqueued_at")
+    
+    def __init__(self, key, frame, final):
+        self.key = key
+        self.frame = frame
+        self.final = final
+        self.enqueued_at = time.perf_counter()
+
+class FrameDispatcher:
+    def __init__(self, handler, workers: int = 4, max_pending: int = 10000, conflate: bool = False):
+        self.handler = handler
+        self.conflate = conflate
+        # Each key always lands on the same worker, which keeps per-symbol order
+        self.queues = [asyncio.Queue(maxsize=max(1, max_pending // workers)) for _ in range(workers)]
+        # Slots still waiting for a worker; only used in conflate mode
+        self.pending = {}
+        self.conflated = 0
+        self._tasks = []
+        
+    @property
+    def running(self):
+        return any(not task.done() for task in self._tasks)
+        
+    @property
+    def depth(self):
+        return sum(queue.qsize() for queue in self.queues)
+        
+    def start(self):
+        if not self.running:
+            self._tasks = [asyncio.create_task(self._work(queue)) for queue in self.queues]
+            
+    async def stop(self, drain: bool = True):
+        if drain and self.running:
+            await asyncio.gather(*(queue.join() for queue in self.queues))
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        
+    async def put(self, frame):
+        key = route_key(frame)
+        if self.conflate:
+            slot = self.pending.get(key)
+            if slot is not None and not slot.final:
+                # A closed kline is never overwritten, so no final candle is lost
+                slot.frame = frame
+                slot.final = is_closed(frame)
+                self.conflated += 1
+                INGEST_CONFLATED.inc()
+                return
+            slot = self.pending[key] = _Slot(key, frame, is_closed(frame))
+        else:
+            slot = _Slot(key, frame, True)
+        await self.queues[hash(key) % len(self.queues)].put(slot)
+        INGEST_QUEUE_DEPTH.set(self.depth)
+        
+    async def _work(self, queue):
+        while True:
+            slot = await queue.get()
+            if self.pending.get(slot.key) is slot:
+                del self.pending[slot.key]
+            INGEST_QUEUE_LAG.observe(time.perf_counter() - slot.enqueued_at)
+            try:
+                await self.handler(slot.frame)
+            except Exception as e:
+                print(f"Error processing frame: {str(e)}")
+            finally:
+                queue.task_done()
+                INGEST_QUEUE_DEPTH.set(self.depth)
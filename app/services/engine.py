@@ -0,0 +1,378 @@
+import asyncio
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from app.core.config import settings
+from app.core.metrics import STAGE_LATENCY, TRADING_SIGNALS
+from app.models.models import TradingSignal, Order, Position
+from app.services.broadcast import broadcaster
+from app.services.exchange import new_order_id, paper_exchange
+from app.services.indicators import IndicatorGraph
+from app.services.offload import EXECUTOR_MODES, SharedWindow, strategy_executor
+
+def indicator_name(key: tuple):
+    # ("bollinger", 20, 2.0) -> "bollinger_20_2.0"
+    return "_".join(str(part) for part in key)
+
+class Strategy:
+    # One strategy on one symbol, holding its own position. `name` tells
+    # the positions of strategies sharing a symbol apart; the default SMA
+    # crossover has none.
+    name = None
+
+    def __init__(self, database, exchange=None):
+        self.db = database
+        # Orders go to the simulated exchange when paper trading, otherwise
+        # they are recorded as filled at the signal price
+        self.exchange = exchange if exchange is not None else (paper_exchange if settings.PAPER_TRADING else None)
+        self.current_position = None
+
+    async def record_signal(self, symbol: str, signal_type: str, price: float, timestamp: datetime = None, **fields):
+        TRADING_SIGNALS.labels(symbol, signal_type).inc()
+        signal = TradingSignal(
+            timestamp=timestamp or datetime.now(tz=timezone.utc),
+            symbol=symbol,
+            signal_type=signal_type,
+            price=price,
+            strategy=self.name,
+            **fields
+        )
+        print(f"Trading signal saved for {symbol} at {price}")
+        await self.db.save_trading_signal(signal)
+        broadcaster.publish_signal(signal)
+        return signal
+
+    async def place_order(self, signal: TradingSignal, quantity: float):
+        if self.exchange is not None:
+            return await self.exchange.submit(signal.symbol, signal.signal_type, quantity)
+        return Order(
+            order_id=new_order_id("mock"),
+            timestamp=datetime.now(tz=timezone.utc),
+            symbol=signal.symbol,
+            side=signal.signal_type,
+            quantity=quantity,
+            price=signal.price,
+            status="FILLED",
+            filled_quantity=quantity,
+            filled_price=signal.price,
+            fee=0.0
+        )
+
+    async def execute_signal(self, signal: TradingSignal):
+        position = self.current_position
+        if signal.signal_type == "SELL" and position:
+            quantity = position.quantity
+        elif signal.signal_type == "SELL" and self.exchange is not None:
+            return None  # Nothing to sell; the paper account doesn't go short
+        else:
+            quantity = settings.ORDER_QUANTITY
+        # Only the exchange round trip is timed; persisting the order and
+        # position is covered by the database latency metric
+        with STAGE_LATENCY.labels("order", signal.symbol).time():
+            order = await self.place_order(signal, quantity)
+        await self.db.save_order(order)
+        broadcaster.publish_order(order)
+        if not order.filled_quantity:
+            return order
+
+        if signal.signal_type == "BUY":
+            position = Position(
+                symbol=signal.symbol,
+                side="LONG",
+                entry_price=order.filled_price,
+                quantity=order.filled_quantity,
+                timestamp=order.timestamp,
+                status="OPEN",
+                strategy=self.name,
+                fees=order.fee
+            )
+            await self.db.save_position(position)
+            self.current_position = position
+        elif signal.signal_type == "SELL" and position:
+            # Entry fees are charged pro rata to the quantity sold
+            sold = order.filled_quantity
+            entry_fees = (position.fees or 0.0) * sold / position.quantity
+            pnl = (position.pnl or 0.0) + (order.filled_price - position.entry_price) * sold - entry_fees - order.fee
+            remaining = position.quantity - sold
+            if remaining > 1e-12:
+                # Partly filled exit: the rest of the position stays open
+                update = {"quantity": remaining, "fees": (position.fees or 0.0) - entry_fees, "pnl": pnl}
+                await self.db.update_position(signal.symbol, update, strategy=self.name)
+                self.current_position = position.model_copy(update=update)
+            else:
+                await self.db.update_position(
+                    signal.symbol,
+                    {
+                        "status": "CLOSED",
+                        "pnl": pnl
+                    },
+                    strategy=self.name
+                )
+                self.current_position = None
+        return order
+
+class GraphStrategy(Strategy, ABC):
+    # A strategy reading its indicators from a shared IndicatorGraph.
+    # Subclasses list their nodes in `indicators` and compare the current
+    # and previous values in `evaluate`.
+    kind = None
+
+    def __init__(self, database, name: str = None):
+        super().__init__(database)
+        self.name = name or indicator_name((self.kind, *self.params()))
+        self.indicators = ()
+
+    def params(self):
+        return ()
+
+    @abstractmethod
+    def evaluate(self, graph: IndicatorGraph):
+        raise NotImplementedError
+
+    def signal_fields(self, graph: IndicatorGraph):
+        return {"indicators": {indicator_name(key): graph[key] for key in self.indicators}}
+
+    def check(self, graph: IndicatorGraph):
+        # Nodes can report ready a tick before they have a previous value
+        # (RSI needs `period` changes first)
+        if not graph.ready(*self.indicators) or any(graph.prev.get(key) is None for key in self.indicators):
+            return None
+        return self.evaluate(graph)
+
+def crossed(prev_fast: float, prev_slow: float, fast: float, slow: float):
+    if prev_fast < prev_slow and fast > slow:
+        return "BUY"
+    if prev_fast > prev_slow and fast < slow:
+        return "SELL"
+    return None
+
+class MovingAverageCross(GraphStrategy):
+    average = None
+
+    def __init__(self, database, fast: int, slow: int, name: str = None):
+        self.fast, self.slow = fast, slow
+        super().__init__(database, name)
+        self.indicators = ((self.average, fast), (self.average, slow))
+
+    def params(self):
+        return (self.fast, self.slow)
+
+    def evaluate(self, graph: IndicatorGraph):
+        fast, slow = self.indicators
+        return crossed(graph.prev[fast], graph.prev[slow], graph[fast], graph[slow])
+
+class SMACross(MovingAverageCross):
+    kind = "sma_cross"
+    average = "sma"
+
+    def signal_fields(self, graph: IndicatorGraph):
+        fast, slow = self.indicators
+        return {**super().signal_fields(graph), "short_sma": graph[fast], "long_sma": graph[slow]}
+
+class EMACross(MovingAverageCross):
+    kind = "ema_cross"
+    average = "ema"
+
+class RSIReversion(GraphStrategy):
+    # Buys when RSI climbs back over `lower`, sells when it drops back under `upper`
+    kind = "rsi"
+
+    def __init__(self, database, period: int = 14, lower: float = 30.0, upper: float = 70.0, name: str = None):
+        self.period, self.lower, self.upper = period, lower, upper
+        super().__init__(database, name)
+        self.indicators = (("rsi", period),)
+
+    def params(self):
+        return (self.period, self.lower, self.upper)
+
+    def evaluate(self, graph: IndicatorGraph):
+        key = self.indicators[0]
+        prev, rsi = graph.prev[key], graph[key]
+        if prev < self.lower <= rsi:
+            return "BUY"
+        if prev > self.upper >= rsi:
+            return "SELL"
+        return None
+
+class BollingerReversion(GraphStrategy):
+    # Buys when the price comes back inside the lower band, sells when it
+    # comes back inside the upper band
+    kind = "bollinger"
+
+    def __init__(self, database, window: int = 20, width: float = 2.0, name: str = None):
+        self.window, self.width = window, float(width)
+        super().__init__(database, name)
+        self.indicators = (("price",), ("bollinger", window, self.width))
+
+    def params(self):
+        return (self.window, self.width)
+
+    def evaluate(self, graph: IndicatorGraph):
+        price, bands = self.indicators
+        (prev_lower, _, prev_upper), (lower, _, upper) = graph.prev[bands], graph[bands]
+        if graph.prev[price] < prev_lower and graph[price] >= lower:
+            return "BUY"
+        if graph.prev[price] > prev_upper and graph[price] <= upper:
+            return "SELL"
+        return None
+
+class WindowStrategy(Strategy):
+    # Recomputed from the raw price window on every tick by `compute`, a
+    # module-level function of (prices, *params) returning (signal, value).
+    # For work too heavy for the event loop: `executor` picks inline, a
+    # thread or a worker process, which reads the window from shared memory.
+    kind = None
+    compute = None
+
+    def __init__(self, database, window: int, executor: str = None, name: str = None):
+        super().__init__(database)
+        self.window = window
+        self.executor = executor or settings.STRATEGY_EXECUTOR
+        if self.executor not in EXECUTOR_MODES:
+            raise ValueError(f"Unknown executor mode: {self.executor}")
+        self.name = name or indicator_name((self.kind, *self.params()))
+        self.indicators = ()
+        # One more price than the window, to compare against the previous tick
+        self.lookback = window + 1
+        self.value = None
+
+    def params(self):
+        return (self.window,)
+
+    def signal_fields(self, graph: IndicatorGraph):
+        return {"indicators": {self.kind: self.value}}
+
+    async def check_window(self, executor, window: SharedWindow):
+        if window.count < self.lookback:
+            return None
+        signal, self.value = await executor.run(self.executor, type(self).compute, window, *self.params())
+        return signal
+
+def zscore_signal(prices, window: int, entry: float):
+    # z-score of the last price against the trailing window ending at (and
+    # including) it, for this tick and the previous one
+    import numpy as np
+    windows = np.lib.stride_tricks.sliding_window_view(prices[-window - 1:], window)
+    means, stds = windows.mean(axis=1), windows.std(axis=1)
+    prev, current = np.divide(windows[:, -1] - means, stds, out=np.zeros(2), where=stds > 0)
+    signal = None
+    if prev < -entry <= current:
+        signal = "BUY"
+    elif prev > entry >= current:
+        signal = "SELL"
+    return signal, float(current)
+
+class ZScoreReversion(WindowStrategy):
+    # Buys when the price climbs back over `entry` deviations below the
+    # window mean, sells when it falls back under `entry` above it
+    kind = "zscore"
+    compute = staticmethod(zscore_signal)
+
+    def __init__(self, database, window: int = 100, entry: float = 2.0, executor: str = None, name: str = None):
+        self.entry = float(entry)
+        super().__init__(database, window, executor, name)
+
+    def params(self):
+        return (self.window, self.entry)
+
+STRATEGY_TYPES = {
+    "sma_cross": SMACross,
+    "ema_cross": EMACross,
+    "rsi": RSIReversion,
+    "bollinger": BollingerReversion,
+    "zscore": ZScoreReversion,
+}
+
+def build_strategy(database, config: dict):
+    # {"type": "ema_cross", "fast": 12, "slow": 26, "name": "optional"}
+    params = dict(config)
+    kind = params.pop("type")
+    if kind not in STRATEGY_TYPES:
+        raise ValueError(f"Unknown strategy type: {kind}")
+    return STRATEGY_TYPES[kind](database, **params)
+
+class SymbolEngine:
+    # Every configured strategy on one symbol over one indicator graph: a
+    # tick updates each distinct indicator once, then each strategy only
+    # compares a few values, so adding variants is close to free until they
+    # signal. Window strategies share one shared-memory price window and
+    # run concurrently on the executor.
+    def __init__(self, database, symbol: str, configs, executor=None):
+        self.db = database
+        self.symbol = symbol
+        self.executor = executor or strategy_executor
+        self.strategies = [build_strategy(database, config) for config in configs]
+        names = [strategy.name for strategy in self.strategies]
+        if len(set(names)) != len(names):
+            raise ValueError(f"Strategy names must be unique: {names}")
+        self.graph_strategies = [strategy for strategy in self.strategies if isinstance(strategy, GraphStrategy)]
+        self.window_strategies = [strategy for strategy in self.strategies if isinstance(strategy, WindowStrategy)]
+        self.graph = None
+        self.window = None
+
+    def build_graph(self):
+        graph = IndicatorGraph()
+        for strategy in self.graph_strategies:
+            for key in strategy.indicators:
+                graph.add(key)
+        return graph
+
+    @property
+    def lookback(self):
+        graph = self.graph if self.graph is not None else self.build_graph()
+        return max([graph.lookback, *(strategy.lookback for strategy in self.window_strategies)])
+
+    def seed(self, prices):
+        # `prices` must be in chronological order (oldest first)
+        prices = list(prices)
+        self.graph = self.build_graph().seed(prices)
+        if self.window_strategies:
+            if self.window is None:
+                self.window = SharedWindow(max(strategy.lookback for strategy in self.window_strategies))
+            self.window.reset(prices[-self.window.size:])
+        return self.graph
+
+    async def warm_up(self):
+        # get_recent_ticks returns the newest tick first
+        ticks = await self.db.get_recent_ticks(self.symbol, self.lookback + 1)
+        return self.seed(tick.price for tick in reversed(ticks))
+
+    def update(self, price: float):
+        with STAGE_LATENCY.labels("indicators", self.symbol).time():
+            self.graph.update(price)
+        if self.window is not None:
+            self.window.push(price)
+
+    async def check_signals(self, price: float, timestamp: datetime = None):
+        # Stored signals, paired with the strategy that raised each
+        with STAGE_LATENCY.labels("signal", self.symbol).time():
+            fired = [(strategy, strategy.check(self.graph)) for strategy in self.graph_strategies]
+            if self.window_strategies:
+                results = await asyncio.gather(*(
+                    strategy.check_window(self.executor, self.window) for strategy in self.window_strategies
+                ))
+                fired += zip(self.window_strategies, results)
+        signals = []
+        for strategy, signal_type in fired:
+            if signal_type:
+                signal = await strategy.record_signal(
+                    self.symbol, signal_type, price, timestamp, **strategy.signal_fields(self.graph)
+                )
+                signals.append((strategy, signal))
+        return signals
+
+    async def on_tick(self, price: float, timestamp: datetime = None):
+        if self.graph is None:
+            # As with the default strategy, the stored history already
+            # contains this tick
+            await self.warm_up()
+        else:
+            self.update(price)
+        signals = await self.check_signals(price, timestamp)
+        for strategy, signal in signals:
+            await strategy.execute_signal(signal)
+        return [signal for _, signal in signals]
+
+    def close(self):
+        if self.window is not None:
+            self.window.close()
+            self.window = None
@@ -0,0 +1,240 @@
+import asyncio
+import itertools
+import uuid
+from bisect import insort
+from collections import defaultdict
+from datetime import datetime, timezone
+from app.core.config import settings
+from app.models.models import Order
+from app.services.database import db
+from app.services.broadcast import broadcaster
+
+# Order ids are unique within a process by the counter and across
+# processes by the session prefix
+SESSION = uuid.uuid4().hex[:8]
+_order_seq = itertools.count(1)
+
+def new_order_id(prefix: str = "paper"):
+    return f"{prefix}_{SESSION}_{next(_order_seq)}"
+
+class BookSide:
+    # Price levels of one side, best first
+    def __init__(self, bids: bool):
+        self.bids = bids
+        self.sizes = {}
+        self.prices = []  # Ascending
+
+    def set(self, price: float, quantity: float):
+        if quantity <= 0:
+            if self.sizes.pop(price, None) is not None:
+                self.prices.remove(price)
+        else:
+            if price not in self.sizes:
+                insort(self.prices, price)
+            self.sizes[price] = quantity
+
+    def replace(self, levels):
+        self.sizes = {float(price): float(quantity) for price, quantity in levels if float(quantity) > 0}
+        self.prices = sorted(self.sizes)
+
+    @property
+    def best(self):
+        if not self.prices:
+            return None
+        return self.prices[-1] if self.bids else self.prices[0]
+
+    def levels(self):
+        return reversed(self.prices) if self.bids else iter(self.prices)
+
+    def crosses(self, price: float, limit: float = None):
+        # Whether an order taking this side at `limit` can trade at `price`
+        if limit is None:
+            return True
+        return price >= limit if self.bids else price <= limit
+
+    def take(self, quantity: float, limit: float = None):
+        # Consumes up to `quantity` from the best levels, returns [(price, qty)]
+        fills = []
+        for price in list(self.levels()):
+            if quantity <= 0 or not self.crosses(price, limit):
+                break
+            size = self.sizes[price]
+            traded = min(size, quantity)
+            fills.append((price, traded))
+            quantity -= traded
+            self.set(price, size - traded)
+        return fills
+
+class OrderBook:
+    def __init__(self, symbol: str):
+        self.symbol = symbol
+        self.bids = BookSide(bids=True)
+        self.asks = BookSide(bids=False)
+        # False while the book is synthesized from prices
+        self.from_depth = False
+
+    def apply_snapshot(self, bids, asks):
+        # Partial book depth: [[price, qty], ...] as strings or numbers
+        self.bids.replace(bids)
+        self.asks.replace(asks)
+        self.from_depth = True
+
+    def apply_diff(self, bids, asks):
+        for price, quantity in bids:
+            self.bids.set(float(price), float(quantity))
+        for price, quantity in asks:
+            self.asks.set(float(price), float(quantity))
+        self.from_depth = True
+
+    def synthesize(self, price: float, spread_bps: float, step_bps: float, level_quantity: float, levels: int):
+        # Book of `levels` equal levels per side around a traded price, for
+        # symbols without a depth feed and for backtests
+        half = spread_bps / 2
+        self.bids.replace((price * (1 - (half + i * step_bps) / 10_000), level_quantity) for i in range(levels))
+        self.asks.replace((price * (1 + (half + i * step_bps) / 10_000), level_quantity) for i in range(levels))
+
+    def side(self, order_side: str):
+        # The side an order of `order_side` trades against
+        return self.asks if order_side == "BUY" else self.bids
+
+    @property
+    def mid(self):
+        bid, ask = self.bids.best, self.asks.best
+        if bid is None or ask is None:
+            return bid or ask
+        return (bid + ask) / 2
+
+class SimulatedExchange:
+    # Paper trading venue. Market orders walk the book and consume the
+    # liquidity they take until the next depth update, so bursts of orders
+    # see slippage; whatever the book can't fill expires. Limit orders fill
+    # what crosses on arrival and rest for the remainder, filling at their
+    # limit as later books cross them. Fees are charged on the filled
+    # notional, taker or maker. Symbols without a depth feed trade against a
+    # synthetic book around the last price.
+    def __init__(self, database=None, taker_fee: float = None, maker_fee: float = None, latency_ms: float = None,
+                 spread_bps: float = None, step_bps: float = None, level_quantity: float = None, levels: int = None):
+        self.db = database
+        self.taker_fee = settings.PAPER_TAKER_FEE if taker_fee is None else taker_fee
+        self.maker_fee = settings.PAPER_MAKER_FEE if maker_fee is None else maker_fee
+        self.latency = (settings.PAPER_LATENCY_MS if latency_ms is None else latency_ms) / 1000
+        self.spread_bps = settings.PAPER_SPREAD_BPS if spread_bps is None else spread_bps
+        self.step_bps = settings.PAPER_STEP_BPS if step_bps is None else step_bps
+        self.level_quantity = level_quantity or settings.PAPER_LEVEL_QUANTITY
+        self.levels = levels or settings.PAPER_BOOK_LEVELS
+        self.books = {}
+        self.resting = defaultdict(dict)  # symbol -> {order_id: Order}
+
+    def book(self, symbol: str):
+        book = self.books.get(symbol)
+        if book is None:
+            book = self.books[symbol] = OrderBook(symbol)
+        return book
+
+    # Market data
+
+    def apply_depth(self, symbol: str, bids, asks, snapshot: bool = True):
+        book = self.book(symbol)
+        if snapshot:
+            book.apply_snapshot(bids, asks)
+        else:
+            book.apply_diff(bids, asks)
+        return self.match_resting(symbol)
+
+    def apply_price(self, symbol: str, price: float):
+        book = self.book(symbol)
+        if not book.from_depth:
+            book.synthesize(price, self.spread_bps, self.step_bps, self.level_quantity, self.levels)
+        return self.match_resting(symbol)
+
+    # Orders
+
+    def new_order(self, symbol: str, side: str, quantity: float, order_type: str = "MARKET", price: float = None):
+        return Order(
+            order_id=new_order_id(),
+            timestamp=datetime.now(tz=timezone.utc),
+            symbol=symbol,
+            side=side,
+            quantity=quantity,
+            price=price if price is not None else (self.book(symbol).mid or 0.0),
+            status="NEW",
+            order_type=order_type,
+            filled_quantity=0.0,
+            fee=0.0
+        )
+
+    def _fill(self, order: Order, fills, fee_rate: float):
+        traded = sum(quantity for _, quantity in fills)
+        if not traded:
+            return
+        notional = sum(price * quantity for price, quantity in fills)
+        filled = order.filled_quantity + traded
+        order.filled_price = ((order.filled_price or 0.0) * order.filled_quantity + notional) / filled
+        order.filled_quantity = filled
+        order.fee += notional * fee_rate
+
+    def execute(self, order: Order):
+        # Matches an order as it reaches the exchange; synchronous, for backtests
+        limit = order.price if order.order_type == "LIMIT" else None
+        side = self.book(order.symbol).side(order.side)
+        self._fill(order, side.take(order.quantity - order.filled_quantity, limit), self.taker_fee)
+        if order.filled_quantity >= order.quantity:
+            order.status = "FILLED"
+        elif limit is None:
+            order.status = "EXPIRED"
+        else:
+            order.status = "PARTIALLY_FILLED" if order.filled_quantity else "NEW"
+            self.resting[order.symbol][order.order_id] = order
+        return order
+
+    async def submit(self, symbol: str, side: str, quantity: float, order_type: str = "MARKET", price: float = None):
+        order = self.new_order(symbol, side, quantity, order_type, price)
+        if self.latency:
+            # Time on the wire to the matching engine
+            await asyncio.sleep(self.latency)
+        return self.execute(order)
+
+    def cancel(self, symbol: str, order_id: str):
+        order = self.resting[symbol].pop(order_id, None)
+        if order is not None:
+            order.status = "CANCELED"
+        return order
+
+    def match_resting(self, symbol: str):
+        # Resting limits the current book crosses fill at their own price
+        updated = []
+        for order_id, order in list(self.resting[symbol].items()):
+            side = self.book(symbol).side(order.side)
+            fills = side.take(order.quantity - order.filled_quantity, order.price)
+            if not fills:
+                continue
+            self._fill(order, [(order.price, quantity) for _, quantity in fills], self.maker_fee)
+            if order.filled_quantity >= order.quantity:
+                order.status = "FILLED"
+                del self.resting[symbol][order_id]
+            else:
+                order.status = "PARTIALLY_FILLED"
+            updated.append(order)
+        return updated
+
+    # Live paper trading: market data from the socket, fills persisted
+
+    async def on_depth(self, symbol: str, bids, asks, snapshot: bool = True):
+        await self.persist(self.apply_depth(symbol, bids, asks, snapshot))
+
+    async def on_price(self, symbol: str, price: float):
+        await self.persist(self.apply_price(symbol, price))
+
+    async def persist(self, orders):
+        # Fills of resting limits, to storage and live stream clients
+        for order in orders:
+            broadcaster.publish_order(order)
+            if self.db is not None:
+                await self.db.update_order(order.order_id, {
+                    "status": order.status,
+                    "filled_quantity": order.filled_quantity,
+                    "filled_price": order.filled_price,
+                    "fee": order.fee
+                })
+
+paper_exchange = SimulatedExchange(database=db)
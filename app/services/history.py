@@ -0,0 +1,108 @@
+import io
+import zlib
+from contextlib import aclosing
+from datetime import datetime
+from typing import get_args
+from app.core.config import settings
+from app.core.serialization import dumps
+from app.models.models import KlineData, TradingSignal, Order, Position
+from app.services.repository import as_utc
+
+# API name -> (collection, model describing its fields)
+COLLECTIONS = {
+    "prices": ("price_data", KlineData),
+    "signals": ("trading_signals", TradingSignal),
+    "orders": ("orders", Order),
+    "positions": ("positions", Position),
+}
+
+FORMATS = ("json", "ndjson", "arrow")
+MEDIA_TYPES = {
+    "json": "application/json",
+    "ndjson": "application/x-ndjson",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+
+KINDS = {datetime: "timestamp", float: "float", int: "int", str: "string", dict: "json"}
+
+def _kind(annotation):
+    # Optional[float] -> "float"
+    types = [arg for arg in get_args(annotation) if arg is not type(None)] or [annotation]
+    return KINDS[types[0]]
+
+def parse_fields(name: str, fields=None):
+    # Requested projection, checked against the collection's model
+    if not fields:
+        return None
+    model = COLLECTIONS[name][1]
+    unknown = set(fields) - set(model.model_fields) - {"id"}
+    if unknown:
+        raise ValueError(f"Unknown {name} fields: {', '.join(sorted(unknown))}")
+    return [field for field in fields if field not in ("id", "timestamp")]
+
+def arrow_columns(name: str, fields=None):
+    model = COLLECTIONS[name][1]
+    columns = {"id": "string", "timestamp": "timestamp"}
+    for field in fields or model.model_fields:
+        columns.setdefault(field, _kind(model.model_fields[field].annotation))
+    return columns
+
+async def ndjson_chunks(batches):
+    async for batch in batches:
+        yield "".join(dumps(document) + "\n" for document in batch).encode()
+
+def _drain(sink: io.BytesIO):
+    chunk = sink.getvalue()
+    sink.seek(0)
+    sink.truncate()
+    return chunk
+
+async def arrow_chunks(batches, name: str, fields=None):
+    # An Arrow IPC stream, one record batch per storage batch
+    import pyarrow as pa
+    from app.services.archive import schema, to_table
+    table, _ = COLLECTIONS[name]
+    columns = arrow_columns(name, fields)
+    sink = io.BytesIO()
+    writer = pa.ipc.new_stream(sink, schema(table, columns))
+    async for batch in batches:
+        for record_batch in to_table(table, batch, columns).to_batches():
+            writer.write_batch(record_batch)
+        yield _drain(sink)
+    writer.close()
+    yield _drain(sink)
+
+async def gzip_chunks(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # 31: gzip container
+    async for chunk in chunks:
+        # A sync flush per chunk sends each batch now instead of holding it
+        # for a full deflate block
+        yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
+
+async def export(database, name: str, symbol: str = None, start: datetime = None, end: datetime = None,
+                 after=None, fields=None, fmt: str = "ndjson", compress: bool = False):
+    # Every row from `after` on, read from storage a batch at a time, so the
+    # memory used doesn't grow with the size of the export
+    table, _ = COLLECTIONS[name]
+    start, end = (as_utc(moment) if moment else None for moment in (start, end))
+    batches = database.iter_history(table, symbol, start, end, after, fields, settings.HISTORY_BATCH_SIZE)
+    async with aclosing(batches):
+        chunks = arrow_chunks(batches, name, fields) if fmt == "arrow" else ndjson_chunks(batches)
+        if compress:
+            chunks = gzip_chunks(chunks)
+        async for chunk in chunks:
+            yield chunk
+
+async def primed(chunks):
+    # Runs a stream up to its first chunk, so that bad parameters raise
+    # before the response has started
+    try:
+        first = await chunks.__anext__()
+    except StopAsyncIteration:
+        first = b""
+    async def stream():
+        yield first
+        async for chunk in chunks:
+            yield chunk
+    return stream()
@@ -0,0 +1,266 @@
+class RollingSMA:
+    # Re-sum the ring buffer every `resync_interval` updates so floating point
+    # drift in the running sum can't accumulate over a long-running process.
+    resync_interval = 10_000
+
+    def __init__(self, window: int):
+        if window <= 0:
+            raise ValueError("window must be a positive integer")
+        self.window = window
+        self._buffer = [0.0] * window
+        self._index = 0
+        self._count = 0
+        self._sum = 0.0
+        self._updates = 0
+
+    @property
+    def count(self):
+        return self._count
+
+    @property
+    def is_full(self):
+        return self._count == self.window
+
+    @property
+    def value(self):
+        if not self._count:
+            return None
+        return self._sum / self._count
+
+    def update(self, price: float):
+        if self._count == self.window:
+            self._sum -= self._buffer[self._index]
+        else:
+            self._count += 1
+        self._buffer[self._index] = price
+        self._sum += price
+        self._index = (self._index + 1) % self.window
+
+        self._updates += 1
+        if self._updates >= self.resync_interval:
+            self._sum = sum(self._buffer)
+            self._updates = 0
+        return self._sum / self._count
+
+
+class SMACrossover:
+    def __init__(self, short_period: int, long_period: int):
+        self.short_period = short_period
+        self.long_period = long_period
+        self.short_sma = RollingSMA(short_period)
+        self.long_sma = RollingSMA(long_period)
+        self.ticks = 0
+        self.short_value = None
+        self.long_value = None
+        self.prev_short_value = None
+        self.prev_long_value = None
+
+    @property
+    def ready(self):
+        return self.ticks >= self.long_period
+
+    def seed(self, prices):
+        # `prices` must be in chronological order (oldest first)
+        for price in prices:
+            self.update(price)
+        return self
+
+    def update(self, price: float):
+        self.prev_short_value = self.short_value
+        self.prev_long_value = self.long_value
+        self.short_value = self.short_sma.update(price)
+        self.long_value = self.long_sma.update(price)
+        self.ticks += 1
+        return self.short_value, self.long_value
+
+    def crossover(self):
+        if not self.ready or self.prev_short_value is None:
+            return None
+        if self.prev_short_value < self.prev_long_value and self.short_value > self.long_value:
+            return "BUY"
+        if self.prev_short_value > self.prev_long_value and self.short_value < self.long_value:
+            return "SELL"
+        return None
+
+
+class RollingEMA:
+    def __init__(self, window: int):
+        if window <= 0:
+            raise ValueError("window must be a positive integer")
+        self.window = window
+        self.alpha = 2.0 / (window + 1)
+        self.count = 0
+        self.value = None
+
+    def update(self, price: float):
+        if self.value is None:
+            self.value = price
+        else:
+            self.value += self.alpha * (price - self.value)
+        self.count += 1
+        return self.value
+
+
+class RollingRSI:
+    # Wilder's RSI: simple averages over the first `period` changes, then
+    # exponential smoothing with alpha 1/period.
+    def __init__(self, period: int):
+        if period <= 0:
+            raise ValueError("period must be a positive integer")
+        self.period = period
+        self.changes = 0
+        self.avg_gain = 0.0
+        self.avg_loss = 0.0
+        self.last_price = None
+        self.value = None
+
+    def update(self, price: float):
+        if self.last_price is None:
+            self.last_price = price
+            return None
+        change = price - self.last_price
+        self.last_price = price
+        gain, loss = max(change, 0.0), max(-change, 0.0)
+        self.changes += 1
+        if self.changes <= self.period:
+            self.avg_gain += gain / self.period
+            self.avg_loss += loss / self.period
+            if self.changes < self.period:
+                return None
+        else:
+            self.avg_gain += (gain - self.avg_gain) / self.period
+            self.avg_loss += (loss - self.avg_loss) / self.period
+        if self.avg_loss == 0:
+            self.value = 100.0
+        else:
+            self.value = 100.0 - 100.0 / (1.0 + self.avg_gain / self.avg_loss)
+        return self.value
+
+
+# Indicator graph nodes. Each node is keyed by its spec, e.g. ("sma", 50),
+# lists the nodes it reads in `deps` and is valid once the graph has seen
+# `lookback` ticks.
+
+class PriceNode:
+    deps = ()
+    lookback = 1
+
+    def update(self, price: float, values: dict):
+        return price
+
+
+class SMANode:
+    deps = ()
+
+    def __init__(self, window: int):
+        self.sma = RollingSMA(window)
+        self.lookback = window
+
+    def update(self, price: float, values: dict):
+        return self.sma.update(price)
+
+
+class EMANode:
+    deps = ()
+
+    def __init__(self, window: int):
+        self.ema = RollingEMA(window)
+        self.lookback = window
+
+    def update(self, price: float, values: dict):
+        return self.ema.update(price)
+
+
+class StdDevNode:
+    # Population standard deviation from the shared SMA and a running mean
+    # of squares over the same window
+    def __init__(self, window: int):
+        self.deps = (("sma", window),)
+        self.squares = RollingSMA(window)
+        self.lookback = window
+
+    def update(self, price: float, values: dict):
+        mean = values[self.deps[0]]
+        return max(self.squares.update(price * price) - mean * mean, 0.0) ** 0.5
+
+
+class RSINode:
+    deps = ()
+
+    def __init__(self, period: int):
+        self.rsi = RollingRSI(period)
+        self.lookback = period + 1
+
+    def update(self, price: float, values: dict):
+        return self.rsi.update(price)
+
+
+class BollingerNode:
+    # (lower, middle, upper) bands
+    def __init__(self, window: int, width: float):
+        self.deps = (("sma", window), ("std", window))
+        self.width = width
+        self.lookback = window
+
+    def update(self, price: float, values: dict):
+        middle, std = values[self.deps[0]], values[self.deps[1]]
+        return middle - self.width * std, middle, middle + self.width * std
+
+
+NODE_TYPES = {
+    "price": PriceNode,
+    "sma": SMANode,
+    "ema": EMANode,
+    "std": StdDevNode,
+    "rsi": RSINode,
+    "bollinger": BollingerNode,
+}
+
+
+class IndicatorGraph:
+    # The indicators of every strategy on one symbol. Strategies asking for
+    # the same spec share one node, and each tick updates every node once,
+    # after the nodes it depends on. Nodes must be added before the first
+    # update; to add more, build a new graph and seed it.
+    def __init__(self):
+        self.nodes = {}
+        self.order = []
+        self.values = {}
+        self.prev = {}
+        self.ticks = 0
+
+    def add(self, key: tuple):
+        if key not in self.nodes:
+            kind, *params = key
+            if kind not in NODE_TYPES:
+                raise ValueError(f"Unknown indicator: {kind}")
+            node = NODE_TYPES[kind](*params)
+            for dep in node.deps:
+                self.add(dep)
+            self.nodes[key] = node
+            self.order.append(key)
+        return key
+
+    @property
+    def lookback(self):
+        return max((node.lookback for node in self.nodes.values()), default=0)
+
+    def ready(self, *keys):
+        return all(self.ticks >= self.nodes[key].lookback for key in keys)
+
+    def __getitem__(self, key: tuple):
+        return self.values.get(key)
+
+    def seed(self, prices):
+        # `prices` must be in chronological order (oldest first)
+        for price in prices:
+            self.update(price)
+        return self
+
+    def update(self, price: float):
+        values = {}
+        for key in self.order:
+            values[key] = self.nodes[key].update(price, values)
+        self.prev, self.values = self.values, values
+        self.ticks += 1
+        return values
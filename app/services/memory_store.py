@@ -0,0 +1,123 @@
+from collections import defaultdict, deque
+from datetime import datetime
+from itertools import count, islice
+from app.core.config import settings
+from app.models.models import Tick, Order, Position
+from app.services.repository import Repository, as_utc, batched, in_window, select_history
+
+class InMemoryRepository(Repository):
+    # Keeps everything in process memory: no network, nothing survives a
+    # restart. Meant for backtests, benchmarks and offline runs.
+    def __init__(self, max_ticks: int = None):
+        super().__init__()
+        self.max_ticks = max_ticks or settings.MEMORY_MAX_TICKS
+        self.ticks = defaultdict(lambda: deque(maxlen=self.max_ticks))
+        # Each tick's insertion number, in step with `ticks`; the history id
+        self.sequences = defaultdict(lambda: deque(maxlen=self.max_ticks))
+        self._sequence = count(1)
+        self.collections = defaultdict(list)
+
+    def _append(self, tick: Tick):
+        self.ticks[tick.symbol].append(tick)
+        self.sequences[tick.symbol].append(next(self._sequence))
+
+    async def save_tick(self, tick: Tick):
+        # Ticks are kept as objects, skipping the document round trip
+        self._append(tick)
+        self.price_cache.append(tick)
+
+    async def save_ticks(self, ticks):
+        # Backfilled ticks can be older than what is stored, so the window is
+        # rebuilt in timestamp order
+        by_symbol = defaultdict(list)
+        for tick in ticks:
+            by_symbol[tick.symbol].append(tick)
+        for symbol, new_ticks in by_symbol.items():
+            merged = sorted(
+                [*zip(self.sequences[symbol], self.ticks[symbol]), *((next(self._sequence), tick) for tick in new_ticks)],
+                key=lambda item: as_utc(item[1].timestamp)
+            )
+            self.sequences[symbol] = deque((sequence for sequence, _ in merged), maxlen=self.max_ticks)
+            self.ticks[symbol] = deque((tick for _, tick in merged), maxlen=self.max_ticks)
+            self.price_cache.invalidate(symbol)
+        self._mark_backfill(ticks)
+
+    async def _insert(self, collection_name: str, data: dict):
+        if collection_name == "price_data":
+            self._append(Tick.from_document(data))
+        else:
+            self.collections[collection_name].append(dict(data))
+
+    async def _update_one(self, collection_name: str, query: dict, update_data: dict):
+        for document in self.collections[collection_name]:
+            if all(document.get(key) == value for key, value in query.items()):
+                document.update(update_data)
+                return 1
+        return 0
+
+    async def _find_recent_ticks(self, symbol: str, limit: int):
+        return list(islice(reversed(self.ticks[symbol]), limit))
+
+    async def _find_ticks(self, symbol: str, start: datetime = None, end: datetime = None):
+        ticks = [
+            tick for tick in self.ticks[symbol]
+            if (start is None or as_utc(tick.timestamp) >= start) and (end is None or as_utc(tick.timestamp) < end)
+        ]
+        ticks.sort(key=lambda tick: tick.timestamp)
+        return ticks
+
+    async def iter_documents(self, collection_name: str, since: datetime = None, until: datetime = None,
+                             batch_size: int = 10_000):
+        if collection_name == "price_data":
+            documents = [
+                tick.to_document() for ticks in self.ticks.values() for tick in ticks
+                if in_window(tick.timestamp, since, until)
+            ]
+        else:
+            documents = [
+                dict(document) for document in self.collections[collection_name]
+                if in_window(document["timestamp"], since, until)
+            ]
+        documents.sort(key=lambda document: as_utc(document["timestamp"]))
+        for batch in batched(documents, batch_size):
+            yield batch
+
+    async def iter_history(self, collection_name: str, symbol: str = None, start: datetime = None, end: datetime = None,
+                           after=None, fields=None, batch_size: int = 1000):
+        if collection_name == "price_data":
+            symbols = [symbol] if symbol else list(self.ticks)
+            documents = [
+                {**tick.to_document(), "id": sequence}
+                for name in symbols for sequence, tick in zip(self.sequences.get(name, ()), self.ticks.get(name, ()))
+            ]
+        else:
+            documents = [{**document, "id": n} for n, document in enumerate(self.collections[collection_name])]
+        if after is not None:
+            after = (after[0], int(after[1]))
+        for batch in batched(select_history(documents, symbol, start, end, after, fields), batch_size):
+            yield batch
+
+    async def aggregate_stats(self):
+        symbols = {}
+        for signal in self.collections["trading_signals"]:
+            figures = symbols.setdefault(signal["symbol"], {})
+            figures["total_signals"] = figures.get("total_signals", 0) + 1
+        for position in self.collections["positions"]:
+            figures = symbols.setdefault(position["symbol"], {})
+            figures["total_positions"] = figures.get("total_positions", 0) + 1
+            if position["status"] == "CLOSED":
+                figures["closed_positions"] = figures.get("closed_positions", 0) + 1
+                figures["total_pnl"] = figures.get("total_pnl", 0.0) + (position.get("pnl") or 0.0)
+        return symbols
+
+    async def get_order(self, order_id: str):
+        for document in self.collections["orders"]:
+            if document["order_id"] == order_id:
+                return Order(**document)
+        return None
+
+    async def get_open_position(self, symbol: str):
+        for document in self.collections["positions"]:
+            if document["symbol"] == symbol and document["status"] == "OPEN":
+                return Position(**document)
+        return None
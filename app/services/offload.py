@@ -0,0 +1,116 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from multiprocessing import shared_memory
+from app.core.config import settings
+
+EXECUTOR_MODES = ("inline", "thread", "process")
+
+class SharedWindow:
+    # The latest `size` prices of one symbol in a shared memory ring, so
+    # process workers read the window in place instead of unpickling it.
+    # Callers must not push while a computation on the window is running;
+    # the engine awaits each tick's computations before taking the next one.
+    def __init__(self, size: int):
+        import numpy as np  # Loaded with the first window strategy
+        self.size = size
+        self.shm = shared_memory.SharedMemory(create=True, size=size * 8)
+        self.buffer = np.ndarray((size,), dtype=np.float64, buffer=self.shm.buf)
+        self.count = 0
+
+    def push(self, price: float):
+        self.buffer[self.count % self.size] = price
+        self.count += 1
+
+    def reset(self, prices=()):
+        self.count = 0
+        for price in prices:
+            self.push(price)
+
+    def ref(self):
+        return self.shm.name, self.size, self.count
+
+    def array(self):
+        return ring_array(self.buffer, self.count)
+
+    def close(self):
+        self.buffer = None
+        self.shm.close()
+        self.shm.unlink()
+
+def ring_array(buffer, count: int):
+    # Chronological copy of the ring's contents
+    import numpy as np
+    size = len(buffer)
+    if count <= size:
+        return buffer[:count].copy()
+    end = count % size
+    return np.concatenate((buffer[end:], buffer[:end]))
+
+# Segments attached by this (worker) process, by name
+_attached = {}
+
+def _attach(name: str, size: int):
+    view = _attached.get(name)
+    if view is None:
+        import numpy as np
+        # Workers share the creating process's resource tracker, which keeps
+        # the segment registered once; the creator unlinks it
+        shm = shared_memory.SharedMemory(name=name)
+        view = _attached[name] = (shm, np.ndarray((size,), dtype=np.float64, buffer=shm.buf))
+    return view[1]
+
+def _call(fn, window, args):
+    prices = window.array() if isinstance(window, SharedWindow) else window
+    return fn(prices, *args)
+
+def _call_shared(fn, ref, args):
+    name, size, count = ref
+    return fn(ring_array(_attach(name, size), count), *args)
+
+class StrategyExecutor:
+    # Runs strategy computations off the event loop. `mode` is chosen per
+    # call: inline (on the loop, for trivial work), thread (numpy and pandas
+    # release the GIL for most of their work) or process (pure Python, or
+    # anything that holds the GIL). Functions must be module-level so the
+    # process pool can pickle them.
+    def __init__(self, workers: int = None):
+        self.workers = workers or settings.STRATEGY_WORKERS
+        self.threads = None
+        self.processes = None
+
+    def _thread_pool(self):
+        if self.threads is None:
+            self.threads = ThreadPoolExecutor(self.workers, thread_name_prefix="strategy")
+        return self.threads
+
+    def _process_pool(self):
+        if self.processes is None:
+            # forkserver children don't inherit the loop, sockets and threads
+            # of this process
+            method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            self.processes = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context(method))
+        return self.processes
+
+    async def run(self, mode: str, fn, window, *args):
+        # `window` is a SharedWindow, or a plain array (pickled to processes)
+        if mode == "inline":
+            return _call(fn, window, args)
+        loop = asyncio.get_running_loop()
+        if mode == "thread":
+            return await loop.run_in_executor(self._thread_pool(), _call, fn, window, args)
+        if mode == "process":
+            if isinstance(window, SharedWindow):
+                return await loop.run_in_executor(self._process_pool(), _call_shared, fn, window.ref(), args)
+            return await loop.run_in_executor(self._process_pool(), _call, fn, window, args)
+        raise ValueError(f"Unknown executor mode: {mode}")
+
+    def shutdown(self):
+        if self.threads is not None:
+            self.threads.shutdown(wait=False, cancel_futures=True)
+            self.threads = None
+        if self.processes is not None:
+            self.processes.shutdown(wait=False, cancel_futures=True)
+            self.processes = None
+
+strategy_executor = StrategyExecutor()
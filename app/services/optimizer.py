@@ -0,0 +1,103 @@
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+import pandas as pd
+from app.core.config import settings
+from app.services.backtest import evaluate, load_prices, prefix_sums, sma_from_prefix
+
+# Per-worker view of the shared price and prefix-sum arrays
+_worker = {}
+
+def _share(array: np.ndarray):
+    shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)[:] = array
+    return shm
+
+def _attach(prices_name: str, prefix_name: str, rows: int, offset: float):
+    prices_shm = shared_memory.SharedMemory(name=prices_name)
+    prefix_shm = shared_memory.SharedMemory(name=prefix_name)
+    _worker.update(
+        shms=(prices_shm, prefix_shm),
+        prices=np.ndarray((rows,), dtype=np.float64, buffer=prices_shm.buf),
+        prefix=np.ndarray((rows + 1,), dtype=np.float64, buffer=prefix_shm.buf),
+        offset=offset,
+        long=(None, None)
+    )
+
+def _sma(window: int):
+    return sma_from_prefix(_worker["prefix"], _worker["offset"], window)
+
+def _long_sma(window: int):
+    # Only the current long window's SMA is kept; the grid's ordering reuses
+    # it across consecutive tasks
+    if _worker["long"][0] != window:
+        _worker["long"] = (window, _sma(window))
+    return _worker["long"][1]
+
+def _evaluate(params):
+    short_period, long_period = params
+    stats = evaluate(_worker["prices"], _sma(short_period), _long_sma(long_period), long_period)
+    return {"short_period": short_period, "long_period": long_period, **stats}
+
+def parameter_grid(shorts, longs):
+    # Sorted by long window so consecutive tasks on a worker reuse its long SMA
+    return [(s, l) for l in sorted(longs) for s in sorted(shorts) if s < l]
+
+def sweep(df: pd.DataFrame, shorts, longs, workers: int = None):
+    prices = np.ascontiguousarray(df["price"].to_numpy(dtype=np.float64))
+    prefix, offset = prefix_sums(prices)
+    grid = parameter_grid(shorts, longs)
+    workers = workers or os.cpu_count()
+
+    # Prices and prefix sums are computed once and shared with every worker
+    # instead of being pickled into each task. Each SMA is then an O(rows)
+    # pass over the prefix sums, so no worker holds more than two of them.
+    prices_shm, prefix_shm = _share(prices), _share(prefix)
+    try:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_attach,
+            initargs=(prices_shm.name, prefix_shm.name, len(prices), offset)
+        ) as pool:
+            chunksize = max(1, len(grid) // (workers * 4))
+            results = list(pool.map(_evaluate, grid, chunksize=chunksize))
+    finally:
+        for shm in (prices_shm, prefix_shm):
+            shm.close()
+            shm.unlink()
+
+    table = pd.DataFrame(results, columns=[
+        "short_period", "long_period", "total_pnl", "trades", "win_rate", "max_drawdown", "signals", "rows", "open_position"
+    ])
+    return table.sort_values(["total_pnl", "max_drawdown"], ascending=[False, True]).reset_index(drop=True)
+
+def parse_windows(value: str):
+    # "10,20,50" or "start:stop:step" (stop inclusive)
+    if ":" in value:
+        start, stop, step = (int(part) for part in value.split(":"))
+        return list(range(start, stop + 1, step))
+    return [int(part) for part in value.split(",")]
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep SMA crossover windows over historical prices")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--csv", help="CSV file with timestamp/price columns or a Binance kline dump")
+    source.add_argument("--parquet", help="Parquet file with timestamp/price columns")
+    source.add_argument("--archive", help="Archive directory written by app.services.archive, read for --symbol")
+    parser.add_argument("--symbol", default=settings.TRADING_PAIR, help="Symbol to load from the configured storage backend or the archive")
+    parser.add_argument("--short", type=parse_windows, required=True, help="e.g. 10,20,50 or 10:100:10")
+    parser.add_argument("--long", type=parse_windows, required=True, help="e.g. 100,200 or 100:500:50")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--output", help="Write the full ranked table to this CSV file")
+    args = parser.parse_args()
+
+    table = sweep(load_prices(args), args.short, args.long, args.workers)
+    if args.output:
+        table.to_csv(args.output, index=False)
+    print(table.head(args.top).to_string(index=False))
+
+if __name__ == "__main__":
+    main()
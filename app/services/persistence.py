@@ -0,0 +1,154 @@
+import asyncio
+import time
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from app.core.metrics import WRITE_QUEUE_DEPTH, WRITE_FLUSH_LATENCY, WRITE_BATCH_SIZE, WRITE_ERRORS, MONGO_OP_LATENCY
+
+class WriteBehindQueue:
+    def __init__(self, database, batch_size: int = 500, flush_interval: float = 0.5, max_pending: int = 10000,
+                 max_attempts: int = 5, retry_backoff: float = 0.5):
+        self.database = database
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        # A bounded queue makes producers wait once Mongo falls too far behind
+        self.queue = asyncio.Queue(maxsize=max_pending)
+        self._pending = []
+        self._lock = asyncio.Lock()
+        self._task = None
+        self._writing = None  # The batch write in flight, if any
+        # Documents queued and taken into a batch so far, which tells paused()
+        # whether any are still on their way into a batch
+        self._queued = 0
+        self._taken = 0
+        
+    @property
+    def running(self):
+        return self._task is not None and not self._task.done()
+        
+    @property
+    def depth(self):
+        return self.queue.qsize() + len(self._pending)
+        
+    async def put(self, collection: str, document: dict):
+        await self.queue.put((collection, document))
+        self._queued += 1
+        WRITE_QUEUE_DEPTH.set(self.depth)
+        
+    def start(self):
+        if not self.running:
+            self._task = asyncio.create_task(self._run())
+            
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._writing is not None:
+            # The shielded batch write outlives the cancelled loop; it must
+            # land before the final flush and before the client is closed
+            await asyncio.gather(self._writing, return_exceptions=True)
+        await self.flush()
+        
+    async def flush(self):
+        async with self._lock:
+            self._drain(len(self._pending) + self.queue.qsize())
+            await self._write()
+            
+    @asynccontextmanager
+    async def paused(self):
+        # Writes everything queued so far, then holds the flusher back:
+        # documents queued inside the block only land after it
+        async with self._lock:
+            while self._taken < self._queued:
+                self._drain(len(self._pending) + self.queue.qsize())
+                if self._pending:
+                    await self._write()
+                else:
+                    await asyncio.sleep(0)  # The flusher is adding one to its batch
+            yield
+            
+    def _drain(self, limit: int):
+        while len(self._pending) < limit:
+            try:
+                self._pending.append(self.queue.get_nowait())
+            except asyncio.QueueEmpty:
+                break
+                
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            # Block until there is something to write, then keep collecting
+            # until the batch is full or the flush interval has elapsed.
+            self._pending.append(await self.queue.get())
+            deadline = loop.time() + self.flush_interval
+            while len(self._pending) < self.batch_size:
+                self._drain(self.batch_size)
+                timeout = deadline - loop.time()
+                if len(self._pending) >= self.batch_size or timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                self._pending.append(item)
+            async with self._lock:
+                # Shielded so a shutdown can't cancel a batch halfway through
+                self._writing = asyncio.ensure_future(self._write())
+                await asyncio.shield(self._writing)
+                self._writing = None
+                
+    async def _write(self):
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, []
+        self._taken += len(batch)
+        by_collection = defaultdict(list)
+        for collection, document in batch:
+            by_collection[collection].append(document)
+            
+        db = self.database.client[self.database.settings.DB_NAME]
+        for collection, documents in by_collection.items():
+            start = time.perf_counter()
+            try:
+                await self._insert(db, collection, documents)
+            finally:
+                elapsed = time.perf_counter() - start
+                WRITE_FLUSH_LATENCY.labels(collection).observe(elapsed)
+                MONGO_OP_LATENCY.labels(collection, "insert_many").observe(elapsed)
+                WRITE_BATCH_SIZE.labels(collection).observe(len(documents))
+        WRITE_QUEUE_DEPTH.set(self.depth)
+
+    async def _insert(self, db, collection: str, documents: list):
+        # Transient failures (network errors, stepdowns, timeouts) are retried
+        # with backoff and the documents dropped only after `max_attempts`.
+        # insert_many assigns the _ids on the first attempt, so documents of a
+        # partly written batch come back as duplicates on the retry instead of
+        # being stored twice.
+        from pymongo.errors import BulkWriteError
+        for attempt in range(self.max_attempts):
+            try:
+                await db[collection].insert_many(documents, ordered=False)
+                return
+            except BulkWriteError as e:
+                errors = [
+                    error for error in e.details.get("writeErrors", [])
+                    if not (attempt and error.get("code") == 11000)
+                ]
+                if errors:
+                    WRITE_ERRORS.labels(collection).inc(len(errors))
+                    print(f"Failed to persist {len(errors)} documents to {collection}: {str(e)}")
+                return
+            except Exception as e:
+                if attempt + 1 == self.max_attempts:
+                    WRITE_ERRORS.labels(collection).inc(len(documents))
+                    print(f"Failed to persist {len(documents)} documents to {collection} "
+                          f"after {self.max_attempts} attempts: {str(e)}")
+                    return
+                delay = self.retry_backoff * 2 ** attempt
+                print(f"Writing {len(documents)} documents to {collection} failed, retrying in {delay}s: {str(e)}")
+                await asyncio.sleep(delay)
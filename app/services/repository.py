@@ -0,0 +1,260 @@
+import base64
+from abc import ABC, abstractmethod
+from contextlib import aclosing, nullcontext
+from datetime import datetime, timezone
+from app.core.config import settings
+from app.models.models import PriceData, PriceBar, Tick, TradingSignal, Order, Position
+from app.services.cache import PriceCache
+from app.services.stats import TradingStats
+from app.services.rollup import floor_time
+
+def bars_from_ticks(ticks, interval: int):
+    # OHLCV bars from chronological ticks, for backends without an aggregation engine
+    bars = []
+    for tick in ticks:
+        bucket = floor_time(tick.timestamp, interval)
+        bar = bars[-1] if bars and bars[-1]["timestamp"] == bucket and bars[-1]["symbol"] == tick.symbol else None
+        if bar is None:
+            bars.append({
+                "timestamp": bucket, "symbol": tick.symbol, "open": tick.price, "high": tick.price,
+                "low": tick.price, "close": tick.price, "volume": tick.quantity, "ticks": 1
+            })
+        else:
+            bar["high"] = max(bar["high"], tick.price)
+            bar["low"] = min(bar["low"], tick.price)
+            bar["close"] = tick.price
+            bar["volume"] += tick.quantity
+            bar["ticks"] += 1
+    return bars
+
+def as_utc(moment: datetime):
+    return moment.replace(tzinfo=timezone.utc) if moment.tzinfo is None else moment
+
+def in_window(moment: datetime, since: datetime = None, until: datetime = None):
+    moment = as_utc(moment)
+    return (since is None or moment > since) and (until is None or moment <= until)
+
+def batched(documents, batch_size: int):
+    for i in range(0, len(documents), batch_size):
+        yield documents[i:i + batch_size]
+
+# History queries page on (timestamp, id), where id is the storage id of the
+# row; the cursor is the key of the last row a page returned
+
+def encode_cursor(timestamp: datetime, key):
+    return base64.urlsafe_b64encode(f"{as_utc(timestamp).isoformat()}|{key}".encode()).decode()
+
+def decode_cursor(cursor: str):
+    try:
+        timestamp, key = base64.urlsafe_b64decode(cursor.encode()).decode().split("|", 1)
+        return as_utc(datetime.fromisoformat(timestamp)), key
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+def history_key(document: dict):
+    return as_utc(document["timestamp"]), document["id"]
+
+def project(document: dict, fields=None):
+    # The id and timestamp are always kept, for the cursor
+    if not fields:
+        return document
+    return {"id": document["id"], "timestamp": document["timestamp"], **{field: document.get(field) for field in fields}}
+
+def select_history(documents, symbol: str = None, start: datetime = None, end: datetime = None, after=None, fields=None):
+    # Filter, order and projection in process, for backends without a query engine
+    rows = [
+        document for document in documents
+        if (symbol is None or document["symbol"] == symbol)
+        and (start is None or as_utc(document["timestamp"]) >= start)
+        and (end is None or as_utc(document["timestamp"]) < end)
+        and (after is None or history_key(document) > after)
+    ]
+    rows.sort(key=history_key)
+    return [project(row, fields) for row in rows]
+
+class Repository(ABC):
+    # Storage used by the ingest path, strategies and API. Backends implement
+    # the abstract document primitives (_insert, _update_one,
+    # _find_recent_ticks, ...); the price cache and trading stats are shared
+    # here.
+    settings = settings
+
+    def __init__(self):
+        self.price_cache = PriceCache(settings.PRICE_CACHE_DEPTH)
+        self.stats = TradingStats(settings.METRICS_CACHE_TTL)
+        # Oldest tick bulk loaded since the archiver last looked; it may sit
+        # below the archive's high-water mark
+        self.backfilled_since = None
+
+    async def connect_to_database(self):
+        pass
+
+    async def close_database_connection(self):
+        self.price_cache.invalidate()
+
+    def start_background_tasks(self):
+        pass
+
+    async def stop_background_tasks(self):
+        pass
+
+    async def flush(self):
+        # Make buffered writes visible to reads
+        pass
+
+    def paused_writes(self):
+        # Async context in which buffered writes are stored on entry and new
+        # ones are held back until exit
+        return nullcontext()
+
+    # Backend primitives
+
+    @abstractmethod
+    async def _insert(self, collection_name: str, data: dict):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def _update_one(self, collection_name: str, query: dict, update_data: dict):
+        # Returns the number of modified documents
+        raise NotImplementedError
+
+    @abstractmethod
+    async def _find_recent_ticks(self, symbol: str, limit: int):
+        # Newest first
+        raise NotImplementedError
+
+    @abstractmethod
+    async def _find_ticks(self, symbol: str, start: datetime = None, end: datetime = None):
+        # Chronological, start inclusive, end exclusive
+        raise NotImplementedError
+
+    @abstractmethod
+    async def aggregate_stats(self):
+        # {symbol: {total_signals, total_positions, closed_positions, total_pnl}}
+        raise NotImplementedError
+
+    @abstractmethod
+    def iter_documents(self, collection_name: str, since: datetime = None, until: datetime = None,
+                       batch_size: int = 10_000):
+        # Async generator of document batches with since < timestamp <= until,
+        # in timestamp order; used by the archiver
+        raise NotImplementedError
+
+    @abstractmethod
+    def iter_history(self, collection_name: str, symbol: str = None, start: datetime = None, end: datetime = None,
+                     after=None, fields=None, batch_size: int = 1000):
+        # Async generator of document batches with start <= timestamp < end,
+        # ordered by (timestamp, id) and starting after the `after` key from
+        # decode_cursor. Each document carries its storage id as "id" and,
+        # when `fields` is given, only those fields besides the timestamp.
+        raise NotImplementedError
+
+    @abstractmethod
+    async def get_order(self, order_id: str):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def get_open_position(self, symbol: str):
+        raise NotImplementedError
+
+    # Writes
+
+    async def save_price_data(self, price_data: PriceData):
+        await self.save_tick(Tick.from_price_data(price_data))
+
+    async def save_tick(self, tick: Tick):
+        await self._insert("price_data", tick.to_document())
+        self.price_cache.append(tick)
+
+    async def save_ticks(self, ticks):
+        # Bulk load of historical ticks (backfill). They may be older than
+        # the cached windows, so those are dropped and reloaded on demand.
+        for tick in ticks:
+            await self._insert("price_data", tick.to_document())
+        self._mark_backfill(ticks)
+        for symbol in {tick.symbol for tick in ticks}:
+            self.price_cache.invalidate(symbol)
+
+    def _mark_backfill(self, ticks):
+        if ticks:
+            oldest = min(as_utc(tick.timestamp) for tick in ticks)
+            self.backfilled_since = oldest if self.backfilled_since is None else min(self.backfilled_since, oldest)
+
+    async def save_trading_signal(self, signal: TradingSignal):
+        await self._insert("trading_signals", signal.model_dump())
+        self.stats.record_signal(signal.symbol)
+
+    async def save_order(self, order: Order):
+        await self._insert("orders", order.model_dump())
+
+    async def update_order(self, order_id: str, update_data: dict):
+        await self._update_one("orders", {"order_id": order_id}, update_data)
+
+    async def save_position(self, position: Position):
+        await self._insert("positions", position.model_dump())
+        self.stats.record_position(position.symbol)
+
+    async def update_position(self, symbol: str, update_data: dict, strategy: str = None):
+        # Each strategy variant holds its own position on a symbol
+        query = {"symbol": symbol, "status": "OPEN", "strategy": strategy}
+        modified = await self._update_one("positions", query, update_data)
+        if modified and update_data.get("status") == "CLOSED":
+            self.stats.record_close(symbol, update_data.get("pnl"))
+
+    # Reads
+
+    async def get_recent_ticks(self, symbol: str, limit: int = 200):
+        cached = self.price_cache.get(symbol, limit)
+        if cached is not None:
+            return cached
+
+        # Cold start or a window deeper than the cache: read from storage and,
+        # when it fits, keep the result as the symbol's cached window.
+        cacheable = limit <= self.price_cache.depth
+        fetch = self.price_cache.depth if cacheable else limit
+        ticks = await self._find_recent_ticks(symbol, fetch)
+        if cacheable:
+            self.price_cache.load(symbol, ticks)
+        return ticks[:limit]
+
+    async def get_recent_prices(self, symbol: str, limit: int = 200):
+        ticks = await self.get_recent_ticks(symbol, limit)
+        return [tick.to_price_data() for tick in ticks]
+
+    async def get_history(self, collection_name: str, symbol: str = None, start: datetime = None, end: datetime = None,
+                          cursor: str = None, limit: int = 1000, fields=None):
+        # One page and the cursor of the next, None after the last page
+        after = decode_cursor(cursor) if cursor else None
+        start, end = (as_utc(moment) if moment else None for moment in (start, end))
+        documents = []
+        async with aclosing(self.iter_history(
+            collection_name, symbol, start, end, after, fields, batch_size=limit + 1
+        )) as batches:
+            async for batch in batches:
+                documents.extend(batch)
+                if len(documents) > limit:
+                    break
+        if len(documents) <= limit:
+            return documents, None
+        documents = documents[:limit]
+        return documents, encode_cursor(documents[-1]["timestamp"], documents[-1]["id"])
+
+    async def get_price_series(self, symbol: str, start: datetime = None, end: datetime = None):
+        # Chronological {"timestamp", "price"} rows, e.g. for backtests
+        ticks = await self._find_ticks(symbol, start, end)
+        return [{"timestamp": tick.timestamp, "price": tick.price} for tick in ticks]
+
+    async def get_price_history(self, symbol: str, start: datetime, end: datetime, interval: int = 60):
+        ticks = await self._find_ticks(symbol, as_utc(start), as_utc(end))
+        return [PriceBar(**bar) for bar in bars_from_ticks(ticks, interval)]
+
+    # Trading stats
+
+    async def reconcile_stats(self):
+        await self.stats.reconcile(self)
+
+    def trading_stats(self, symbol: str = None):
+        return self.stats.snapshot(symbol)
+
+    def cache_stats(self):
+        return self.price_cache.stats()
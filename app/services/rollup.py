@@ -0,0 +1,155 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+# (name, bar size in seconds, collection, source) from finest to coarsest.
+# Each resolution is rolled up from the one before it.
+RESOLUTIONS = [
+    ("1m", 60, "price_data_1m", "price_data"),
+    ("1h", 3600, "price_data_1h", "price_data_1m"),
+]
+
+# Field expressions for raw ticks vs already aggregated bars
+RAW_FIELDS = {"open": "$price", "high": "$price", "low": "$price", "close": "$price", "volume": "$quantity", "ticks": 1}
+BAR_FIELDS = {"open": "$open", "high": "$high", "low": "$low", "close": "$close", "volume": "$volume", "ticks": "$ticks"}
+
+def floor_time(moment: datetime, seconds: int):
+    epoch = moment.timestamp()
+    return datetime.fromtimestamp(epoch - epoch % seconds, tz=timezone.utc)
+
+def ohlcv_pipeline(match: dict, fields: dict, bin_seconds: int):
+    return [
+        {"$match": match},
+        {"$sort": {"timestamp": 1}},
+        {"$group": {
+            "_id": {
+                "symbol": "$symbol",
+                "timestamp": {"$dateTrunc": {"date": "$timestamp", "unit": "second", "binSize": bin_seconds}}
+            },
+            "open": {"$first": fields["open"]},
+            "high": {"$max": fields["high"]},
+            "low": {"$min": fields["low"]},
+            "close": {"$last": fields["close"]},
+            "volume": {"$sum": fields["volume"]},
+            "ticks": {"$sum": fields["ticks"]}
+        }},
+        {"$project": {
+            "_id": 0,
+            "symbol": "$_id.symbol",
+            "timestamp": "$_id.timestamp",
+            "open": 1, "high": 1, "low": 1, "close": 1, "volume": 1, "ticks": 1
+        }},
+        {"$sort": {"timestamp": 1}}
+    ]
+
+class OHLCVRollup:
+    # Only complete buckets older than `grace` seconds are rolled up, leaving
+    # time for write-behind batches (and their retries) to land. Ticks
+    # written below the watermark later on (backfill, gap fills) are marked,
+    # and the bars they fall in are rebuilt on the next pass. Catch-up work
+    # is done in `chunk` sized slices so a long backlog doesn't become one
+    # huge query.
+    def __init__(self, database, interval: float = 60.0, grace: float = 30.0, chunk: timedelta = timedelta(days=1)):
+        self.database = database
+        self.interval = interval
+        self.grace = grace
+        self.chunk = chunk
+        self.watermarks = {}
+        self.dirty_since = None  # Oldest tick written below the 1m watermark
+        self._task = None
+
+    @property
+    def db(self):
+        return self.database.client[self.database.settings.DB_NAME]
+
+    async def load_watermarks(self):
+        async for state in self.db["rollup_state"].find({}):
+            self.watermarks[state["_id"]] = state["rolled_until"].replace(tzinfo=timezone.utc)
+        return self.watermarks
+
+    def mark(self, timestamp: datetime):
+        if timestamp.tzinfo is None:
+            timestamp = timestamp.replace(tzinfo=timezone.utc)
+        rolled = self.watermarks.get(RESOLUTIONS[0][0])
+        if rolled is not None and timestamp < rolled:
+            self.dirty_since = timestamp if self.dirty_since is None else min(self.dirty_since, timestamp)
+
+    async def _earliest(self, source: str):
+        doc = await self.db[source].find_one({}, {"timestamp": 1}, sort=[("timestamp", 1)])
+        return doc["timestamp"].replace(tzinfo=timezone.utc) if doc else None
+
+    async def _roll(self, seconds: int, target: str, source: str, start: datetime, end: datetime, name: str = None):
+        # Rebuilds the bars in [start, end), advancing `name`'s watermark
+        fields = RAW_FIELDS if source == "price_data" else BAR_FIELDS
+        slices = 0
+        while start < end:
+            stop = min(start + self.chunk, end)
+            pipeline = ohlcv_pipeline({"timestamp": {"$gte": start, "$lt": stop}}, fields, seconds)
+            # Re-running a slice replaces its bars, so retries are harmless
+            pipeline[-1] = {"$merge": {
+                "into": target,
+                "on": ["symbol", "timestamp"],
+                "whenMatched": "replace",
+                "whenNotMatched": "insert"
+            }}
+            await self.db[source].aggregate(pipeline, allowDiskUse=True).to_list(length=None)
+            if name is not None:
+                await self.db["rollup_state"].update_one(
+                    {"_id": name}, {"$set": {"rolled_until": stop}}, upsert=True
+                )
+                self.watermarks[name] = stop
+            start = stop
+            slices += 1
+        return slices
+
+    async def roll_up(self, name: str, seconds: int, target: str, source: str, now: datetime = None, limit: datetime = None):
+        now = now or datetime.now(tz=timezone.utc)
+        end = floor_time(now - timedelta(seconds=self.grace), seconds)
+        if limit is not None:
+            # Never roll past what the finer source resolution already covers
+            end = min(end, floor_time(limit, seconds))
+        start = self.watermarks.get(name)
+        if start is None:
+            earliest = await self._earliest(source)
+            if earliest is None:
+                return 0
+            start = floor_time(earliest, seconds)
+        return await self._roll(seconds, target, source, start, end, name)
+
+    async def run_once(self, now: datetime = None):
+        dirty, self.dirty_since = self.dirty_since, None
+        try:
+            limit = None
+            for name, seconds, target, source in RESOLUTIONS:
+                if dirty is not None and name in self.watermarks:
+                    # Finer bars are rebuilt first, so coarser ones see them
+                    await self._roll(seconds, target, source, floor_time(dirty, seconds), self.watermarks[name])
+                await self.roll_up(name, seconds, target, source, now, limit)
+                limit = self.watermarks.get(name)
+                if limit is None:
+                    break
+        except Exception:
+            if dirty is not None:
+                self.mark(dirty)
+            raise
+
+    async def _run(self):
+        await self.load_watermarks()
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                print(f"OHLCV rollup failed: {str(e)}")
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
@@ -0,0 +1,252 @@
+import json
+import sqlite3
+from datetime import datetime, timezone
+from app.core.config import settings
+from app.models.models import Tick, KlineTick, TradingSignal, Order, Position
+from app.services.repository import Repository, as_utc, project
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS price_data (
+    symbol TEXT NOT NULL,
+    timestamp REAL NOT NULL,
+    price REAL NOT NULL,
+    quantity REAL NOT NULL,
+    open REAL, high REAL, low REAL, close_time REAL, trades INTEGER
+);
+CREATE INDEX IF NOT EXISTS price_data_symbol_timestamp ON price_data (symbol, timestamp);
+CREATE TABLE IF NOT EXISTS trading_signals (symbol TEXT NOT NULL, timestamp REAL NOT NULL, document TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS trading_signals_symbol_timestamp ON trading_signals (symbol, timestamp);
+CREATE TABLE IF NOT EXISTS orders (order_id TEXT PRIMARY KEY, symbol TEXT, timestamp REAL, document TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS positions (
+    symbol TEXT NOT NULL, status TEXT NOT NULL, strategy TEXT, timestamp REAL, document TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS positions_symbol_status ON positions (symbol, status);
+"""
+
+# Created after older files have been migrated to the columns they cover
+INDEXES = """
+CREATE INDEX IF NOT EXISTS orders_symbol_timestamp ON orders (symbol, timestamp);
+CREATE INDEX IF NOT EXISTS positions_symbol_timestamp ON positions (symbol, timestamp);
+"""
+
+# Fields copied into their own columns so they can be queried; the rest of
+# each document is stored as JSON.
+KEY_COLUMNS = {
+    "trading_signals": ("symbol", "timestamp"),
+    "orders": ("order_id", "symbol", "timestamp"),
+    "positions": ("symbol", "status", "strategy", "timestamp"),
+}
+
+PRICE_COLUMNS = ("symbol", "timestamp", "price", "quantity", "open", "high", "low", "close_time", "trades")
+
+DOCUMENT_MODELS = {
+    "trading_signals": TradingSignal,
+    "orders": Order,
+    "positions": Position,
+}
+
+def to_epoch(moment: datetime):
+    return as_utc(moment).timestamp() if isinstance(moment, datetime) else moment
+
+def from_epoch(seconds: float):
+    return datetime.fromtimestamp(seconds, tz=timezone.utc) if seconds is not None else None
+
+def _dump(document: dict):
+    return json.dumps(document, default=lambda value: value.isoformat())
+
+def _price_row(data: dict):
+    return (
+        data["symbol"], to_epoch(data["timestamp"]), data["price"], data["quantity"],
+        data.get("open"), data.get("high"), data.get("low"), to_epoch(data.get("close_time")), data.get("trades")
+    )
+
+def _price_document(row, columns):
+    document = dict(zip(columns, row))
+    for column in ("timestamp", "close_time"):
+        if column in document:
+            document[column] = from_epoch(document[column])
+    return document
+
+def _tick(row):
+    symbol, timestamp, price, quantity, open_, high, low, close_time, trades = row
+    if open_ is None:
+        return Tick(from_epoch(timestamp), symbol, price, quantity)
+    return KlineTick(from_epoch(timestamp), symbol, price, quantity, open_, high, low, from_epoch(close_time), trades)
+
+class SQLiteRepository(Repository):
+    # Local, file-backed storage. WAL mode lets readers run alongside the
+    # writer, and synchronous=NORMAL skips the fsync on every commit. Each
+    # call is a few tens of microseconds, so statements run on the event loop.
+    def __init__(self, path: str = None):
+        super().__init__()
+        self.path = path or settings.SQLITE_PATH
+        self.conn = None
+
+    async def connect_to_database(self):
+        self.conn = sqlite3.connect(self.path, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self._add_columns()
+        self.conn.executescript(INDEXES)
+        print(f"Using SQLite storage at {self.path}")
+
+    def _add_columns(self):
+        # Files created before orders and positions had their own symbol and
+        # timestamp columns get them filled in from the stored documents
+        for table in ("orders", "positions"):
+            existing = {row[1] for row in self.conn.execute(f"PRAGMA table_info({table})")}
+            missing = [column for column in ("symbol", "timestamp") if column not in existing]
+            if not missing:
+                continue
+            for column in missing:
+                self.conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {'REAL' if column == 'timestamp' else 'TEXT'}")
+            model = DOCUMENT_MODELS[table]
+            updates = []
+            for rowid, document in self.conn.execute(f"SELECT rowid, document FROM {table}").fetchall():
+                document = model.model_validate_json(document)
+                updates.append((*(to_epoch(getattr(document, column)) for column in missing), rowid))
+            with self.conn:
+                self.conn.execute("BEGIN")
+                self.conn.executemany(
+                    f"UPDATE {table} SET {', '.join(f'{column} = ?' for column in missing)} WHERE rowid = ?", updates
+                )
+
+    async def close_database_connection(self):
+        if self.conn:
+            self.conn.close()
+            self.conn = None
+            self.price_cache.invalidate()
+
+    async def save_ticks(self, ticks):
+        with self.conn:
+            self.conn.execute("BEGIN")
+            self.conn.executemany(
+                "INSERT INTO price_data VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [_price_row(tick.to_document()) for tick in ticks]
+            )
+        self._mark_backfill(ticks)
+        for symbol in {tick.symbol for tick in ticks}:
+            self.price_cache.invalidate(symbol)
+
+    async def _insert(self, collection_name: str, data: dict):
+        if collection_name == "price_data":
+            self.conn.execute("INSERT INTO price_data VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", _price_row(data))
+            return
+        columns = KEY_COLUMNS[collection_name]
+        values = [to_epoch(data[column]) for column in columns]
+        self.conn.execute(
+            f"INSERT INTO {collection_name} ({', '.join(columns)}, document) VALUES ({', '.join('?' * (len(columns) + 1))})",
+            (*values, _dump(data))
+        )
+
+    async def _update_one(self, collection_name: str, query: dict, update_data: dict):
+        # IS rather than = so a None value matches NULL
+        where = " AND ".join(f"{column} IS ?" for column in query)
+        row = self.conn.execute(
+            f"SELECT rowid, document FROM {collection_name} WHERE {where} LIMIT 1", tuple(query.values())
+        ).fetchone()
+        if row is None:
+            return 0
+        rowid, document = row
+        document = {**json.loads(document), **update_data}
+        keys = [column for column in KEY_COLUMNS[collection_name] if column in update_data]
+        assignments = "".join(f", {column} = ?" for column in keys)
+        self.conn.execute(
+            f"UPDATE {collection_name} SET document = ?{assignments} WHERE rowid = ?",
+            (_dump(document), *(to_epoch(update_data[column]) for column in keys), rowid)
+        )
+        return 1
+
+    async def _find_recent_ticks(self, symbol: str, limit: int):
+        rows = self.conn.execute(
+            "SELECT * FROM price_data WHERE symbol = ? ORDER BY timestamp DESC LIMIT ?", (symbol, limit)
+        ).fetchall()
+        return [_tick(row) for row in rows]
+
+    async def _find_ticks(self, symbol: str, start: datetime = None, end: datetime = None):
+        rows = self.conn.execute(
+            "SELECT * FROM price_data WHERE symbol = ? AND timestamp >= ? AND timestamp < ? ORDER BY timestamp",
+            (symbol, to_epoch(start) if start else float("-inf"), to_epoch(end) if end else float("inf"))
+        ).fetchall()
+        return [_tick(row) for row in rows]
+
+    async def get_price_series(self, symbol: str, start: datetime = None, end: datetime = None):
+        rows = self.conn.execute(
+            "SELECT timestamp, price FROM price_data WHERE symbol = ? AND timestamp >= ? AND timestamp < ? ORDER BY timestamp",
+            (symbol, to_epoch(start) if start else float("-inf"), to_epoch(end) if end else float("inf"))
+        ).fetchall()
+        return [{"timestamp": from_epoch(timestamp), "price": price} for timestamp, price in rows]
+
+    async def iter_documents(self, collection_name: str, since: datetime = None, until: datetime = None,
+                             batch_size: int = 10_000):
+        if collection_name == "price_data":
+            cursor = self.conn.execute(
+                "SELECT * FROM price_data WHERE timestamp > ? AND timestamp <= ? ORDER BY timestamp",
+                (to_epoch(since) if since else float("-inf"), to_epoch(until) if until else float("inf"))
+            )
+            while rows := cursor.fetchmany(batch_size):
+                yield [_tick(row).to_document() for row in rows]
+            return
+        model = DOCUMENT_MODELS[collection_name]
+        cursor = self.conn.execute(
+            f"SELECT document FROM {collection_name} WHERE timestamp > ? AND timestamp <= ? ORDER BY timestamp",
+            (to_epoch(since) if since else float("-inf"), to_epoch(until) if until else float("inf"))
+        )
+        while rows := cursor.fetchmany(batch_size):
+            yield [model.model_validate_json(document).model_dump() for (document,) in rows]
+
+    async def iter_history(self, collection_name: str, symbol: str = None, start: datetime = None, end: datetime = None,
+                           after=None, fields=None, batch_size: int = 1000):
+        # rowid is the id; every table is read in order through its
+        # (symbol, timestamp) index
+        where = ["timestamp >= ?", "timestamp < ?"]
+        params = [to_epoch(start) if start else float("-inf"), to_epoch(end) if end else float("inf")]
+        if symbol:
+            where.append("symbol = ?")
+            params.append(symbol)
+        if after is not None:
+            timestamp = to_epoch(after[0])
+            where.append("(timestamp > ? OR (timestamp = ? AND rowid > ?))")
+            params += [timestamp, timestamp, int(after[1])]
+        if collection_name == "price_data":
+            if fields and not set(fields) <= set(PRICE_COLUMNS):
+                raise ValueError(f"Unknown price_data fields: {', '.join(sorted(set(fields) - set(PRICE_COLUMNS)))}")
+            columns = ["timestamp", *(field for field in fields if field != "timestamp")] if fields else PRICE_COLUMNS
+            select = ", ".join(columns)
+        else:
+            select = "document"
+        cursor = self.conn.execute(
+            f"SELECT rowid, {select} FROM {collection_name} WHERE {' AND '.join(where)} ORDER BY timestamp, rowid",
+            params
+        )
+        while rows := cursor.fetchmany(batch_size):
+            if collection_name == "price_data" and fields:
+                yield [{"id": row[0], **_price_document(row[1:], columns)} for row in rows]
+            elif collection_name == "price_data":
+                yield [{**_tick(row[1:]).to_document(), "id": row[0]} for row in rows]
+            else:
+                model = DOCUMENT_MODELS[collection_name]
+                yield [project({**model.model_validate_json(row[1]).model_dump(), "id": row[0]}, fields) for row in rows]
+
+    async def aggregate_stats(self):
+        symbols = {}
+        for symbol, total in self.conn.execute("SELECT symbol, COUNT(*) FROM trading_signals GROUP BY symbol"):
+            symbols.setdefault(symbol, {})["total_signals"] = total
+        for symbol, total, closed, pnl in self.conn.execute(
+            "SELECT symbol, COUNT(*), SUM(status = 'CLOSED'),"
+            " SUM(CASE WHEN status = 'CLOSED' THEN COALESCE(json_extract(document, '$.pnl'), 0) ELSE 0 END)"
+            " FROM positions GROUP BY symbol"
+        ):
+            symbols.setdefault(symbol, {}).update(total_positions=total, closed_positions=closed, total_pnl=float(pnl))
+        return symbols
+
+    async def get_order(self, order_id: str):
+        row = self.conn.execute("SELECT document FROM orders WHERE order_id = ?", (order_id,)).fetchone()
+        return Order.model_validate_json(row[0]) if row else None
+
+    async def get_open_position(self, symbol: str):
+        row = self.conn.execute(
+            "SELECT document FROM positions WHERE symbol = ? AND status = 'OPEN' LIMIT 1", (symbol,)
+        ).fetchone()
+        return Position.model_validate_json(row[0]) if row else None
@@ -0,0 +1,56 @@
+import asyncio
+import time
+
+class StartupStages:
+    # Startup work run by main.lifespan in the background while the API
+    # already serves; /ready reports it and turns 200 once every stage is
+    # done. A failed stage fails /health too, so the orchestrator restarts
+    # the container instead of leaving it unready. An optional stage only
+    # records its failure; startup carries on without it.
+    def __init__(self):
+        self.stages = {}
+        self.started = time.monotonic()
+        self.finished = None
+
+    def begin(self):
+        self.stages.clear()
+        self.started = time.monotonic()
+        self.finished = None
+
+    async def run(self, name: str, work, required: bool = True):
+        stage = self.stages[name] = {"status": "running", "seconds": None, "required": required}
+        start = time.monotonic()
+        try:
+            result = await work
+        except asyncio.CancelledError:
+            stage["status"] = "cancelled"
+            raise
+        except Exception as e:
+            stage.update(status="failed", error=str(e), seconds=round(time.monotonic() - start, 3))
+            print(f"Startup stage {name} failed: {str(e)}")
+            if required:
+                raise
+            return None
+        stage.update(status="ready", seconds=round(time.monotonic() - start, 3))
+        return result
+
+    def finish(self):
+        self.finished = time.monotonic()
+        print(f"Startup finished in {self.finished - self.started:.3f}s")
+
+    def done(self, name: str):
+        return self.stages.get(name, {}).get("status") == "ready"
+
+    @property
+    def failed(self):
+        return any(stage["status"] == "failed" and stage["required"] for stage in self.stages.values())
+
+    @property
+    def ready(self):
+        return self.finished is not None and not self.failed
+
+    def snapshot(self):
+        elapsed = (self.finished or time.monotonic()) - self.started
+        return {"ready": self.ready, "seconds": round(elapsed, 3), "stages": self.stages}
+
+startup = StartupStages()
@@ -0,0 +1,77 @@
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+
+def _empty():
+    return {"total_signals": 0, "total_positions": 0, "closed_positions": 0, "total_pnl": 0.0}
+
+class TradingStats:
+    # Trading figures kept as in-process counters, so reading them doesn't
+    # depend on how much history is stored. reconcile() resets them from
+    # storage to correct drift (restarts, other writers).
+    def __init__(self, ttl: float = 1.0):
+        self.ttl = ttl
+        self.symbols = defaultdict(_empty)
+        self.reconciled_at = None
+        self._deltas = None
+        self._snapshot = None
+        self._snapshot_at = 0.0
+
+    def _add(self, symbol: str, field: str, value):
+        self.symbols[symbol][field] += value
+        if self._deltas is not None:
+            self._deltas[symbol][field] += value
+
+    def record_signal(self, symbol: str):
+        self._add(symbol, "total_signals", 1)
+
+    def record_position(self, symbol: str):
+        self._add(symbol, "total_positions", 1)
+
+    def record_close(self, symbol: str, pnl: float):
+        self._add(symbol, "closed_positions", 1)
+        self._add(symbol, "total_pnl", pnl or 0.0)
+
+    async def reconcile(self, database):
+        # Buffered writes are stored first and later ones held back, so the
+        # changes recorded from here on aren't in the aggregate yet and are
+        # replayed on top of it exactly once
+        try:
+            async with database.paused_writes():
+                self._deltas = defaultdict(_empty)
+                aggregated = await database.aggregate_stats()
+            symbols = defaultdict(_empty)
+            for symbol, figures in aggregated.items():
+                symbols[symbol].update(figures)
+            for symbol, delta in self._deltas.items():
+                for field, value in delta.items():
+                    symbols[symbol][field] += value
+            self.symbols = symbols
+            self.reconciled_at = datetime.now(tz=timezone.utc)
+            self._snapshot = None
+        finally:
+            self._deltas = None
+            
+    def snapshot(self, symbol: str = None):
+        if self._snapshot is None or time.monotonic() - self._snapshot_at > self.ttl:
+            totals = _empty()
+            per_symbol = {}
+            for name, figures in self.symbols.items():
+                per_symbol[name] = dict(figures)
+                for field, value in figures.items():
+                    totals[field] += value
+            self._snapshot = {
+                **totals,
+                "symbols": per_symbol,
+                "as_of": datetime.now(tz=timezone.utc),
+                "reconciled_at": self.reconciled_at
+            }
+            self._snapshot_at = time.monotonic()
+        if symbol is None:
+            return self._snapshot
+        return {
+            "symbol": symbol,
+            **self._snapshot["symbols"].get(symbol, _empty()),
+            "as_of": self._snapshot["as_of"],
+            "reconciled_at": self.reconciled_at
+        }
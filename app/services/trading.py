@@ -1,116 +1,144 @@
-import numpy as np
-import pandas as pd
+import asyncio
 from datetime import datetime, timezone
 from app.services.database import db
-from app.models.models import TradingSignal, Order, Position, PriceData
+from app.services.indicators import SMACrossover
+from app.services.engine import Strategy, SymbolEngine
+from app.services.offload import strategy_executor
+from app.models.models import Tick
 from app.core.config import settings
+from app.core.metrics import STAGE_LATENCY
 
-class TradingStrategy:
+def sma_pair(prices, short_period: int, long_period: int):
+    import pandas as pd  # Imported on first use, in the executor
+    df = pd.DataFrame({'price': prices})
+    
+    # If we don't have enough data points for the long SMA, use all available points
+    short_window = min(short_period, len(df))
+    long_window = min(long_period, len(df))
+    
+    short_sma = df['price'].rolling(window=short_window, min_periods=1).mean()
+    long_sma = df['price'].rolling(window=long_window, min_periods=1).mean()
+    
+    return short_sma.iloc[-1], long_sma.iloc[-1]
+
+class TradingStrategy(Strategy):
+    # The default SMA crossover, configured by SHORT_TERM_PERIOD and
+    # LONG_TERM_PERIOD
     def __init__(self, database=None):
+        super().__init__(database or db)
         self.short_period = settings.SHORT_TERM_PERIOD
         self.long_period = settings.LONG_TERM_PERIOD
-        self.current_position = None
-        self.db = database or db
+        self.indicators = {}
         
     async def calculate_sma(self, prices):
-        # Convert list of PriceData objects to DataFrame
-        df = pd.DataFrame([{
-            'price': p.price,
-            'timestamp': p.timestamp
-        } for p in prices])
-        
-        # If we don't have enough data points for the long SMA, use all available points
-        short_window = min(self.short_period, len(df))
-        long_window = min(self.long_period, len(df))
-        
-        short_sma = df['price'].rolling(window=short_window, min_periods=1).mean()
-        long_sma = df['price'].rolling(window=long_window, min_periods=1).mean()
+        # The pandas work runs on the strategy executor, off the event loop
+        import numpy as np
+        values = np.fromiter((p.price for p in prices), dtype=np.float64, count=len(prices))
+        return await strategy_executor.run(
+            settings.STRATEGY_EXECUTOR, sma_pair, values, self.short_period, self.long_period
+        )
         
+    async def warm_up(self, symbol: str):
+        # get_recent_ticks returns the newest tick first
+        ticks = await self.db.get_recent_ticks(symbol, self.long_period + 1)
+        indicator = SMACrossover(self.short_period, self.long_period)
+        indicator.seed(tick.price for tick in reversed(ticks))
+        self.indicators[symbol] = indicator
+        return indicator
         
-        return short_sma.iloc[-1], long_sma.iloc[-1]
+    async def generate_signal(self, symbol: str, current_price: float, timestamp: datetime = None):
+        indicator = self.indicators.get(symbol)
+        if indicator is None:
+            # The ingest path persists each tick before evaluating it, so the
+            # seed history already contains `current_price`.
+            indicator = await self.warm_up(symbol)
+        else:
+            with STAGE_LATENCY.labels("sma", symbol).time():
+                indicator.update(current_price)
+        return await self.check_signal(symbol, indicator, current_price, timestamp)
         
-    async def generate_signal(self, symbol: str, current_price: float):
-        prices = await self.db.get_recent_prices(symbol, self.long_period)
-        if len(prices) < self.long_period:
+    async def check_signal(self, symbol: str, indicator: SMACrossover, current_price: float, timestamp: datetime = None):
+        if not indicator.ready:
             return None
             
-        short_sma, long_sma = await self.calculate_sma(prices)
-        
-        prev_prices = prices[:-1]  # Excluding the current price
-        prev_short_sma, prev_long_sma = await self.calculate_sma(prev_prices)
-
-        signal = None
-        if prev_short_sma < prev_long_sma and short_sma > long_sma:
-            signal = "BUY"
-        elif prev_short_sma > prev_long_sma and short_sma < long_sma:
-            signal = "SELL"
-            
+        with STAGE_LATENCY.labels("signal", symbol).time():
+            signal = indicator.crossover()
         if signal:
-            trading_signal = TradingSignal(
-                timestamp=datetime.now(tz=timezone.utc),
-                symbol=symbol,
-                signal_type=signal,
-                price=current_price,
-                short_sma=short_sma,
-                long_sma=long_sma
+            return await self.record_signal(
+                symbol, signal, current_price, timestamp,
+                short_sma=indicator.short_value,
+                long_sma=indicator.long_value
             )
-            print(f"Trading signal saved for {symbol} at {current_price}")
-            await self.db.save_trading_signal(trading_signal)
-            return trading_signal
         return None
+
+class StrategyRegistry:
+    # The default strategy per symbol, plus an engine running the variants
+    # configured in STRATEGIES over a shared indicator graph
+    def __init__(self, database=None, configs=None):
+        self.db = database or db
+        self.configs = settings.STRATEGIES if configs is None else configs
+        self.strategies = {}
+        self.engines = {}
         
-    async def execute_signal(self, signal: TradingSignal):
-        order = Order(
-            order_id=f"mock_{datetime.now(tz=timezone.utc).timestamp()}",
-            timestamp=datetime.now(tz=timezone.utc),
-            symbol=signal.symbol,
-            side=signal.signal_type,
-            quantity=1.0,
-            price=signal.price,
-            status="FILLED"
-        )
-        await self.db.save_order(order)
+    def get(self, symbol: str):
+        strategy = self.strategies.get(symbol)
+        if strategy is None:
+            strategy = self.strategies[symbol] = TradingStrategy(database=self.db)
+        return strategy
         
-        if signal.signal_type == "BUY":
-            position = Position(
-                symbol=signal.symbol,
-                side="LONG",
-                entry_price=signal.price,
-                quantity=1.0,
-                timestamp=datetime.now(tz=timezone.utc),
-                status="OPEN"
-            )
-            await self.db.save_position(position)
-            self.current_position = position
-        elif signal.signal_type == "SELL" and self.current_position:
-            pnl = (signal.price - self.current_position.entry_price) * self.current_position.quantity
-            await self.db.update_position(
-                signal.symbol,
-                {
-                    "status": "CLOSED",
-                    "pnl": pnl
-                }
-            )
-            self.current_position = None
+    def engine(self, symbol: str):
+        if not self.configs:
+            return None
+        engine = self.engines.get(symbol)
+        if engine is None:
+            engine = self.engines[symbol] = SymbolEngine(self.db, symbol, self.configs)
+        return engine
+        
+    async def warm_up(self, symbols):
+        tasks = [self.get(symbol).warm_up(symbol) for symbol in symbols]
+        tasks += [self.engine(symbol).warm_up() for symbol in symbols if self.configs]
+        await asyncio.gather(*tasks)
+        
+    async def on_tick(self, symbol: str, price: float, timestamp: datetime = None):
+        strategy = self.get(symbol)
+        signal = await strategy.generate_signal(symbol, price, timestamp)
+        if signal:
+            await strategy.execute_signal(signal)
+        signals = [signal] if signal else []
+        engine = self.engine(symbol)
+        if engine is not None:
+            signals += await engine.on_tick(price, timestamp)
+        return signals
+        
+    def close(self):
+        # Releases the engines' shared memory windows
+        for engine in self.engines.values():
+            engine.close()
+        self.engines.clear()
+        
+    def __contains__(self, symbol):
+        return symbol in self.strategies
+        
+    def __len__(self):
+        return len(self.strategies)
 
 class TradingService:
     def __init__(self, db, websocket):
         self.db = db
         self.websocket = websocket
-        self.strategy = TradingStrategy()
+        self.strategies = StrategyRegistry(db)
         
     async def process_market_data(self):
         message = await self.websocket.receive_message()
         if message:
-            price_data = PriceData(
-                timestamp=datetime.now(tz=timezone.utc),
-                symbol=settings.TRADING_PAIR,
-                price=float(message['k']['c']),
-                quantity=float(message['k']['v'])
+            symbol = message.get('s', settings.TRADING_PAIR)
+            tick = Tick(
+                datetime.now(tz=timezone.utc),
+                symbol,
+                float(message['k']['c']),
+                float(message['k']['v'])
             )
-            await self.db.save_price_data(price_data)
-            signal = await self.strategy.generate_signal(settings.TRADING_PAIR, price_data.price)
-            if signal:
-                await self.strategy.execute_signal(signal)
+            await self.db.save_tick(tick)
+            await self.strategies.on_tick(symbol, tick.price)
 
-strategy = TradingStrategy() 
\ No newline at end of file
+strategies = StrategyRegistry()
\ No newline at end of file
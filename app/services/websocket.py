@@ -1,26 +1,63 @@
-import json
 import asyncio
+import functools
+import time
 import websockets
 from datetime import datetime, timezone
-from app.models.models import PriceData
+from app.models.models import Tick, KlineTick
 from app.services.database import db
-from app.services.trading import strategy
+from app.services.trading import StrategyRegistry, strategies
+from app.services.dispatcher import FrameDispatcher
+from app.services.backfill import backfill as backfill_service
+from app.services.exchange import paper_exchange
+from app.services.broadcast import broadcaster
 from app.core.config import settings
+from app.core.serialization import loads
+from app.core.metrics import WEBSOCKET_MESSAGES, WEBSOCKET_RECONNECTS, STAGE_LATENCY, EXCHANGE_LAG
 import ssl
 
+def stream_name(symbol: str):
+    return f"{symbol.lower()}@kline_{settings.KLINE_INTERVAL}"
+
+def depth_stream_name(symbol: str):
+    return f"{symbol.lower()}@depth{settings.PAPER_BOOK_LEVELS}@100ms"
+
+def streams_per_symbol():
+    # A kline stream, plus a depth stream when paper trading on real books
+    return 2 if settings.PAPER_TRADING and settings.PAPER_DEPTH_STREAM else 1
+
+def combined_stream_url(symbols):
+    names = [stream_name(symbol) for symbol in symbols]
+    if streams_per_symbol() > 1:
+        # Partial book depth feeds the simulated exchange's order books
+        names += [depth_stream_name(symbol) for symbol in symbols]
+    return f"{settings.BINANCE_WS_URL}/stream?streams={'/'.join(names)}"
+
+@functools.lru_cache(maxsize=None)
+def client_ssl_context():
+    # Shared by every connection and built on the first one, not at import
+    return ssl.SSLContext(ssl.PROTOCOL_TLS)
+
+def from_millis(ms: int):
+    return datetime.fromtimestamp(ms / 1000, tz=timezone.utc)
+
+def unwrap_frame(data):
+    # Combined streams wrap each payload as {"stream": ..., "data": {...}}
+    if 'stream' in data and 'data' in data:
+        return data['data']
+    return data
+
 class WebSocketClient:
-    def __init__(self):
+    def __init__(self, symbols=None):
         self.ws = None
-        self.ws_url = f"wss://stream.binance.com:9443/ws/{settings.TRADING_PAIR.lower()}@kline_{settings.KLINE_INTERVAL}"
-        self.ssl_context = ssl.SSLContext(ssl.PROTOCOL_TLS)
+        self.ws_url = combined_stream_url(symbols or settings.TRADING_PAIRS)
         
     async def connect(self):
-        self.ws = await websockets.connect(self.ws_url, ssl=self.ssl_context)
+        self.ws = await websockets.connect(self.ws_url, ssl=client_ssl_context())
         
     async def receive_message(self):
         if self.ws:
             message = await self.ws.recv()
-            return json.loads(message)
+            return unwrap_frame(loads(message))
         return None
         
     async def disconnect(self):
@@ -28,17 +65,73 @@ class WebSocketClient:
             await self.ws.close()
 
 class BinanceWebsocket:
-    def __init__(self, database=None):
-        self.ws_url = f"wss://stream.binance.com:9443/ws/{settings.TRADING_PAIR.lower()}@kline_{settings.KLINE_INTERVAL}"
+    def __init__(self, database=None, symbols=None, strategies=None, bus=None, name: str = "0", backfill=None, exchange=None):
+        self.symbols = symbols or settings.TRADING_PAIRS
+        self.name = name  # Connection label for metrics
+        self.ws_url = combined_stream_url(self.symbols)
         self.is_connected = False
         self.reconnect_delay = 1
-        self.ssl_context = ssl.SSLContext(ssl.PROTOCOL_TLS)
         self.db = database or db  # Use provided database or global instance
+        self.strategies = strategies if strategies is not None else StrategyRegistry(self.db)
+        # In the ingest role ticks go to the Redis bus instead of local strategies
+        self.bus = bus
+        self.dispatcher = FrameDispatcher(
+            self.handle_message,
+            workers=settings.INGEST_WORKERS,
+            max_pending=settings.INGEST_QUEUE_MAXSIZE,
+            conflate=settings.INGEST_CONFLATE
+        )
+        # Kline-aware mode: the in-progress candle per symbol, and the open
+        # time of the last closed candle used to drop duplicates.
+        self.open_klines = {}
+        self.last_closed = {}
+        # Open time of the last kline seen per symbol, where a gap starts
+        # after a disconnect
+        self.last_open = {}
+        # Frames whose handling raised, which are logged and skipped
+        self.errors = 0
+        self.backfill = backfill
+        self.exchange = exchange if exchange is not None else (paper_exchange if settings.PAPER_TRADING else None)
+        
+    def build_tick(self, data, kline, symbol):
+        if settings.KLINE_CLOSED_ONLY:
+            timestamp = from_millis(kline['t'])
+        elif 'E' in data:
+            timestamp = from_millis(data['E'])
+        else:
+            timestamp = datetime.now(tz=timezone.utc)
+        if settings.KLINE_STORE_OHLCV:
+            return KlineTick(
+                timestamp,
+                symbol,
+                float(kline['c']),
+                float(kline['v']),
+                float(kline['o']),
+                float(kline['h']),
+                float(kline['l']),
+                from_millis(kline['T']),
+                kline['n']
+            )
+        return Tick(
+            timestamp,
+            symbol,
+            float(kline['c']),  # Closing price
+            float(kline['v'])  # Volume
+        )
         
     async def handle_message(self, message):
         try:
-            data = json.loads(message) if isinstance(message, str) else message
+            start = time.perf_counter()
+            data = loads(message) if isinstance(message, (str, bytes)) else message
+            stream = data.get('stream', '')
+            data = unwrap_frame(data)
+            decoded = time.perf_counter()
             
+            if 'bids' in data and self.exchange is not None:
+                # Partial depth payloads only name the symbol in the stream
+                await self.exchange.on_depth(stream.split('@')[0].upper(), data['bids'], data['asks'])
+                return
+                
             if 'k' not in data:
                 print(f"Invalid message format: {data}")
                 return
@@ -48,34 +141,63 @@ class BinanceWebsocket:
                 print(f"Invalid kline format: {kline}")
                 return
                 
-            price_data = PriceData(
-                timestamp=datetime.now(tz=timezone.utc),
-                symbol=settings.TRADING_PAIR,
-                price=float(kline['c']),  # Closing price
-                quantity=float(kline['v'])  # Volume
-            )
+            symbol = data.get('s') or kline.get('s')
+            if not symbol:
+                print(f"Message without symbol: {data}")
+                return
+                
+            self.last_open[symbol] = kline['t']
+            WEBSOCKET_MESSAGES.labels(symbol).inc()
+            STAGE_LATENCY.labels("decode", symbol).observe(decoded - start)
+            if 'E' in data:
+                EXCHANGE_LAG.labels(symbol).observe(time.time() - data['E'] / 1000)
+            tick = self.build_tick(data, kline, symbol)
+            
+            if settings.KLINE_CLOSED_ONLY:
+                if not kline.get('x'):
+                    self.open_klines[symbol] = tick
+                    return
+                if kline['t'] <= self.last_closed.get(symbol, -1):
+                    return  # Candle already processed (replay or reconnect)
+                self.last_closed[symbol] = kline['t']
+                self.open_klines.pop(symbol, None)
             
-            await self.db.save_price_data(price_data)
+            with STAGE_LATENCY.labels("persist", symbol).time():
+                await self.db.save_tick(tick)
+            broadcaster.publish_tick(tick)
+            if self.exchange is not None:
+                await self.exchange.on_price(symbol, tick.price)
+            if self.bus is not None:
+                with STAGE_LATENCY.labels("publish", symbol).time():
+                    await self.bus.publish(tick)
+                return
             
-            signal = await strategy.generate_signal(settings.TRADING_PAIR, price_data.price)
-            if signal:
-                await strategy.execute_signal(signal)
+            await self.strategies.on_tick(symbol, tick.price, tick.timestamp)
         except Exception as e:
+            self.errors += 1
             print(f"Error handling message: {str(e)}")
             
     async def connect(self):
         try:
-            websocket = await websockets.connect(self.ws_url, ssl=self.ssl_context)
+            # Plain ws:// is only used against a local replay server
+            ssl_context = client_ssl_context() if self.ws_url.startswith("wss://") else None
+            websocket = await websockets.connect(self.ws_url, ssl=ssl_context)
             self.is_connected = True
             self.reconnect_delay = 1
+            self.dispatcher.start()
             
-            while True:
-                try:
-                    message = await websocket.recv()
-                    await self.handle_message(message)
-                except websockets.ConnectionClosed:
-                    print("WebSocket connection closed")
-                    break
+            # The receive loop only enqueues raw frames; the dispatcher's
+            # workers do the decoding, persistence and strategy work.
+            try:
+                while True:
+                    try:
+                        message = await websocket.recv()
+                        await self.dispatcher.put(message)
+                    except websockets.ConnectionClosed:
+                        print("WebSocket connection closed")
+                        break
+            finally:
+                await websocket.close()
                     
         except Exception as e:
             print(f"WebSocket error: {str(e)}")
@@ -87,14 +209,77 @@ class BinanceWebsocket:
             raise
                 
     async def start(self):
+        if self.bus is None:
+            # Symbols the startup backfill seeded are already warm
+            warmed = self.backfill.warmed if self.backfill is not None else set()
+            cold = [symbol for symbol in self.symbols if symbol not in warmed]
+            if cold:
+                await self.strategies.warm_up(cold)
         while True:
             try:
                 await self.connect()
             except Exception as e:
                 await asyncio.sleep(self.reconnect_delay)
+            # Both a closed connection and a failed attempt lead to a reconnect
+            WEBSOCKET_RECONNECTS.labels(self.name).inc()
+            await self.fill_gaps()
+            
+    async def fill_gaps(self):
+        # Load the klines missed while disconnected before reconnecting
+        if self.backfill is None:
+            return
+        await self.dispatcher.stop()  # Lets queued frames advance last_open first
+        gaps = self.last_closed if settings.KLINE_CLOSED_ONLY else self.last_open
+        results = await asyncio.gather(*(
+            self.backfill.fill_gap(symbol, last_open, warm=self.bus is None)
+            for symbol, last_open in list(gaps.items())
+        ), return_exceptions=True)
+        for symbol, result in zip(list(gaps), results):
+            if isinstance(result, Exception):
+                print(f"Gap fill failed for {symbol}: {str(result)}")
                 continue
+            filled, last_filled = result
+            if filled:
+                print(f"Filled {filled} missed klines for {symbol}")
+                self.last_open[symbol] = self.last_closed[symbol] = last_filled
         
     def is_healthy(self):
         return self.is_connected
 
-binance_ws = BinanceWebsocket() 
\ No newline at end of file
+class BinanceStreamPool:
+    # Shards the symbol list across as many combined-stream connections as
+    # Binance's per-connection stream limit requires.
+    def __init__(self, symbols=None, database=None, strategies=None, max_streams=None, bus=None, backfill=None):
+        self.symbols = symbols or settings.TRADING_PAIRS
+        self.max_streams = max_streams or settings.MAX_STREAMS_PER_CONNECTION
+        self.strategies = strategies if strategies is not None else StrategyRegistry(database)
+        # The limit counts streams, and a symbol may take more than one
+        per_shard = max(self.max_streams // streams_per_symbol(), 1)
+        self.shards = [
+            BinanceWebsocket(database, self.symbols[i:i + per_shard], self.strategies, bus, str(n), backfill)
+            for n, i in enumerate(range(0, len(self.symbols), per_shard))
+        ]
+        
+    async def start(self):
+        await asyncio.gather(*(shard.start() for shard in self.shards))
+        
+    async def stop(self):
+        # Handles the frames already queued; cancel start() first
+        await asyncio.gather(*(shard.dispatcher.stop() for shard in self.shards))
+        
+    def is_healthy(self):
+        return all(shard.is_healthy() for shard in self.shards)
+        
+    def attach_bus(self, bus):
+        for shard in self.shards:
+            shard.bus = bus
+
+def __getattr__(name):
+    # The stream pool is built on first use; strategy workers never need it
+    if name == "binance_ws":
+        pool = globals()["binance_ws"] = BinanceStreamPool(
+            strategies=strategies,
+            backfill=backfill_service if settings.BACKFILL_ENABLED else None
+        )
+        return pool
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -17,17 +17,14 @@ async def test_db():
     test_settings = settings.model_copy()
     test_settings.DB_NAME = "test_algotrading"
     test_settings.MONGODB_URI = "mongodb://localhost:27017"
+    # Fixtures use fixed dates years back; the TTL monitor would expire them mid-test
+    test_settings.PRICE_DATA_TTL_SECONDS = 0
     
     db = Database()
     db.settings = test_settings
+    # Indexes are provisioned by connect_to_database
     await db.connect_to_database()
     
-    # Create indexes
-    await db.client[test_settings.DB_NAME]["price_data"].create_index("symbol")
-    await db.client[test_settings.DB_NAME]["trading_signals"].create_index("symbol")
-    await db.client[test_settings.DB_NAME]["orders"].create_index("order_id")
-    await db.client[test_settings.DB_NAME]["positions"].create_index([("symbol", 1), ("status", 1)])
-    
     yield db
     
     # Cleanup: Drop test database
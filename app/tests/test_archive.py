@@ -0,0 +1,98 @@
+import pytest
+import pytest_asyncio
+from datetime import datetime, timezone, timedelta
+from app.models.models import Tick, TradingSignal, Order
+from app.services.archive import TickArchiver, read_table, read_ticks
+from app.services.memory_store import InMemoryRepository
+from app.services.sqlite_store import SQLiteRepository
+
+pytest.importorskip("pyarrow")
+pytestmark = pytest.mark.asyncio
+
+START = datetime(2024, 1, 1, 23, 0, tzinfo=timezone.utc)
+
+async def save_ticks(repo, minutes, symbols=("BTCUSDT", "ETHUSDT")):
+    for minute in minutes:
+        for n, symbol in enumerate(symbols):
+            await repo.save_tick(Tick(START + timedelta(minutes=minute), symbol, 100.0 + minute + n, 1.0))
+
+@pytest_asyncio.fixture(params=["memory", "sqlite"])
+async def repository(request, tmp_path):
+    repo = InMemoryRepository() if request.param == "memory" else SQLiteRepository(str(tmp_path / "wstrade.db"))
+    await repo.connect_to_database()
+    yield repo
+    await repo.close_database_connection()
+
+@pytest.mark.parametrize("fmt", ["arrow", "parquet"])
+async def test_archive_is_incremental_and_partitioned(repository, tmp_path, fmt):
+    root = str(tmp_path / "archive")
+    archiver = TickArchiver(repository, root=root, fmt=fmt, settle_seconds=60, batch_size=7)
+    # 90 minutes spanning midnight
+    await save_ticks(repository, range(90))
+    
+    counts = await archiver.run_once(now=START + timedelta(minutes=60))
+    assert counts["price_data"] == 2 * 60  # Minutes 0-59 are settled
+    assert (await archiver.run_once(now=START + timedelta(minutes=60)))["price_data"] == 0
+    counts = await archiver.run_once(now=START + timedelta(minutes=200))
+    assert counts["price_data"] == 2 * 30
+    
+    ticks = read_ticks(root, "BTCUSDT", fmt=fmt)
+    assert list(ticks["price"]) == [100.0 + minute for minute in range(90)]
+    window = read_ticks(root, "ETHUSDT", START + timedelta(minutes=58), START + timedelta(minutes=62), fmt=fmt)
+    assert list(window["price"]) == [159.0, 160.0, 161.0, 162.0]
+    assert (tmp_path / "archive" / "price_data" / "date=2024-01-02" / "symbol=BTCUSDT").is_dir()
+
+async def test_backfilled_ticks_below_the_mark_are_archived(repository, tmp_path):
+    root = str(tmp_path / "archive")
+    archiver = TickArchiver(repository, root=root, settle_seconds=0, batch_size=7)
+    # 23:00 to 00:29, so the rewrite spans two days
+    await save_ticks(repository, range(90))
+    await archiver.run_once(now=START + timedelta(minutes=89))
+    
+    late = Tick(START + timedelta(minutes=30, seconds=30), "BTCUSDT", 999.0, 1.0)
+    await repository.save_ticks([late])
+    counts = await archiver.run_once(now=START + timedelta(minutes=89))
+    assert counts["rearchived"] == 2 * 90 + 1
+    
+    ticks = read_ticks(root, "BTCUSDT")
+    assert len(ticks["price"]) == 91
+    assert list(ticks["price"][30:33]) == [130.0, 999.0, 131.0]
+    assert len(read_table(root, "price_data")) == 2 * 90 + 1
+    assert (await archiver.run_once(now=START + timedelta(minutes=89))) == {"price_data": 0, "trading_signals": 0, "orders": 0}
+
+async def test_rerun_after_crash_does_not_duplicate(tmp_path):
+    repo = InMemoryRepository()
+    await save_ticks(repo, range(30))
+    root = str(tmp_path / "archive")
+    archiver = TickArchiver(repo, root=root, settle_seconds=0, batch_size=8)
+    
+    # Files written but the mark never saved
+    await archiver.archive_table("price_data", None, START + timedelta(hours=1))
+    await archiver.run_once(now=START + timedelta(hours=1))
+    assert len(read_table(root, "price_data")) == 60
+
+async def test_signals_and_orders_are_archived(tmp_path):
+    repo = InMemoryRepository()
+    await repo.save_trading_signal(TradingSignal(
+        timestamp=START, symbol="BTCUSDT", signal_type="BUY", price=100.0, strategy="rsi_14", indicators={"rsi": 31.0}
+    ))
+    await repo.save_order(Order(
+        order_id="paper_1", timestamp=START, symbol="BTCUSDT", side="BUY", quantity=1.0, price=100.0,
+        status="FILLED", filled_quantity=1.0, filled_price=100.05, fee=0.1
+    ))
+    root = str(tmp_path / "archive")
+    await TickArchiver(repo, root=root, settle_seconds=0).run_once(now=START + timedelta(minutes=1))
+    
+    signals = read_table(root, "trading_signals", "BTCUSDT").to_pylist()
+    assert signals[0]["strategy"] == "rsi_14" and signals[0]["indicators"] == '{"rsi": 31.0}'
+    orders = read_table(root, "orders", columns=["order_id", "filled_price", "symbol"]).to_pylist()
+    assert orders == [{"order_id": "paper_1", "filled_price": 100.05, "symbol": "BTCUSDT"}]
+
+async def test_arrow_reads_are_zero_copy(tmp_path):
+    repo = InMemoryRepository()
+    await save_ticks(repo, range(50), symbols=("BTCUSDT",))
+    root = str(tmp_path / "archive")
+    await TickArchiver(repo, root=root, fmt="arrow", settle_seconds=0).run_once(now=START + timedelta(minutes=50))
+    
+    prices = read_ticks(root, "BTCUSDT", START, START + timedelta(minutes=30))["price"]
+    assert len(prices) == 30 and not prices.flags.owndata
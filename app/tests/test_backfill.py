@@ -0,0 +1,132 @@
+import pytest
+import asyncio
+import time
+from app.core.config import settings
+from app.services.backfill import BackfillService, KlineArchive, RateLimiter, RestKlineSource, interval_ms
+from app.services.memory_store import InMemoryRepository
+from app.services.trading import StrategyRegistry
+from app.services.websocket import BinanceWebsocket
+
+pytestmark = pytest.mark.asyncio
+
+START = 1_700_000_000_000 - 1_700_000_000_000 % 60_000
+
+def kline(open_ms, price):
+    # REST layout: open time, o, h, l, c, v, close time, quote volume, trades, ...
+    return [open_ms, str(price), str(price), str(price), str(price), "1.0", open_ms + 59_999, "0", 1, "0", "0", "0"]
+
+class FakeKlineSource:
+    def __init__(self, price=100.0):
+        self.price = price
+        self.calls = []
+
+    async def fetch(self, symbol, interval, start_ms, end_ms):
+        self.calls.append((symbol, start_ms, end_ms))
+        return [kline(ms, self.price) for ms in range(start_ms, end_ms, interval_ms(interval))]
+
+class FakeRestClient:
+    async def get_klines(self, symbol, interval, startTime, endTime, limit):
+        # Like Binance: klines opened within [startTime, endTime]
+        first = -(-startTime // 60_000) * 60_000
+        return [kline(ms, 1.0) for ms in range(first, endTime + 1, 60_000)][:limit]
+
+def write_archive(path, open_times):
+    lines = [",".join(str(value) for value in kline(ms, 50.0)) for ms in open_times]
+    (path / "BTCUSDT-1m-2023-11.csv").write_text("\n".join(lines) + "\n")
+
+async def test_backfill_uses_archive_then_rest_and_seeds_strategy(tmp_path):
+    write_archive(tmp_path, [START + i * 60_000 for i in range(150)])
+    repo = InMemoryRepository()
+    strategies = StrategyRegistry(repo)
+    rest = FakeKlineSource(price=60.0)
+    service = BackfillService(repo, strategies, [KlineArchive(str(tmp_path)), rest], interval="1m", klines=250)
+
+    counts = await service.backfill_symbol("BTCUSDT", now_ms=START + 250 * 60_000 + 5_000, warm=True)
+
+    assert counts == 250
+    # REST only covers what the archive didn't have
+    assert rest.calls == [("BTCUSDT", START + 150 * 60_000, START + 250 * 60_000)]
+    prices = [tick.price for tick in await repo.get_recent_ticks("BTCUSDT", 250)]
+    assert prices[:100] == [60.0] * 100 and prices[100:] == [50.0] * 150
+    strategy = strategies.get("BTCUSDT")
+    strategy.short_period, strategy.long_period = 50, 200
+    assert (await strategy.warm_up("BTCUSDT")).ready
+
+async def test_backfill_skips_stored_klines():
+    repo = InMemoryRepository()
+    source = FakeKlineSource()
+    service = BackfillService(repo, sources=[source], interval="1m", klines=10)
+    now = START + 10 * 60_000 + 1
+
+    assert await service.backfill_symbol("BTCUSDT", now_ms=now) == 10
+    assert await service.backfill_symbol("BTCUSDT", now_ms=now) == 0
+    assert await service.backfill_symbol("BTCUSDT", now_ms=now + 2 * 60_000) == 2
+
+async def test_rest_source_pages_requests():
+    source = RestKlineSource(requests_per_second=1000, client=FakeRestClient())
+    source.PAGE_SIZE = 4
+
+    rows = await source.fetch("BTCUSDT", "1m", START, START + 10 * 60_000)
+
+    assert [row[0] for row in rows] == [START + i * 60_000 for i in range(10)]
+
+async def test_rate_limiter_spaces_requests():
+    limiter = RateLimiter(rate=50, burst=1)
+    start = time.monotonic()
+    await asyncio.gather(*(limiter.acquire() for _ in range(6)))
+    assert time.monotonic() - start >= 0.09
+
+async def test_backfilled_klines_use_the_live_clock(monkeypatch):
+    repo = InMemoryRepository()
+    service = BackfillService(repo, sources=[FakeKlineSource()], interval="1m", klines=2)
+    await service.backfill_symbol("BTCUSDT", now_ms=START + 2 * 60_000)
+    ticks = await repo.get_recent_ticks("BTCUSDT", 2)
+    # Close times, like the event time of a kline's last live update
+    assert [int(tick.timestamp.timestamp() * 1000) for tick in ticks] == [START + 119_999, START + 59_999]
+    
+    monkeypatch.setattr(settings, "KLINE_CLOSED_ONLY", True)
+    repo = InMemoryRepository()
+    await BackfillService(repo, sources=[FakeKlineSource()], interval="1m", klines=2).backfill_symbol(
+        "BTCUSDT", now_ms=START + 2 * 60_000
+    )
+    assert [int(tick.timestamp.timestamp() * 1000) for tick in await repo.get_recent_ticks("BTCUSDT", 2)] == [
+        START + 60_000, START
+    ]
+
+async def test_gap_fill_refetches_the_kline_seen_in_progress():
+    source = FakeKlineSource()
+    service = BackfillService(InMemoryRepository(), sources=[source], interval="1m")
+    assert await service.fill_gap("BTCUSDT", START, now_ms=START + 3 * 60_000 + 1) == (3, START + 2 * 60_000)
+    assert source.calls == [("BTCUSDT", START, START + 3 * 60_000)]
+
+async def test_websocket_skips_warm_up_after_backfill(monkeypatch):
+    repo = InMemoryRepository()
+    strategies = StrategyRegistry(repo)
+    service = BackfillService(repo, strategies, [FakeKlineSource()], interval="1m", klines=5)
+    await service.run(["BTCUSDT"])
+    warmed = []
+    
+    async def warm_up(symbols):
+        warmed.extend(symbols)
+    monkeypatch.setattr(strategies, "warm_up", warm_up)
+    ws = BinanceWebsocket(repo, ["BTCUSDT", "ETHUSDT"], strategies, backfill=service)
+    
+    async def connect():
+        raise asyncio.CancelledError
+    ws.connect = connect
+    with pytest.raises(asyncio.CancelledError):
+        await ws.start()
+    assert warmed == ["ETHUSDT"]
+
+async def test_websocket_fills_gap_after_disconnect():
+    repo = InMemoryRepository()
+    service = BackfillService(repo, sources=[FakeKlineSource()], interval="1s")
+    ws = BinanceWebsocket(repo, ["BTCUSDT"], StrategyRegistry(repo), backfill=service)
+    last_open = int(time.time() * 1000) // 1000 * 1000 - 30_000
+    ws.last_open["BTCUSDT"] = last_open
+
+    await ws.fill_gaps()
+
+    ticks = await repo.get_recent_ticks("BTCUSDT", 100)
+    assert len(ticks) >= 29
+    assert ws.last_open["BTCUSDT"] > last_open
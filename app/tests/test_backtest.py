@@ -0,0 +1,104 @@
+import pytest
+import numpy as np
+import pandas as pd
+from datetime import datetime, timezone, timedelta
+from app.models.models import PriceData
+from app.services.backtest import (
+    run_backtest, load_prices_csv, prefix_sums, sma_from_prefix, KLINE_COLUMNS
+)
+from app.services.trading import TradingStrategy
+from app.services.optimizer import sweep, parse_windows
+
+def random_walk(n, seed=3):
+    prices = 50000 + np.cumsum(np.random.default_rng(seed).normal(0, 25, n))
+    base_time = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    return pd.DataFrame({
+        "timestamp": [base_time + timedelta(seconds=i) for i in range(n)],
+        "price": prices
+    })
+
+def test_sma_matches_pandas_rolling_mean():
+    prices = random_walk(500)["price"].to_numpy()
+    prefix, offset = prefix_sums(prices)
+    expected = pd.Series(prices).rolling(window=20, min_periods=1).mean().to_numpy()
+    assert np.allclose(sma_from_prefix(prefix, offset, 20), expected)
+
+def test_pnl_and_equity_are_consistent():
+    result = run_backtest(random_walk(5000), short_period=5, long_period=20)
+    assert result.stats["trades"] == len(result.trades) > 0
+    assert result.stats["total_pnl"] == pytest.approx(result.trades["pnl"].sum())
+    if not result.stats["open_position"]:
+        assert result.equity[-1] == pytest.approx(result.stats["total_pnl"])
+    assert result.stats["max_drawdown"] >= 0
+
+def test_load_binance_kline_csv(tmp_path):
+    path = tmp_path / "BTCUSDT-1s.csv"
+    rows = [[1700000000000 + i * 1000, 1, 1, 1, 100 + i, 1, 0, 0, 0, 0, 0, 0] for i in range(3)]
+    pd.DataFrame(rows, columns=KLINE_COLUMNS).to_csv(path, header=False, index=False)
+    
+    df = load_prices_csv(path)
+    assert list(df["price"]) == [100, 101, 102]
+    assert df["timestamp"].iloc[0] == pd.Timestamp(1700000000000, unit="ms", tz="UTC")
+
+@pytest.mark.asyncio
+async def test_backtest_matches_live_strategy(test_db):
+    df = random_walk(400)
+    strategy = TradingStrategy(database=test_db)
+    strategy.short_period = 5
+    strategy.long_period = 20
+    
+    live_signals = []
+    for row in df.itertuples():
+        await test_db.save_price_data(PriceData(
+            timestamp=row.timestamp, symbol="BTCUSDT", price=row.price, quantity=1.0
+        ))
+        signal = await strategy.generate_signal("BTCUSDT", row.price)
+        if signal:
+            live_signals.append((signal.signal_type, signal.price))
+            await strategy.execute_signal(signal)
+    
+    result = run_backtest(df, short_period=5, long_period=20)
+    backtest_signals = list(zip(result.signals["signal_type"], result.signals["price"]))
+    assert live_signals and backtest_signals == live_signals
+    
+    positions = test_db.client[test_db.settings.DB_NAME]["positions"]
+    closed = [p async for p in positions.find({"status": "CLOSED"})]
+    assert sum(p["pnl"] for p in closed) == pytest.approx(result.stats["total_pnl"])
+
+def test_parameter_sweep_matches_single_backtests():
+    df = random_walk(3000)
+    table = sweep(df, shorts=[5, 10, 40], longs=[20, 40], workers=2)
+    
+    assert len(table) == 4  # (40, 20) and (40, 40) are skipped
+    assert list(table["total_pnl"]) == sorted(table["total_pnl"], reverse=True)
+    for row in table.itertuples():
+        expected = run_backtest(df, short_period=row.short_period, long_period=row.long_period).stats
+        assert row.total_pnl == pytest.approx(expected["total_pnl"])
+        assert row.trades == expected["trades"]
+
+def test_optimizer_cli_loads_from_storage(monkeypatch, capsys):
+    from app.services import backtest, optimizer
+    symbols = []
+    async def load_from_db(symbol):
+        symbols.append(symbol)
+        return random_walk(300)
+    monkeypatch.setattr(backtest, "_load_from_db", load_from_db)
+    monkeypatch.setattr("sys.argv", ["optimizer", "--symbol", "ETHUSDT", "--short", "5", "--long", "20", "--workers", "1"])
+    
+    optimizer.main()
+    assert symbols == ["ETHUSDT"]
+    assert "short_period" in capsys.readouterr().out
+
+def test_parse_windows():
+    assert parse_windows("10,20") == [10, 20]
+    assert parse_windows("10:30:10") == [10, 20, 30]
+
+def test_paper_fills_cost_spread_and_fees():
+    from app.services.exchange import SimulatedExchange
+    df = random_walk(5000)
+    ideal = run_backtest(df, short_period=5, long_period=20)
+    paper = run_backtest(df, short_period=5, long_period=20, exchange=SimulatedExchange(latency_ms=0))
+    
+    assert paper.stats["trades"] == ideal.stats["trades"]
+    assert (paper.trades["entry_price"] > ideal.trades["entry_price"]).all()
+    assert (paper.trades["pnl"] < ideal.trades["pnl"]).all()
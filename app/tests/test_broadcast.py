@@ -0,0 +1,99 @@
+import pytest
+import json
+from datetime import datetime, timezone
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.api.endpoints import router
+from app.models.models import Tick
+from app.services.broadcast import Broadcaster, broadcaster, sse_events
+from app.services.engine import SMACross
+from app.services.memory_store import InMemoryRepository
+
+NOW = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+@pytest.mark.asyncio
+async def test_messages_are_serialized_once_and_filtered():
+    hub = Broadcaster()
+    btc_ticks = hub.subscribe(["tick"], ["btcusdt"])
+    everything = hub.subscribe()
+    
+    hub.publish_tick(Tick(NOW, "BTCUSDT", 100.0, 1.0))
+    hub.publish_tick(Tick(NOW, "ETHUSDT", 10.0, 1.0))
+    hub.publish("signal", "BTCUSDT", {"signal_type": "BUY"})
+    
+    mine, all_messages = await btc_ticks.get(), await everything.get()
+    assert [message.symbol for message in mine] == ["BTCUSDT"]
+    assert [message.topic for message in all_messages] == ["tick", "tick", "signal"]
+    assert mine[0] is all_messages[0]
+    assert json.loads(mine[0].text) == {
+        "topic": "tick", "symbol": "BTCUSDT",
+        "data": {"timestamp": "2024-01-01T00:00:00+00:00", "symbol": "BTCUSDT", "price": 100.0, "quantity": 1.0}
+    }
+    hub.unsubscribe(everything)
+    assert hub.publish("signal", "BTCUSDT", {}) is None  # Nobody listening, nothing serialized
+
+@pytest.mark.asyncio
+async def test_slow_client_conflates_ticks_and_drops_oldest():
+    hub = Broadcaster()
+    client = hub.subscribe(maxsize=3)
+    for price in range(5):
+        hub.publish_tick(Tick(NOW, "BTCUSDT", float(price), 1.0))
+    for n in range(3):
+        hub.publish("order", "BTCUSDT", {"n": n})
+    
+    messages = await client.get()
+    assert [json.loads(message.text)["data"] for message in messages] == [{"n": 0}, {"n": 1}, {"n": 2}]
+    assert client.conflated == 4 and client.dropped == 1
+    assert await client.get(timeout=0.01) == []
+
+@pytest.mark.asyncio
+async def test_strategy_signals_and_orders_reach_subscribers():
+    client = broadcaster.subscribe(["signal", "order"], ["BTCUSDT"])
+    try:
+        strategy = SMACross(InMemoryRepository(), 2, 3)
+        signal = await strategy.record_signal("BTCUSDT", "BUY", 100.0, NOW)
+        await strategy.execute_signal(signal)
+        messages = await client.get()
+        assert [message.topic for message in messages] == ["signal", "order"]
+        assert json.loads(messages[1].text)["data"]["filled_price"] == 100.0
+    finally:
+        broadcaster.unsubscribe(client)
+
+@pytest.mark.asyncio
+async def test_sse_heartbeat_and_events():
+    events = sse_events(["signal"], heartbeat=0.01)
+    # Nobody is subscribed until the response starts streaming
+    assert not broadcaster.subscribers
+    assert await events.__anext__() == ": ping\n\n"
+    assert len(broadcaster.subscribers) == 1
+    broadcaster.publish("signal", "ETHUSDT", {"signal_type": "SELL"})
+    assert (await events.__anext__()).startswith("event: signal\ndata: {")
+    await events.aclose()
+    assert not broadcaster.subscribers
+
+@pytest.mark.asyncio
+async def test_bad_update_keeps_the_subscription():
+    hub = Broadcaster()
+    subscriber = hub.subscribe(["signal"], ["BTCUSDT"])
+    for topics, symbols in ((None, 5), (None, "ETHUSDT"), ("signal", None), (["signal"], [1])):
+        with pytest.raises(ValueError):
+            hub.update(subscriber, topics, symbols)
+    
+    assert subscriber.symbols == {"BTCUSDT"}
+    hub.publish("signal", "BTCUSDT", {"n": 1})
+    assert [message.symbol for message in await subscriber.get(timeout=0.1)] == ["BTCUSDT"]
+
+def test_websocket_stream_subscriptions():
+    app = FastAPI()
+    app.include_router(router)
+    with TestClient(app).websocket_connect("/ws/stream?topics=signal&symbols=btcusdt") as ws:
+        ws.portal.call(broadcaster.publish, "signal", "ETHUSDT", {"n": 1})
+        ws.portal.call(broadcaster.publish, "signal", "BTCUSDT", {"n": 2})
+        assert ws.receive_json()["data"] == {"n": 2}
+        
+        ws.send_json({"topics": ["order"], "symbols": []})
+        ws.send_json({"topics": ["candles"]})
+        assert "Unknown stream topics" in ws.receive_json()["error"]
+        ws.portal.call(broadcaster.publish, "order", "ETHUSDT", {"n": 3})
+        assert ws.receive_json()["symbol"] == "ETHUSDT"
+    assert not broadcaster.subscribers
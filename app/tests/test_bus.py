@@ -0,0 +1,123 @@
+import pytest
+from datetime import datetime, timezone, timedelta
+from app.models.models import Tick
+from app.services.bus import RedisTickBus, StrategyWorker, partition_for
+from app.services.trading import StrategyRegistry
+
+fakeredis = pytest.importorskip("fakeredis")
+
+@pytest.fixture
+def server():
+    return fakeredis.FakeServer()
+
+@pytest.fixture
+def bus(server):
+    return make_bus(server, "worker-1")
+
+def make_bus(server, consumer):
+    client = fakeredis.FakeAsyncRedis(server=server, decode_responses=True)
+    return RedisTickBus(client=client, partitions=2, consumer=consumer)
+
+def make_registry(test_db):
+    strategies = StrategyRegistry(test_db)
+    strategy = strategies.get("BTCUSDT")
+    strategy.short_period = 5
+    strategy.long_period = 10
+    return strategies
+
+async def publish_crossover(bus):
+    base_time = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    prices = [50000.0 - (i * 100) for i in range(5)] + [45000.0 + (i * 3000) for i in range(5)]
+    for i, price in enumerate(prices):
+        await bus.publish(Tick(base_time + timedelta(seconds=i), "BTCUSDT", price, 1.0))
+
+def test_partitioning_is_stable():
+    assert partition_for("BTCUSDT", 8) == partition_for("BTCUSDT", 8)
+    assert 0 <= partition_for("ETHUSDT", 8) < 8
+
+@pytest.mark.asyncio
+async def test_worker_consumes_ticks_and_stores_position(test_db, bus):
+    await bus.ensure_groups()
+    await bus.balance()
+    await publish_crossover(bus)
+    
+    worker = StrategyWorker(bus, make_registry(test_db))
+    await worker.process(await bus.read(block=10))
+    
+    position = await bus.get_position("BTCUSDT")
+    assert position is not None and position.side == "LONG"
+    pending = await bus.client.xpending(bus.stream(partition_for("BTCUSDT", 2)), bus.group)
+    assert pending["pending"] == 0
+
+@pytest.mark.asyncio
+async def test_worker_rebuilds_window_from_redis(test_db, bus):
+    await bus.ensure_groups()
+    await bus.balance()
+    await publish_crossover(bus)
+    
+    # The first nine ticks went to a worker that died; a new worker only
+    # sees the last one and rebuilds the window from Redis.
+    batches = await bus.read(count=9, block=10)
+    stream, messages = batches[0]
+    assert len(messages) == 9
+    
+    successor = StrategyWorker(bus, make_registry(test_db))
+    [(stream, [(message_id, fields)])] = await bus.read(block=10)
+    signal = await successor.handle(fields)
+    await bus.ack(stream, message_id)
+    assert signal is not None and signal.signal_type == "BUY"
+    assert successor.strategies.get("BTCUSDT").indicators["BTCUSDT"].ticks == 10
+    
+    # The dead worker's unacked ticks are reclaimed once they go idle
+    claimed = await bus.claim_stale(min_idle_ms=0)
+    assert sum(len(messages) for _, messages in claimed) == 9
+    # and acked without trading on them
+    await successor.discard(claimed)
+    assert (await bus.client.xpending(stream, bus.group))["pending"] == 0
+
+@pytest.mark.asyncio
+async def test_worker_skips_ticks_older_than_the_last_applied(test_db, bus):
+    worker = StrategyWorker(bus, make_registry(test_db))
+    await publish_crossover(bus)
+    latest = int(datetime(2024, 1, 1, 0, 0, 9, tzinfo=timezone.utc).timestamp() * 1000)
+    assert (await worker.handle({"s": "BTCUSDT", "p": "57000", "t": latest, "prev": ""})).signal_type == "BUY"
+    assert await worker.handle({"s": "BTCUSDT", "p": "57000", "t": latest - 1000, "prev": ""}) is None
+    assert worker.last_seen["BTCUSDT"] == str(latest)
+
+@pytest.mark.asyncio
+async def test_workers_split_partitions_between_them(server):
+    first, second = make_bus(server, "worker-1"), make_bus(server, "worker-2")
+    assert await first.balance() == {0, 1}
+    # The newcomer gets a partition once the first worker gives one back
+    assert await second.balance() == set()
+    assert len(await first.balance()) == 1
+    assert await second.balance() == {0, 1} - first.owned
+    # A dead worker's partitions are taken over once its lease expires
+    for partition in first.owned:
+        await first.client.delete(first.lease(partition))
+    await first.client.zrem(f"workers:{first.group}", first.consumer)
+    assert await second.balance() == {0, 1}
+
+@pytest.mark.asyncio
+async def test_window_is_trimmed(bus):
+    bus.window = 3
+    base_time = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    for i in range(5):
+        await bus.publish(Tick(base_time + timedelta(seconds=i), "ETHUSDT", float(i), 1.0))
+    
+    latest = int((base_time + timedelta(seconds=4)).timestamp() * 1000)
+    assert await bus.get_window("ETHUSDT", latest, 10) == [4.0, 3.0, 2.0]
+
+@pytest.mark.asyncio
+async def test_worker_runs_variants_with_their_own_positions(test_db, bus):
+    await bus.ensure_groups()
+    await bus.balance()
+    await publish_crossover(bus)
+    
+    strategies = make_registry(test_db)
+    strategies.configs = [{"type": "sma_cross", "fast": 5, "slow": 10, "name": "fast"}]
+    worker = StrategyWorker(bus, strategies)
+    await worker.process(await bus.read(block=10))
+    
+    assert (await bus.get_position("BTCUSDT")).strategy is None
+    assert (await bus.get_position("BTCUSDT:fast")).strategy == "fast"
@@ -1,6 +1,8 @@
 import pytest
+import asyncio
 from datetime import datetime, timezone, timedelta
-from app.models.models import PriceData, TradingSignal, Order
+from app.models.models import PriceData, TradingSignal, Order, Position
+from app.services.database import _uses_collscan
 
 pytestmark = pytest.mark.asyncio
 
@@ -95,4 +97,114 @@ async def test_get_recent_prices(test_db):
     # Most recent prices should be first (highest timestamp)
     assert recent_prices[0].price == 50004.0  # Last price inserted
     assert recent_prices[1].price == 50003.0
-    assert recent_prices[2].price == 50002.0 
\ No newline at end of file
+    assert recent_prices[2].price == 50002.0
+
+@pytest.mark.asyncio
+async def test_recent_prices_served_from_cache(test_db):
+    base_time = datetime.now(tz=timezone.utc)
+    for i in range(3):
+        await test_db.save_price_data(PriceData(
+            timestamp=base_time + timedelta(seconds=i),
+            symbol="BTCUSDT",
+            price=float(50000 + i),
+            quantity=1.0
+        ))
+    
+    # First read is a cold start and warms the cache from Mongo
+    await test_db.get_recent_prices("BTCUSDT", limit=2)
+    assert test_db.price_cache.misses == 1
+    
+    # Later writes go through the cache, so reads no longer hit Mongo
+    await test_db.save_price_data(PriceData(
+        timestamp=base_time + timedelta(seconds=3),
+        symbol="BTCUSDT",
+        price=50003.0,
+        quantity=1.0
+    ))
+    await test_db.client[test_db.settings.DB_NAME]["price_data"].delete_many({})
+    recent_prices = await test_db.get_recent_prices("BTCUSDT", limit=10)
+    assert [p.price for p in recent_prices] == [50003.0, 50002.0, 50001.0, 50000.0]
+    assert test_db.price_cache.hits == 1
+
+@pytest.mark.asyncio
+async def test_recent_prices_deeper_than_cache_read_from_mongo(test_db):
+    test_db.price_cache.depth = 2
+    base_time = datetime.now(tz=timezone.utc)
+    for i in range(4):
+        await test_db.save_price_data(PriceData(
+            timestamp=base_time + timedelta(seconds=i),
+            symbol="BTCUSDT",
+            price=float(50000 + i),
+            quantity=1.0
+        ))
+    
+    recent_prices = await test_db.get_recent_prices("BTCUSDT", limit=3)
+    assert len(recent_prices) == 3
+    assert not test_db.price_cache.is_warm("BTCUSDT")
+
+@pytest.mark.asyncio
+async def test_trading_stats_counters_and_reconcile(test_db):
+    now = datetime.now(tz=timezone.utc)
+    for symbol in ["BTCUSDT", "ETHUSDT"]:
+        await test_db.save_trading_signal(TradingSignal(
+            timestamp=now, symbol=symbol, signal_type="BUY", price=100.0, short_sma=1.0, long_sma=1.0
+        ))
+        await test_db.save_position(Position(
+            symbol=symbol, side="LONG", entry_price=100.0, quantity=1.0, timestamp=now, status="OPEN"
+        ))
+    await test_db.update_position("BTCUSDT", {"status": "CLOSED", "pnl": 25.0})
+    
+    snapshot = test_db.stats.snapshot()
+    assert snapshot["total_signals"] == 2
+    assert snapshot["total_positions"] == 2
+    assert snapshot["closed_positions"] == 1
+    assert snapshot["total_pnl"] == 25.0
+    assert snapshot["symbols"]["ETHUSDT"]["closed_positions"] == 0
+    
+    # Counters rebuilt from Mongo agree with the incremental ones
+    test_db.stats.symbols.clear()
+    await test_db.reconcile_stats()
+    assert test_db.stats.reconciled_at is not None
+    btc = test_db.stats.snapshot("BTCUSDT")
+    assert btc["total_signals"] == 1
+    assert btc["closed_positions"] == 1
+    assert btc["total_pnl"] == 25.0
+
+@pytest.mark.asyncio
+async def test_reconcile_counts_signals_saved_during_aggregation_once(test_db):
+    test_db.writer.flush_interval = 0.001
+    test_db.writer.start()
+    aggregate_stats = test_db.aggregate_stats
+    
+    async def slow_aggregate():
+        # A signal arrives and the flusher gets time to write it meanwhile
+        await test_db.save_trading_signal(TradingSignal(
+            timestamp=datetime.now(tz=timezone.utc), symbol="BTCUSDT", signal_type="BUY", price=100.0
+        ))
+        await asyncio.sleep(0.05)
+        return await aggregate_stats()
+    
+    test_db.aggregate_stats = slow_aggregate
+    await test_db.reconcile_stats()
+    await test_db.writer.stop()
+    assert test_db.stats.snapshot("BTCUSDT")["total_signals"] == 1
+    assert await test_db.client[test_db.settings.DB_NAME]["trading_signals"].count_documents({}) == 1
+
+@pytest.mark.asyncio
+async def test_indexes_provisioned_on_connect(test_db):
+    db = test_db.client[test_db.settings.DB_NAME]
+    price_indexes = await db["price_data"].index_information()
+    assert any(list(index["key"]) == [("symbol", 1), ("timestamp", -1)] for index in price_indexes.values())
+    
+    order_indexes = await db["orders"].index_information()
+    assert any(list(index["key"]) == [("order_id", 1)] and index.get("unique") for index in order_indexes.values())
+    
+    # Provisioning is idempotent
+    await test_db.ensure_indexes()
+
+async def test_collection_scan_detection():
+    indexed = {"winningPlan": {"stage": "LIMIT", "inputStage": {"stage": "FETCH", "inputStage": {"stage": "IXSCAN"}}}}
+    scanned = {"winningPlan": {"stage": "SORT", "inputStage": {"stage": "COLLSCAN"}}}
+    assert not _uses_collscan(indexed)
+    assert _uses_collscan(scanned)
+    assert not _uses_collscan({**indexed, "rejectedPlans": [scanned["winningPlan"]]})
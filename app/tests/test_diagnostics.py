@@ -0,0 +1,77 @@
+import pytest
+import asyncio
+import time
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.api.endpoints import router
+from app.core.config import settings
+from app.services.diagnostics import CPUProfiler, LoopMonitor, format_collapsed, profile_loop
+
+async def blocking_handler():
+    time.sleep(0.3)  # Synchronous work on the loop
+
+async def crunch(seconds):
+    end = time.monotonic() + seconds
+    while time.monotonic() < end:
+        sum(range(10_000))
+        await asyncio.sleep(0)
+
+def spin(seconds):
+    end = time.monotonic() + seconds
+    while time.monotonic() < end:
+        sum(range(10_000))
+
+@pytest.mark.asyncio
+async def test_monitor_reports_the_blocking_task():
+    monitor = LoopMonitor(interval=0.01, threshold=0.05)
+    monitor.start()
+    try:
+        await asyncio.sleep(0.05)
+        await asyncio.create_task(blocking_handler(), name="handler")
+        await asyncio.sleep(0.05)
+    finally:
+        await monitor.stop()
+    
+    assert len(monitor.reports) == 1
+    report = monitor.reports[0]
+    assert report["task"] == "handler (blocking_handler)"
+    assert "blocking_handler" in report["stack"][-1]
+
+@pytest.mark.asyncio
+@pytest.mark.skipif(not CPUProfiler.available(), reason="needs SIGPROF on the main thread")
+async def test_cpu_profile_finds_code_between_awaits():
+    worker = asyncio.create_task(crunch(0.4))
+    counts = await profile_loop(0.3, hz=500)
+    await worker
+    
+    hot = sum(count for stack, count in counts.items() if "test_diagnostics:crunch" in stack)
+    assert hot > sum(counts.values()) / 2
+    line = format_collapsed(counts).splitlines()[0]
+    assert line.rsplit(" ", 1)[1].isdigit() and ";" in line
+
+@pytest.mark.asyncio
+@pytest.mark.skipif(not CPUProfiler.available(), reason="needs SIGPROF on the main thread")
+async def test_cpu_profile_keeps_thread_work_out_of_the_loop():
+    counts, _ = await asyncio.gather(profile_loop(0.3, hz=500), asyncio.to_thread(spin, 0.3))
+    assert CPUProfiler.OTHER_THREADS in counts
+    assert not any("selectors:select" in stack or "spin" in stack for stack in counts)
+
+@pytest.mark.asyncio
+async def test_wall_profile_samples_a_blocked_loop():
+    profile = asyncio.create_task(profile_loop(0.2, hz=200, mode="wall"))
+    await asyncio.sleep(0.01)
+    time.sleep(0.1)
+    counts = await profile
+    assert any("test_wall_profile_samples_a_blocked_loop" in stack for stack in counts)
+
+def test_debug_endpoints_need_the_token(monkeypatch):
+    app = FastAPI()
+    app.include_router(router)
+    client = TestClient(app)
+    assert client.get("/debug/profile").status_code == 404
+    
+    monkeypatch.setattr(settings, "PROFILE_TOKEN", "secret")
+    assert client.get("/debug/loop", headers={"X-Admin-Token": "wrong"}).status_code == 403
+    response = client.get("/debug/profile", params={"seconds": 0.05}, headers={"X-Admin-Token": "secret"})
+    assert response.status_code == 200 and response.headers["content-type"].startswith("text/plain")
+    assert client.get("/debug/loop", headers={"X-Admin-Token": "secret"}).json()["stalls"] == []
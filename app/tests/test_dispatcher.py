@@ -0,0 +1,58 @@
+import pytest
+import asyncio
+import json
+from app.services.dispatcher import FrameDispatcher, route_key, is_closed
+
+def make_frame(symbol, close, closed=False):
+    return json.dumps({
+        "stream": f"{symbol.lower()}@kline_1s",
+        "data": {"e": "kline", "s": symbol, "k": {"s": symbol, "c": str(close), "v": "1.0", "x": closed}}
+    }, separators=(",", ":"))
+
+def test_route_key_and_closed_flag():
+    frame = make_frame("BTCUSDT", 50000, closed=True)
+    assert route_key(frame) == "btcusdt@kline_1s"
+    assert is_closed(frame)
+    assert route_key({"s": "ETHUSDT"}) == "ETHUSDT"
+    assert not is_closed(make_frame("BTCUSDT", 50000))
+
+@pytest.mark.asyncio
+async def test_per_symbol_order_is_preserved():
+    seen = {}
+    
+    async def handler(frame):
+        data = json.loads(frame)["data"]
+        await asyncio.sleep(0)
+        seen.setdefault(data["s"], []).append(float(data["k"]["c"]))
+    
+    dispatcher = FrameDispatcher(handler, workers=3)
+    dispatcher.start()
+    for i in range(50):
+        for symbol in ["BTCUSDT", "ETHUSDT", "BNBUSDT"]:
+            await dispatcher.put(make_frame(symbol, i))
+    await dispatcher.stop()
+    
+    assert set(seen) == {"BTCUSDT", "ETHUSDT", "BNBUSDT"}
+    for prices in seen.values():
+        assert prices == [float(i) for i in range(50)]
+
+@pytest.mark.asyncio
+async def test_conflate_keeps_latest_unclosed_and_all_closed():
+    processed = []
+    
+    async def handler(frame):
+        processed.append(json.loads(frame)["data"]["k"]["c"])
+    
+    dispatcher = FrameDispatcher(handler, workers=1, conflate=True)
+    # Workers aren't running yet, so everything below piles up as a backlog
+    await dispatcher.put(make_frame("BTCUSDT", 1))
+    await dispatcher.put(make_frame("BTCUSDT", 2))
+    await dispatcher.put(make_frame("BTCUSDT", 3, closed=True))
+    await dispatcher.put(make_frame("BTCUSDT", 4))
+    await dispatcher.put(make_frame("BTCUSDT", 5))
+    assert dispatcher.depth == 2
+    assert dispatcher.conflated == 3
+    
+    dispatcher.start()
+    await dispatcher.stop()
+    assert processed == ["3", "5"]
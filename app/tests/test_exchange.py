@@ -0,0 +1,84 @@
+import pytest
+import time
+from datetime import datetime, timezone
+from app.services.exchange import SimulatedExchange
+from app.services.memory_store import InMemoryRepository
+from app.services.trading import TradingStrategy
+from app.models.models import TradingSignal
+
+def make_exchange(**kwargs):
+    options = dict(taker_fee=0.001, maker_fee=0.0005, latency_ms=0)
+    options.update(kwargs)
+    exchange = SimulatedExchange(**options)
+    exchange.apply_depth("BTCUSDT", bids=[["99", "2"], ["98", "5"]], asks=[["100", "1"], ["101", "1"], ["102", "5"]])
+    return exchange
+
+@pytest.mark.asyncio
+async def test_market_order_walks_the_book():
+    exchange = make_exchange()
+    order = await exchange.submit("BTCUSDT", "BUY", 3.0)
+    
+    assert order.status == "FILLED"
+    assert order.filled_quantity == 3.0
+    assert order.filled_price == pytest.approx((100 + 101 + 102) / 3)
+    assert order.fee == pytest.approx(303 * 0.001)
+    # The liquidity taken stays gone until the next depth update
+    assert exchange.book("BTCUSDT").asks.best == 102.0
+
+@pytest.mark.asyncio
+async def test_market_order_expires_unfilled_rest():
+    exchange = make_exchange()
+    order = await exchange.submit("BTCUSDT", "SELL", 10.0)
+    assert order.status == "EXPIRED"
+    assert order.filled_quantity == 7.0
+    assert order.filled_price == pytest.approx((2 * 99 + 5 * 98) / 7)
+
+@pytest.mark.asyncio
+async def test_limit_order_rests_and_fills_as_the_book_moves():
+    exchange = make_exchange()
+    order = await exchange.submit("BTCUSDT", "BUY", 3.0, order_type="LIMIT", price=100.5)
+    assert order.status == "PARTIALLY_FILLED" and order.filled_quantity == 1.0
+    
+    updated = exchange.apply_depth("BTCUSDT", bids=[["98", "1"]], asks=[["100.4", "1"], ["100.6", "9"]])
+    assert updated == [order] and order.filled_quantity == 2.0
+    exchange.apply_depth("BTCUSDT", bids=[["98", "1"]], asks=[["100.2", "5"]])
+    assert order.status == "FILLED"
+    # Resting fills are at the limit price and pay the maker fee
+    assert order.filled_price == pytest.approx((100 + 2 * 100.5) / 3)
+    assert order.fee == pytest.approx(100 * 0.001 + 201 * 0.0005)
+    assert not exchange.resting["BTCUSDT"]
+
+@pytest.mark.asyncio
+async def test_latency_delays_matching():
+    exchange = make_exchange(latency_ms=20)
+    start = time.monotonic()
+    await exchange.submit("BTCUSDT", "BUY", 1.0)
+    assert time.monotonic() - start >= 0.02
+
+def test_order_ids_are_unique_at_thousands_per_second():
+    exchange = SimulatedExchange(latency_ms=0, level_quantity=1e9)
+    start = time.perf_counter()
+    ids = set()
+    for i in range(5000):
+        exchange.apply_price("BTCUSDT", 100.0 + i % 10)
+        ids.add(exchange.execute(exchange.new_order("BTCUSDT", "BUY" if i % 2 else "SELL", 1.0)).order_id)
+    assert len(ids) == 5000
+    assert time.perf_counter() - start < 5
+
+@pytest.mark.asyncio
+async def test_strategy_positions_use_paper_fills():
+    repo = InMemoryRepository()
+    strategy = TradingStrategy(database=repo)
+    strategy.exchange = SimulatedExchange(taker_fee=0.001, latency_ms=0, spread_bps=20, step_bps=0)
+    now = datetime.now(tz=timezone.utc)
+    
+    for signal_type, price in [("BUY", 100.0), ("SELL", 110.0)]:
+        strategy.exchange.apply_price("BTCUSDT", price)
+        await strategy.execute_signal(TradingSignal(timestamp=now, symbol="BTCUSDT", signal_type=signal_type, price=price))
+    
+    [position] = repo.collections["positions"]
+    entry, exit = 100.0 * 1.001, 110.0 * 0.999
+    assert position["entry_price"] == pytest.approx(entry)
+    assert position["status"] == "CLOSED"
+    assert position["pnl"] == pytest.approx(exit - entry - 0.001 * (entry + exit))
+    assert {order["status"] for order in repo.collections["orders"]} == {"FILLED"}
@@ -0,0 +1,158 @@
+import pytest
+import pytest_asyncio
+import json
+import sqlite3
+from datetime import datetime, timezone, timedelta
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.api import endpoints
+from app.models.models import Tick, TradingSignal, Order
+from app.services.memory_store import InMemoryRepository
+from app.services.sqlite_store import SQLiteRepository
+from app.services.startup import StartupStages
+
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+async def seed(repo):
+    # Three BTCUSDT ticks share each second, so pages split timestamp ties
+    for n in range(30):
+        await repo.save_tick(Tick(START + timedelta(seconds=n // 3), "BTCUSDT", float(n), 1.0))
+        await repo.save_tick(Tick(START + timedelta(seconds=n), "ETHUSDT", 1000.0 + n, 1.0))
+    for n in range(5):
+        await repo.save_trading_signal(TradingSignal(
+            timestamp=START + timedelta(seconds=n), symbol="BTCUSDT", signal_type="BUY", price=float(n)
+        ))
+        await repo.save_order(Order(
+            order_id=f"mock_{n}", timestamp=START + timedelta(seconds=n), symbol="BTCUSDT" if n % 2 else "ETHUSDT",
+            side="BUY", quantity=1.0, price=float(n), status="NEW"
+        ))
+    await repo.update_order("mock_3", {"status": "FILLED", "filled_price": 3.5})
+
+@pytest.fixture(params=["memory", "sqlite", "mongo"])
+def storage(request, tmp_path):
+    # Only the Mongo case needs a server; test_db connects and cleans up itself
+    if request.param == "mongo":
+        return request.getfixturevalue("test_db")
+    return InMemoryRepository() if request.param == "memory" else SQLiteRepository(str(tmp_path / "wstrade.db"))
+
+@pytest_asyncio.fixture
+async def repository(storage):
+    owned = isinstance(storage, (InMemoryRepository, SQLiteRepository))
+    if owned:
+        await storage.connect_to_database()
+    await seed(storage)
+    yield storage
+    if owned:
+        await storage.close_database_connection()
+
+async def all_pages(repo, collection, limit, **query):
+    rows, cursor = [], None
+    while True:
+        page, cursor = await repo.get_history(collection, cursor=cursor, limit=limit, **query)
+        assert len(page) <= limit
+        rows += page
+        if cursor is None:
+            timestamps = [row["timestamp"] for row in rows]
+            assert timestamps == sorted(timestamps)
+            return rows
+
+@pytest.mark.asyncio
+async def test_keyset_pages_have_no_gaps_or_repeats(repository):
+    rows = await all_pages(
+        repository, "price_data", 4, symbol="BTCUSDT", start=START + timedelta(seconds=2), end=START + timedelta(seconds=8)
+    )
+    # Ties are ordered by storage id, which needn't follow insertion
+    assert sorted(row["price"] for row in rows) == [float(n) for n in range(6, 24)]
+    
+    rows = await all_pages(repository, "price_data", 7, start=START + timedelta(seconds=9))
+    assert sorted(row["price"] for row in rows) == [27.0, 28.0, 29.0] + [1000.0 + n for n in range(9, 30)]
+
+@pytest.mark.asyncio
+async def test_projection_and_document_collections(repository):
+    page, cursor = await repository.get_history("price_data", "ETHUSDT", limit=2, fields=["price"])
+    assert set(page[0]) == {"id", "timestamp", "price"} and cursor is not None
+    
+    orders = await all_pages(repository, "orders", 2, symbol="BTCUSDT")
+    assert [(order["order_id"], order["status"]) for order in orders] == [("mock_1", "NEW"), ("mock_3", "FILLED")]
+    signals, _ = await repository.get_history("trading_signals", "BTCUSDT", cursor=None, limit=10, fields=["price"])
+    assert [signal["price"] for signal in signals] == [0.0, 1.0, 2.0, 3.0, 4.0]
+
+@pytest.mark.asyncio
+async def test_memory_cursor_survives_eviction():
+    repo = InMemoryRepository(max_ticks=4)
+    for n in range(4):
+        await repo.save_tick(Tick(START, "BTCUSDT", float(n), 1.0))
+    page, cursor = await repo.get_history("price_data", "BTCUSDT", limit=2)
+    # Evicted ticks free their objects; new ones must still sort after the cursor
+    for n in range(4, 8):
+        await repo.save_tick(Tick(START, "BTCUSDT", float(n), 1.0))
+    rest, _ = await repo.get_history("price_data", "BTCUSDT", cursor=cursor, limit=10)
+    assert [row["price"] for row in page + rest] == [0.0, 1.0, 4.0, 5.0, 6.0, 7.0]
+
+@pytest.mark.asyncio
+async def test_sqlite_pages_orders_by_indexed_timestamp(tmp_path):
+    # A file from before orders had symbol and timestamp columns
+    path = str(tmp_path / "old.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE orders (order_id TEXT PRIMARY KEY, document TEXT NOT NULL)")
+    order = Order(order_id="old", timestamp=START, symbol="BTCUSDT", side="BUY", quantity=1.0, price=1.0, status="NEW")
+    conn.execute("INSERT INTO orders VALUES (?, ?)", ("old", order.model_dump_json()))
+    conn.commit()
+    conn.close()
+    
+    repo = SQLiteRepository(path)
+    await repo.connect_to_database()
+    await seed(repo)
+    orders = await all_pages(repo, "orders", 2, symbol="BTCUSDT")
+    assert [order["order_id"] for order in orders] == ["old", "mock_1", "mock_3"]
+    plan = repo.conn.execute(
+        "EXPLAIN QUERY PLAN SELECT rowid, document FROM orders WHERE symbol = ? AND timestamp >= ? ORDER BY timestamp, rowid",
+        ("BTCUSDT", 0)
+    ).fetchall()
+    assert "orders_symbol_timestamp" in str(plan)
+    await repo.close_database_connection()
+
+@pytest.fixture
+def client(monkeypatch):
+    repo = InMemoryRepository()
+    stages = StartupStages()
+    monkeypatch.setattr(endpoints, "db", repo)
+    monkeypatch.setattr(endpoints, "startup", stages)
+    app = FastAPI()
+    app.include_router(endpoints.router)
+    with TestClient(app) as client:
+        # Storage isn't up until its startup stage is done
+        assert client.get("/history/prices").status_code == 503
+        client.portal.call(stages.run, "storage", seed(repo))
+        yield client
+
+def test_history_endpoint_pages(client):
+    body = client.get("/history/prices", params={"symbol": "btcusdt", "limit": 10, "fields": "price"}).json()
+    assert len(body["data"]) == 10 and set(body["data"][0]) == {"id", "timestamp", "price"}
+    first = {row["id"] for row in body["data"]}
+    body = client.get("/history/prices", params={"symbol": "BTCUSDT", "limit": 25, "cursor": body["next_cursor"]}).json()
+    assert len(body["data"]) == 20 and not first & {row["id"] for row in body["data"]}
+    assert body["next_cursor"] is None
+    
+    assert client.get("/history/prices", params={"cursor": "nope"}).status_code == 400
+    assert client.get("/history/orders", params={"fields": "colour"}).status_code == 400
+    assert client.get("/history/candles").status_code == 404
+
+def test_history_streams_gzipped_ndjson(client):
+    response = client.get(
+        "/history/signals", params={"format": "ndjson"}, headers={"Accept-Encoding": "gzip"}
+    )
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert response.headers["content-encoding"] == "gzip"
+    # The test client already undoes the Content-Encoding
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["price"] for row in rows] == [0.0, 1.0, 2.0, 3.0, 4.0]
+    raw = client.get("/history/signals", params={"format": "ndjson"}, headers={"Accept-Encoding": "identity"})
+    assert raw.text.splitlines() == response.text.splitlines()
+
+def test_history_streams_arrow(client):
+    pa = pytest.importorskip("pyarrow")
+    response = client.get("/history/prices", params={"format": "arrow", "symbol": "ETHUSDT", "fields": "price,quantity"})
+    table = pa.ipc.open_stream(response.content).read_all()
+    assert table.column_names == ["id", "timestamp", "price", "quantity"]
+    assert table.column("price").to_pylist() == [1000.0 + n for n in range(30)]
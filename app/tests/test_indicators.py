@@ -0,0 +1,91 @@
+import pytest
+import numpy as np
+import pandas as pd
+from app.services.indicators import RollingSMA, RollingEMA, RollingRSI, SMACrossover, IndicatorGraph
+
+def test_rolling_sma_matches_window_mean():
+    prices = np.random.default_rng(42).normal(50000, 500, 1000)
+    sma = RollingSMA(50)
+    
+    for i, price in enumerate(prices):
+        value = sma.update(price)
+        expected = prices[max(0, i - 49):i + 1].mean()
+        assert value == pytest.approx(expected)
+    assert sma.is_full
+
+def test_rolling_sma_resync_keeps_values():
+    sma = RollingSMA(3)
+    sma.resync_interval = 4
+    for price in [1.0, 2.0, 3.0, 4.0, 5.0, 6.0]:
+        sma.update(price)
+    assert sma.value == pytest.approx(5.0)
+
+def test_rolling_sma_rejects_invalid_window():
+    with pytest.raises(ValueError):
+        RollingSMA(0)
+
+def test_crossover_requires_full_long_window():
+    indicator = SMACrossover(2, 4)
+    indicator.seed([10.0, 9.0, 8.0])
+    assert not indicator.ready
+    assert indicator.crossover() is None
+
+def test_crossover_detects_buy_and_sell():
+    indicator = SMACrossover(2, 4).seed([10.0, 9.0, 8.0, 7.0])
+    indicator.update(12.0)
+    assert indicator.crossover() == "BUY"
+    
+    indicator = SMACrossover(2, 4).seed([7.0, 8.0, 9.0, 10.0])
+    indicator.update(5.0)
+    assert indicator.crossover() == "SELL"
+
+def test_rolling_ema_matches_pandas():
+    prices = np.random.default_rng(7).normal(100, 5, 300)
+    ema = RollingEMA(20)
+    values = [ema.update(price) for price in prices]
+    expected = pd.Series(prices).ewm(span=20, adjust=False).mean()
+    assert values == pytest.approx(expected.tolist())
+
+def test_rolling_rsi_uses_wilder_smoothing():
+    rsi = RollingRSI(3)
+    values = [rsi.update(price) for price in [10.0, 11.0, 12.0, 11.0, 12.0]]
+    assert values[:3] == [None, None, None]
+    # Changes +1, +1, -1: averages 2/3 and 1/3
+    assert values[3] == pytest.approx(100 - 100 / (1 + 2.0))
+    # Then +1: gain (2/3 * 2 + 1) / 3, loss (1/3 * 2) / 3
+    assert values[4] == pytest.approx(100 - 100 / (1 + (7 / 9) / (2 / 9)))
+
+def test_rsi_is_100_without_losses():
+    rsi = RollingRSI(2)
+    assert [rsi.update(price) for price in [1.0, 2.0, 3.0]][-1] == 100.0
+
+def test_graph_shares_nodes_between_indicators():
+    graph = IndicatorGraph()
+    graph.add(("sma", 20))
+    graph.add(("bollinger", 20, 2.0))
+    graph.add(("sma", 20))
+    # Bollinger reuses the SMA and adds only the deviation
+    assert graph.order == [("sma", 20), ("std", 20), ("bollinger", 20, 2.0)]
+    
+    prices = np.random.default_rng(3).normal(100, 5, 100)
+    graph.seed(prices)
+    window = pd.Series(prices[-20:])
+    lower, middle, upper = graph[("bollinger", 20, 2.0)]
+    assert middle == pytest.approx(window.mean())
+    assert upper - middle == pytest.approx(2.0 * window.std(ddof=0))
+    assert lower == pytest.approx(2 * middle - upper)
+    assert graph.ready(("bollinger", 20, 2.0))
+
+def test_graph_keeps_previous_values():
+    graph = IndicatorGraph()
+    graph.add(("price",))
+    graph.add(("ema", 3))
+    graph.seed([1.0, 2.0])
+    assert not graph.ready(("ema", 3))
+    graph.update(3.0)
+    assert graph.prev[("price",)] == 2.0 and graph[("price",)] == 3.0
+    assert graph.ticks == 3 and graph.ready(("ema", 3))
+
+def test_graph_rejects_unknown_indicator():
+    with pytest.raises(ValueError):
+        IndicatorGraph().add(("macd", 12))
@@ -0,0 +1,117 @@
+import pytest
+import asyncio
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from pymongo.errors import AutoReconnect
+from app.models.models import PriceData, Order
+from app.services.persistence import WriteBehindQueue
+
+pytestmark = pytest.mark.asyncio
+
+def make_price(i):
+    return PriceData(
+        timestamp=datetime.now(tz=timezone.utc),
+        symbol="BTCUSDT",
+        price=float(50000 + i),
+        quantity=1.0
+    )
+
+class FlakyCollection:
+    # Fails the first `failures` inserts, then stores after `delay` seconds
+    def __init__(self, failures: int = 0, delay: float = 0.0):
+        self.failures = failures
+        self.delay = delay
+        self.documents = []
+
+    async def insert_many(self, documents, ordered=True):
+        if self.failures:
+            self.failures -= 1
+            raise AutoReconnect("primary stepped down")
+        await asyncio.sleep(self.delay)
+        self.documents += documents
+
+def fake_database(collection):
+    return SimpleNamespace(client={"test": {"price_data": collection}}, settings=SimpleNamespace(DB_NAME="test"))
+
+async def test_failed_batches_are_retried():
+    collection = FlakyCollection(failures=2)
+    writer = WriteBehindQueue(fake_database(collection), max_attempts=3, retry_backoff=0.01)
+    await writer.put("price_data", {"price": 1.0})
+    await writer.flush()
+    assert collection.documents == [{"price": 1.0}]
+
+async def test_batches_are_dropped_after_max_attempts():
+    collection = FlakyCollection(failures=5)
+    writer = WriteBehindQueue(fake_database(collection), max_attempts=2, retry_backoff=0.01)
+    await writer.put("price_data", {"price": 1.0})
+    await writer.flush()
+    assert collection.documents == [] and collection.failures == 3
+
+async def test_stop_waits_for_the_batch_in_flight():
+    collection = FlakyCollection(delay=0.1)
+    writer = WriteBehindQueue(fake_database(collection), batch_size=1)
+    writer.start()
+    await writer.put("price_data", {"price": 1.0})
+    await asyncio.sleep(0.02)  # The batch is now inside insert_many
+    await writer.stop()
+    assert collection.documents == [{"price": 1.0}]
+
+async def test_writes_are_batched_until_flush(test_db):
+    test_db.writer.flush_interval = 60
+    test_db.writer.start()
+    
+    for i in range(5):
+        await test_db.save_price_data(make_price(i))
+    
+    collection = test_db.client[test_db.settings.DB_NAME]["price_data"]
+    await asyncio.sleep(0)
+    assert await collection.count_documents({}) == 0
+    
+    await test_db.writer.stop()
+    assert await collection.count_documents({}) == 5
+    assert test_db.writer.depth == 0
+
+async def test_size_threshold_triggers_flush(test_db):
+    test_db.writer.batch_size = 3
+    test_db.writer.flush_interval = 60
+    test_db.writer.start()
+    
+    for i in range(3):
+        await test_db.save_price_data(make_price(i))
+    await asyncio.sleep(0.05)
+    
+    collection = test_db.client[test_db.settings.DB_NAME]["price_data"]
+    assert await collection.count_documents({}) == 3
+    await test_db.writer.stop()
+
+async def test_time_threshold_triggers_flush(test_db):
+    test_db.writer.flush_interval = 0.01
+    test_db.writer.start()
+    
+    await test_db.save_price_data(make_price(0))
+    await asyncio.sleep(0.1)
+    
+    collection = test_db.client[test_db.settings.DB_NAME]["price_data"]
+    assert await collection.count_documents({}) == 1
+    await test_db.writer.stop()
+
+async def test_update_order_sees_queued_order(test_db):
+    test_db.writer.flush_interval = 60
+    test_db.writer.start()
+    
+    order = Order(
+        order_id="queued_order",
+        timestamp=datetime.now(tz=timezone.utc),
+        symbol="BTCUSDT",
+        side="BUY",
+        quantity=1.0,
+        price=50000.0,
+        status="NEW"
+    )
+    await test_db.save_order(order)
+    await test_db.update_order("queued_order", {"status": "FILLED"})
+    
+    collection = test_db.client[test_db.settings.DB_NAME]["orders"]
+    saved_order = await collection.find_one({"order_id": "queued_order"})
+    assert saved_order["status"] == "FILLED"
+    await test_db.writer.stop()
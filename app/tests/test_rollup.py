@@ -0,0 +1,84 @@
+import pytest
+from datetime import datetime, timezone, timedelta
+from app.models.models import PriceData, Tick
+from app.services.rollup import floor_time
+
+async def require_date_trunc(test_db):
+    # $dateTrunc (and time-series collections) need MongoDB 5.0+
+    collection = test_db.client[test_db.settings.DB_NAME]["capabilities"]
+    await collection.insert_one({"timestamp": datetime.now(tz=timezone.utc)})
+    try:
+        await collection.aggregate([
+            {"$project": {"t": {"$dateTrunc": {"date": "$timestamp", "unit": "minute"}}}}
+        ]).to_list(length=1)
+    except Exception:
+        pytest.skip("MongoDB server does not support $dateTrunc")
+
+async def save_ticks(test_db, base_time, count):
+    for i in range(count):
+        await test_db.save_price_data(PriceData(
+            timestamp=base_time + timedelta(seconds=i),
+            symbol="BTCUSDT",
+            price=float(100 + i),
+            quantity=1.0
+        ))
+
+def test_floor_time():
+    moment = datetime(2024, 1, 1, 10, 37, 45, tzinfo=timezone.utc)
+    assert floor_time(moment, 60) == datetime(2024, 1, 1, 10, 37, tzinfo=timezone.utc)
+    assert floor_time(moment, 3600) == datetime(2024, 1, 1, 10, tzinfo=timezone.utc)
+
+@pytest.mark.asyncio
+async def test_rollup_builds_ohlcv_bars(test_db):
+    await require_date_trunc(test_db)
+    base_time = datetime(2024, 1, 1, 10, 0, tzinfo=timezone.utc)
+    await save_ticks(test_db, base_time, 150)
+    
+    await test_db.rollup.run_once(now=base_time + timedelta(hours=2))
+    
+    bars = test_db.client[test_db.settings.DB_NAME]["price_data_1m"]
+    first = await bars.find_one({"symbol": "BTCUSDT"}, sort=[("timestamp", 1)])
+    assert (first["open"], first["high"], first["low"], first["close"]) == (100.0, 159.0, 100.0, 159.0)
+    assert first["ticks"] == 60
+    assert await bars.count_documents({}) == 3
+    
+    hourly = await test_db.client[test_db.settings.DB_NAME]["price_data_1h"].find_one({})
+    assert hourly["ticks"] == 150
+    assert hourly["close"] == 249.0
+    
+    # Running again over the same range is idempotent
+    await test_db.rollup.run_once(now=base_time + timedelta(hours=2))
+    assert await bars.count_documents({}) == 3
+
+@pytest.mark.asyncio
+async def test_late_ticks_below_the_watermark_are_rolled_up(test_db):
+    await require_date_trunc(test_db)
+    base_time = datetime(2024, 1, 1, 10, 0, tzinfo=timezone.utc)
+    await save_ticks(test_db, base_time, 150)
+    await test_db.rollup.run_once(now=base_time + timedelta(hours=2))
+    
+    # A backfill lands in the first minute after it was rolled up
+    await test_db.save_ticks([Tick(base_time + timedelta(seconds=30, milliseconds=500), "BTCUSDT", 500.0, 1.0)])
+    await test_db.rollup.run_once(now=base_time + timedelta(hours=2))
+    
+    first = await test_db.client[test_db.settings.DB_NAME]["price_data_1m"].find_one({}, sort=[("timestamp", 1)])
+    assert first["ticks"] == 61 and first["high"] == 500.0
+    hourly = await test_db.client[test_db.settings.DB_NAME]["price_data_1h"].find_one({})
+    assert hourly["ticks"] == 151
+    assert test_db.rollup.dirty_since is None
+
+@pytest.mark.asyncio
+async def test_price_history_prefers_coarsest_rollup(test_db):
+    await require_date_trunc(test_db)
+    base_time = datetime(2024, 1, 1, 10, 0, tzinfo=timezone.utc)
+    await save_ticks(test_db, base_time, 150)
+    await test_db.rollup.run_once(now=base_time + timedelta(minutes=3, seconds=10))
+    
+    # Only the 1m rollup covers the range, and 2m bars are built from it
+    bars = await test_db.get_price_history("BTCUSDT", base_time, base_time + timedelta(minutes=3), interval=120)
+    assert [bar.ticks for bar in bars] == [120, 30]
+    assert bars[0].open == 100.0 and bars[0].close == 219.0
+    
+    # Beyond the rollup watermark, raw ticks are used
+    bars = await test_db.get_price_history("BTCUSDT", base_time, base_time + timedelta(minutes=10), interval=60)
+    assert sum(bar.ticks for bar in bars) == 150
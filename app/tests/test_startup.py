@@ -0,0 +1,53 @@
+import pytest
+import asyncio
+import subprocess
+import sys
+import time
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.api import endpoints
+from app.services.startup import StartupStages
+
+# Loaded on first use, never by importing the service
+DEFERRED = ("app.tests", "numpy", "pandas", "motor", "pymongo", "redis", "pyarrow")
+
+def test_importing_the_app_defers_heavy_modules():
+    script = f"import sys, app.main; print([name for name in {DEFERRED!r} if name in sys.modules])"
+    result = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True)
+    assert result.stdout.strip().splitlines()[-1] == "[]"
+
+@pytest.mark.asyncio
+async def test_stages_run_concurrently_and_report():
+    stages = StartupStages()
+    start = time.monotonic()
+    await asyncio.gather(stages.run("storage", asyncio.sleep(0.1)), stages.run("bus", asyncio.sleep(0.1)))
+    assert time.monotonic() - start < 0.18
+    assert not stages.ready
+    stages.finish()
+    assert stages.ready and stages.snapshot()["stages"]["bus"]["status"] == "ready"
+
+def test_ready_and_health_follow_the_stages(monkeypatch):
+    stages = StartupStages()
+    monkeypatch.setattr(endpoints, "startup", stages)
+    app = FastAPI()
+    app.include_router(endpoints.router)
+    client = TestClient(app)
+    assert client.get("/ready").status_code == 503
+
+    async def fail():
+        raise ConnectionError("Mongo is down")
+    with pytest.raises(ConnectionError):
+        asyncio.run(stages.run("storage", fail()))
+    stage = client.get("/ready").json()["stages"]["storage"]
+    assert stage["status"] == "failed" and stage["error"] == "Mongo is down"
+    assert client.get("/health").status_code == 503
+
+@pytest.mark.asyncio
+async def test_optional_stage_failure_is_recorded_but_not_fatal():
+    stages = StartupStages()
+    async def fail():
+        raise ConnectionError("REST API is down")
+    assert await stages.run("backfill", fail(), required=False) is None
+    stages.finish()
+    assert stages.snapshot()["stages"]["backfill"]["status"] == "failed"
+    assert stages.ready and not stages.failed
@@ -0,0 +1,120 @@
+import pytest
+import pytest_asyncio
+from datetime import datetime, timezone, timedelta
+from app.models.models import PriceData, TradingSignal, Order, Position, KlineTick
+from app.services.database import create_repository
+from app.services.memory_store import InMemoryRepository
+from app.services.repository import Repository
+from app.services.sqlite_store import SQLiteRepository
+from app.services.trading import TradingStrategy
+
+pytestmark = pytest.mark.asyncio
+
+@pytest_asyncio.fixture(params=["memory", "sqlite"])
+async def repository(request, tmp_path):
+    if request.param == "memory":
+        repo = InMemoryRepository()
+    else:
+        repo = SQLiteRepository(str(tmp_path / "wstrade.db"))
+    await repo.connect_to_database()
+    yield repo
+    await repo.close_database_connection()
+
+async def test_create_repository_rejects_unknown_backend():
+    assert isinstance(create_repository("memory"), InMemoryRepository)
+    with pytest.raises(ValueError):
+        create_repository("cassandra")
+
+async def test_incomplete_backend_fails_on_construction():
+    class WriteOnlyRepository(Repository):
+        async def _insert(self, collection_name, data):
+            pass
+    with pytest.raises(TypeError, match="_find_recent_ticks"):
+        WriteOnlyRepository()
+
+async def test_recent_prices_newest_first(repository):
+    base_time = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    for i in range(5):
+        await repository.save_price_data(PriceData(
+            timestamp=base_time + timedelta(seconds=i), symbol="BTCUSDT", price=50000.0 + i, quantity=1.0
+        ))
+
+    prices = await repository.get_recent_prices("BTCUSDT", limit=3)
+
+    assert [p.price for p in prices] == [50004.0, 50003.0, 50002.0]
+    assert prices[0].timestamp == base_time + timedelta(seconds=4)
+    # The second read is served from the price cache
+    await repository.get_recent_prices("BTCUSDT", limit=3)
+    assert repository.cache_stats()["hits"] == 1
+
+async def test_kline_fields_round_trip(repository):
+    opened = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    await repository.save_tick(KlineTick(opened, "BTCUSDT", 101.0, 2.0, 100.0, 102.0, 99.0, opened + timedelta(seconds=59), 7))
+    repository.price_cache.invalidate()
+
+    tick = (await repository.get_recent_ticks("BTCUSDT", 1))[0]
+
+    assert (tick.open, tick.high, tick.low, tick.trades) == (100.0, 102.0, 99.0, 7)
+
+async def test_save_and_update_order(repository):
+    await repository.save_order(Order(
+        order_id="test_order_1", timestamp=datetime.now(tz=timezone.utc), symbol="BTCUSDT",
+        side="BUY", quantity=1.0, price=50000.0, status="NEW"
+    ))
+    await repository.update_order("test_order_1", {"status": "FILLED", "filled_price": 50100.0})
+
+    order = await repository.get_order("test_order_1")
+    assert order.status == "FILLED"
+    assert order.filled_price == 50100.0
+    assert await repository.get_order("missing") is None
+
+async def test_positions_and_stats_reconcile(repository):
+    now = datetime.now(tz=timezone.utc)
+    await repository.save_trading_signal(TradingSignal(
+        timestamp=now, symbol="BTCUSDT", signal_type="BUY", price=100.0, short_sma=101.0, long_sma=100.0
+    ))
+    await repository.save_position(Position(
+        symbol="BTCUSDT", side="LONG", entry_price=100.0, quantity=1.0, timestamp=now, status="OPEN"
+    ))
+    assert (await repository.get_open_position("BTCUSDT")).entry_price == 100.0
+
+    await repository.update_position("BTCUSDT", {"status": "CLOSED", "pnl": 5.0})
+    assert await repository.get_open_position("BTCUSDT") is None
+
+    repository.stats.symbols.clear()
+    await repository.reconcile_stats()
+    snapshot = repository.trading_stats("BTCUSDT")
+    assert snapshot["total_signals"] == 1
+    assert snapshot["total_positions"] == 1
+    assert snapshot["closed_positions"] == 1
+    assert snapshot["total_pnl"] == 5.0
+
+async def test_price_history_and_series(repository):
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    for i, price in enumerate([10.0, 12.0, 9.0, 11.0, 20.0]):
+        await repository.save_price_data(PriceData(
+            timestamp=start + timedelta(seconds=20 * i), symbol="BTCUSDT", price=price, quantity=1.0
+        ))
+
+    bars = await repository.get_price_history("BTCUSDT", start, start + timedelta(minutes=2), interval=60)
+
+    assert [(b.open, b.high, b.low, b.close, b.ticks) for b in bars] == [(10.0, 12.0, 9.0, 9.0, 3), (11.0, 20.0, 11.0, 20.0, 2)]
+    series = await repository.get_price_series("BTCUSDT", start + timedelta(seconds=20), start + timedelta(seconds=80))
+    assert [row["price"] for row in series] == [12.0, 9.0, 11.0]
+
+async def test_strategy_runs_on_repository(repository):
+    strategy = TradingStrategy(database=repository)
+    strategy.short_period, strategy.long_period = 2, 4
+    base_time = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    signals = []
+    for i, price in enumerate([10.0, 10.0, 10.0, 10.0, 9.0, 12.0, 13.0, 5.0]):
+        await repository.save_price_data(PriceData(
+            timestamp=base_time + timedelta(seconds=i), symbol="BTCUSDT", price=price, quantity=1.0
+        ))
+        signal = await strategy.generate_signal("BTCUSDT", price)
+        if signal:
+            signals.append(signal.signal_type)
+            await strategy.execute_signal(signal)
+
+    assert signals == ["BUY", "SELL"]
+    assert repository.trading_stats("BTCUSDT")["closed_positions"] == 1
@@ -0,0 +1,59 @@
+import pytest
+import json
+from app.tools.recorder import read_recording, write_recording
+from app.tools.replay import fan_out, frame_symbols, load_frames, synthetic_frames
+from app.tools.loadtest import NullDatabase, run_load_test
+
+def test_recording_round_trip(tmp_path):
+    frames = synthetic_frames(["BTCUSDT"], 3)
+    path = tmp_path / "frames.gz"
+    write_recording(path, [(1000 + i * 250, frame) for i, (_, frame) in enumerate(frames)])
+
+    assert read_recording(path)[1] == (1250, frames[1][1])
+    assert [offset for offset, _ in load_frames(path)] == [0.0, 0.25, 0.5]
+
+def test_fan_out_renames_symbols():
+    frames = fan_out(synthetic_frames(["BTCUSDT"], 2), 3)
+
+    assert len(frames) == 6
+    assert frame_symbols(frames) == ["BTCUSDT0000", "BTCUSDT0001", "BTCUSDT0002"]
+    message = json.loads(frames[1][1])
+    assert message["stream"].startswith("btcusdt0001@kline_")
+    assert message["data"]["k"]["s"] == "BTCUSDT0001"
+
+@pytest.mark.asyncio
+async def test_load_test_survives_disconnects():
+    frames = synthetic_frames(["BTCUSDT", "ETHUSDT"], 300)
+
+    report = await run_load_test(frames, NullDatabase(), speed=0, disconnect_every=100)
+
+    assert report["handled"] == 300
+    assert report["dropped"] == 0
+    assert report["reconnects"] == 2
+    assert report["p99_latency_ms"] >= report["p50_latency_ms"]
+
+@pytest.mark.asyncio
+async def test_load_test_closes_positions(monkeypatch):
+    from app.core.config import settings
+    monkeypatch.setattr(settings, "SHORT_TERM_PERIOD", 2)
+    monkeypatch.setattr(settings, "LONG_TERM_PERIOD", 5)
+    closed = []
+    
+    class RecordingDatabase(NullDatabase):
+        async def update_position(self, symbol, update_data, strategy=None):
+            closed.append(symbol)
+            await super().update_position(symbol, update_data, strategy=strategy)
+    
+    report = await run_load_test(synthetic_frames(["BTCUSDT"], 300), RecordingDatabase())
+    
+    assert report["handled"] == 300
+    assert closed
+
+@pytest.mark.asyncio
+async def test_load_test_fails_on_handler_errors():
+    class BrokenDatabase(NullDatabase):
+        async def save_tick(self, tick):
+            raise ValueError("disk full")
+    
+    with pytest.raises(RuntimeError, match="300 frames failed"):
+        await run_load_test(synthetic_frames(["BTCUSDT"], 300), BrokenDatabase())
@@ -1,6 +1,6 @@
 import pytest
 from datetime import datetime, timezone, timedelta
-from app.services.trading import TradingStrategy
+from app.services.trading import TradingStrategy, StrategyRegistry
 from app.models.models import PriceData
 
 @pytest.mark.asyncio
@@ -46,7 +46,7 @@ async def test_buy_signal_generation(test_db):
         await test_db.save_price_data(price_data)
 
     for i in range(5):
-        price = 45000.0 + (i * 2000)
+        price = 45000.0 + (i * 3000)
         price_data = PriceData(
             timestamp=base_time + timedelta(minutes=strategy.long_period - 3 + i),
             symbol="BTCUSDT",
@@ -79,7 +79,7 @@ async def test_sell_signal_generation(test_db):
         await test_db.save_price_data(price_data)
 
     for i in range(5):
-        price = 55000.0 - (i * 2000)
+        price = 55000.0 - (i * 3000)
         price_data = PriceData(
             timestamp=base_time + timedelta(minutes=strategy.long_period - 3 + i),
             symbol="BTCUSDT",
@@ -91,4 +91,95 @@ async def test_sell_signal_generation(test_db):
     # Test signal generation
     signal = await strategy.generate_signal("BTCUSDT", 53000.0)
     assert signal is not None
-    assert signal.signal_type == "SELL" 
\ No newline at end of file
+    assert signal.signal_type == "SELL"
+
+@pytest.mark.asyncio
+async def test_incremental_signal_after_warm_up(test_db):
+    strategy = TradingStrategy(database=test_db)
+    strategy.short_period = 5
+    strategy.long_period = 10
+    base_time = datetime.now(tz=timezone.utc)
+
+    prices = [50000.0 - (i * 100) for i in range(5)] + [45000.0 + (i * 3000) for i in range(4)]
+    for i, price in enumerate(prices):
+        await test_db.save_price_data(PriceData(
+            timestamp=base_time + timedelta(minutes=i),
+            symbol="BTCUSDT",
+            price=price,
+            quantity=1.0
+        ))
+
+    await strategy.warm_up("BTCUSDT")
+    assert await strategy.generate_signal("BTCUSDT", 54000.0) is not None
+    assert strategy.indicators["BTCUSDT"].ticks == 10
+
+async def feed(registry, symbol, prices):
+    signals = []
+    base_time = datetime.now(tz=timezone.utc)
+    for i, price in enumerate(prices):
+        timestamp = base_time + timedelta(seconds=i)
+        await registry.db.save_price_data(PriceData(timestamp=timestamp, symbol=symbol, price=price, quantity=1.0))
+        signals += await registry.on_tick(symbol, price, timestamp)
+    return signals
+
+@pytest.mark.asyncio
+async def test_variants_share_one_indicator_graph(test_db):
+    registry = StrategyRegistry(test_db, configs=[
+        {"type": "sma_cross", "fast": 2, "slow": 4},
+        {"type": "sma_cross", "fast": 2, "slow": 6},
+        {"type": "bollinger", "window": 4},
+        {"type": "rsi", "period": 4},
+    ])
+    await feed(registry, "BTCUSDT", [10.0, 11.0, 12.0])
+    
+    graph = registry.engine("BTCUSDT").graph
+    assert sorted(graph.nodes) == sorted([
+        ("sma", 2), ("sma", 4), ("sma", 6), ("price",), ("std", 4), ("bollinger", 4, 2.0), ("rsi", 4)
+    ])
+    assert graph.ticks == 3
+
+@pytest.mark.asyncio
+async def test_variants_track_their_own_positions(test_db):
+    registry = StrategyRegistry(test_db, configs=[
+        {"type": "sma_cross", "fast": 2, "slow": 4},
+        {"type": "ema_cross", "fast": 2, "slow": 4},
+    ])
+    registry.get("BTCUSDT").short_period = 2
+    registry.get("BTCUSDT").long_period = 4
+    
+    signals = await feed(registry, "BTCUSDT", [10.0, 10.0, 10.0, 10.0, 9.0, 12.0, 13.0, 5.0])
+    
+    # The default strategy and the identical sma_cross variant agree
+    by_strategy = {}
+    for signal in signals:
+        by_strategy.setdefault(signal.strategy, []).append(signal.signal_type)
+    assert by_strategy[None] == by_strategy["sma_cross_2_4"] == ["BUY", "SELL"]
+    assert by_strategy["ema_cross_2_4"][0] == "BUY"
+    
+    positions = await test_db.client[test_db.settings.DB_NAME]["positions"].find({}, {"_id": 0}).to_list(None)
+    assert {position["strategy"] for position in positions} == {None, "sma_cross_2_4", "ema_cross_2_4"}
+    # Closing one strategy's position leaves the others alone
+    for position in positions:
+        assert position["status"] == ("CLOSED" if by_strategy[position["strategy"]][-1] == "SELL" else "OPEN")
+
+@pytest.mark.asyncio
+async def test_rsi_waits_for_a_previous_value(test_db):
+    registry = StrategyRegistry(test_db, configs=[{"type": "rsi", "period": 3}])
+    # RSI is first computed on the fourth tick, with nothing to compare to
+    signals = await feed(registry, "BTCUSDT", [10.0, 9.0, 8.0, 7.0, 12.0])
+    assert [(signal.strategy, signal.signal_type) for signal in signals] == [("rsi_3_30.0_70.0", "BUY")]
+
+def test_unknown_strategy_type_is_rejected():
+    with pytest.raises(ValueError):
+        StrategyRegistry(configs=[{"type": "martingale"}]).engine("BTCUSDT")
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("executor", ["inline", "thread", "process"])
+async def test_window_strategy_runs_on_executor(test_db, executor):
+    registry = StrategyRegistry(test_db, configs=[{"type": "zscore", "window": 5, "entry": 1.5, "executor": executor}])
+    try:
+        signals = await feed(registry, "BTCUSDT", [10.0, 10.2, 9.8, 10.1, 9.9, 10.0, 5.0, 9.0, 10.0, 16.0, 11.0])
+    finally:
+        registry.close()
+    assert [signal.signal_type for signal in signals] == ["BUY", "SELL"]
+    assert signals[0].strategy == "zscore_5_1.5"
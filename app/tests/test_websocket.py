@@ -1,6 +1,10 @@
 import pytest
+import asyncio
 import json
-from app.services.websocket import BinanceWebsocket, WebSocketClient
+from datetime import datetime, timezone
+from app.core.config import settings
+from app.services.websocket import BinanceWebsocket, BinanceStreamPool, WebSocketClient
+from app.core.serialization import available_decoders, get_decoder
 
 @pytest.mark.asyncio
 async def test_websocket_message_handling(test_db):
@@ -99,4 +103,132 @@ async def test_websocket_receive_message(mock_websocket, mock_websocket_message)
     # Get message and verify
     message = await client.receive_message()
     assert message == mock_websocket_message
-    mock_websocket.recv.assert_called_once()  # Verify recv was called exactly once 
\ No newline at end of file
+    mock_websocket.recv.assert_called_once()  # Verify recv was called exactly once
+
+@pytest.mark.asyncio
+async def test_combined_stream_routes_by_symbol(test_db, mock_websocket_message):
+    ws = BinanceWebsocket(database=test_db, symbols=["BTCUSDT", "ETHUSDT"])
+    assert ws.ws_url.endswith("/stream?streams=btcusdt@kline_1s/ethusdt@kline_1s")
+    
+    for symbol in ["BTCUSDT", "ETHUSDT"]:
+        data = dict(mock_websocket_message, s=symbol)
+        frame = {"stream": f"{symbol.lower()}@kline_1s", "data": data}
+        await ws.handle_message(json.dumps(frame))
+    
+    collection = test_db.client[test_db.settings.DB_NAME]["price_data"]
+    assert await collection.count_documents({"symbol": "BTCUSDT"}) == 1
+    assert await collection.count_documents({"symbol": "ETHUSDT"}) == 1
+    assert "BTCUSDT" in ws.strategies and "ETHUSDT" in ws.strategies
+    assert ws.strategies.get("BTCUSDT") is not ws.strategies.get("ETHUSDT")
+
+def test_stream_pool_shards_by_connection_limit():
+    symbols = [f"SYM{i}USDT" for i in range(5)]
+    pool = BinanceStreamPool(symbols=symbols, max_streams=2)
+    
+    assert [shard.symbols for shard in pool.shards] == [symbols[0:2], symbols[2:4], symbols[4:]]
+    assert all(shard.strategies is pool.strategies for shard in pool.shards)
+    assert not pool.is_healthy()
+
+def test_stream_pool_counts_depth_streams(monkeypatch):
+    monkeypatch.setattr(settings, "PAPER_TRADING", True)
+    monkeypatch.setattr(settings, "PAPER_DEPTH_STREAM", True)
+    symbols = [f"SYM{i}USDT" for i in range(5)]
+    pool = BinanceStreamPool(symbols=symbols, max_streams=4)
+    
+    assert [shard.symbols for shard in pool.shards] == [symbols[0:2], symbols[2:4], symbols[4:]]
+    assert all(len(shard.ws_url.split("streams=")[1].split("/")) <= 4 for shard in pool.shards)
+
+@pytest.mark.asyncio
+async def test_stream_pool_stop_handles_queued_frames():
+    pool = BinanceStreamPool(symbols=["BTCUSDT", "ETHUSDT"], max_streams=1)
+    handled = []
+    async def handler(frame):
+        await asyncio.sleep(0.01)
+        handled.append(frame)
+    for shard in pool.shards:
+        shard.dispatcher.handler = handler
+        shard.dispatcher.start()
+        await shard.dispatcher.put({"s": shard.symbols[0]})
+    
+    await pool.stop()
+    assert len(handled) == 2
+    assert not any(shard.dispatcher.running for shard in pool.shards)
+
+def test_decoders_agree(mock_websocket_message):
+    raw = json.dumps(mock_websocket_message)
+    decoders = available_decoders()
+    assert "json" in decoders
+    for backend, decode in decoders.items():
+        assert decode(raw) == mock_websocket_message, backend
+
+def test_unknown_decoder_rejected():
+    with pytest.raises(ValueError):
+        get_decoder("yaml")
+
+@pytest.mark.asyncio
+async def test_closed_kline_mode_persists_each_candle_once(test_db, mock_websocket_message, monkeypatch):
+    monkeypatch.setattr(settings, "KLINE_CLOSED_ONLY", True)
+    monkeypatch.setattr(settings, "KLINE_STORE_OHLCV", True)
+    ws = BinanceWebsocket(database=test_db)
+    
+    def kline_update(close, closed):
+        kline = dict(mock_websocket_message["k"], c=close, x=closed)
+        return dict(mock_websocket_message, k=kline)
+    
+    for close in ["50500.00", "50700.00"]:
+        await ws.handle_message(kline_update(close, False))
+    assert ws.open_klines["BTCUSDT"].price == 50700.0
+    
+    await ws.handle_message(kline_update("50800.00", True))
+    await ws.handle_message(kline_update("50800.00", True))  # replayed after a reconnect
+    
+    collection = test_db.client[test_db.settings.DB_NAME]["price_data"]
+    saved = [doc async for doc in collection.find({"symbol": "BTCUSDT"})]
+    assert len(saved) == 1
+    assert saved[0]["price"] == 50800.0
+    assert saved[0]["high"] == 51100.0
+    assert saved[0]["timestamp"].replace(tzinfo=timezone.utc) == datetime.fromtimestamp(1619999940, tz=timezone.utc)
+    assert "BTCUSDT" not in ws.open_klines
+
+@pytest.mark.asyncio
+async def test_ticks_use_exchange_event_time(test_db, mock_websocket_message):
+    ws = BinanceWebsocket(database=test_db)
+    await ws.handle_message(mock_websocket_message)
+    
+    collection = test_db.client[test_db.settings.DB_NAME]["price_data"]
+    saved = await collection.find_one({"symbol": "BTCUSDT"})
+    assert saved["timestamp"].replace(tzinfo=timezone.utc) == datetime.fromtimestamp(1619999999.999, tz=timezone.utc)
+
+@pytest.mark.asyncio
+async def test_handle_message_records_stage_metrics(test_db, mock_websocket_message):
+    from prometheus_client import REGISTRY
+    
+    def sample(name, labels):
+        return REGISTRY.get_sample_value(name, labels) or 0.0
+    
+    ws = BinanceWebsocket(database=test_db)
+    messages = sample("websocket_messages_total", {"symbol": "BTCUSDT"})
+    persisted = sample("tick_stage_latency_seconds_count", {"stage": "persist", "symbol": "BTCUSDT"})
+    lag = sample("exchange_lag_seconds_count", {"symbol": "BTCUSDT"})
+    inserts = sample("mongodb_operation_latency_seconds_count", {"collection": "price_data", "operation": "insert_one"})
+    
+    await ws.handle_message(json.dumps(mock_websocket_message))
+    
+    assert sample("websocket_messages_total", {"symbol": "BTCUSDT"}) == messages + 1
+    assert sample("tick_stage_latency_seconds_count", {"stage": "decode", "symbol": "BTCUSDT"}) >= 1
+    assert sample("tick_stage_latency_seconds_count", {"stage": "persist", "symbol": "BTCUSDT"}) == persisted + 1
+    assert sample("exchange_lag_seconds_count", {"symbol": "BTCUSDT"}) == lag + 1
+    assert sample("mongodb_operation_latency_seconds_count", {"collection": "price_data", "operation": "insert_one"}) == inserts + 1
+
+@pytest.mark.asyncio
+async def test_depth_frames_feed_the_paper_exchange(test_db):
+    from app.services.exchange import SimulatedExchange
+    exchange = SimulatedExchange(latency_ms=0)
+    ws = BinanceWebsocket(database=test_db, exchange=exchange)
+    await ws.handle_message(json.dumps({
+        "stream": "btcusdt@depth20@100ms",
+        "data": {"lastUpdateId": 1, "bids": [["99.5", "3"]], "asks": [["100.5", "2"]]}
+    }))
+    
+    book = exchange.book("BTCUSDT")
+    assert book.from_depth and book.bids.best == 99.5 and book.asks.best == 100.5
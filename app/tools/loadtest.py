@@ -0,0 +1,120 @@
+import argparse
+import asyncio
+import time
+import numpy as np
+from app.services.database import create_repository
+from app.services.trading import StrategyRegistry
+from app.services.websocket import BinanceWebsocket
+from app.tools.replay import EVENT_TIME, ReplayServer, fan_out, frame_symbols, load_frames, synthetic_frames
+
+class NullDatabase:
+    # Drops every write, for measuring the pipeline without MongoDB
+    async def save_tick(self, tick):
+        pass
+
+    async def get_recent_ticks(self, symbol: str, limit: int = 200):
+        return []
+
+    async def save_trading_signal(self, signal):
+        pass
+
+    async def save_order(self, order):
+        pass
+
+    async def save_position(self, position):
+        pass
+
+    async def update_position(self, symbol: str, update_data: dict, strategy: str = None):
+        pass
+
+async def run_load_test(frames, database, speed: float = 0, disconnect_every: int = None,
+                        max_buffer: int = None, slow_ms: float = 0, idle_timeout: float = 5.0):
+    symbols = frame_symbols(frames)
+    server = ReplayServer(frames, speed, disconnect_every=disconnect_every, max_buffer=max_buffer)
+    server.start_in_thread()
+
+    ws = BinanceWebsocket(database, symbols, StrategyRegistry(database))
+    ws.ws_url = f"{server.url}/stream"
+    latencies = []
+    handle = ws.dispatcher.handler
+
+    async def timed_handler(frame):
+        if slow_ms:
+            await asyncio.sleep(slow_ms / 1000)
+        await handle(frame)
+        # The server stamps E with its send time
+        sent_ms = float(EVENT_TIME.search(frame).group()[4:])
+        latencies.append(time.time() - sent_ms / 1000)
+
+    ws.dispatcher.handler = timed_handler
+    start = time.perf_counter()
+    task = asyncio.create_task(ws.start())
+    try:
+        handled, last_progress = 0, time.perf_counter()
+        while not (server.finished.is_set() and len(latencies) >= server.sent):
+            await asyncio.sleep(0.05)
+            if len(latencies) != handled:
+                handled, last_progress = len(latencies), time.perf_counter()
+            elif time.perf_counter() - last_progress > idle_timeout:
+                break
+        elapsed = time.perf_counter() - start
+    finally:
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        await ws.dispatcher.stop(drain=False)
+        server.stop_thread()
+    # A frame that failed in the handler still counts as handled, so any
+    # error invalidates the numbers
+    if ws.errors:
+        raise RuntimeError(f"{ws.errors} frames failed in the handler")
+
+    lat = np.array(latencies) * 1000
+    return {
+        "frames": len(frames),
+        "symbols": len(symbols),
+        "sent": server.sent,
+        "handled": len(latencies),
+        "dropped": len(frames) - len(latencies),
+        "dropped_by_server": server.dropped,
+        "reconnects": max(server.connections - 1, 0),
+        "elapsed_seconds": elapsed,
+        "throughput_per_second": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_latency_ms": float(np.percentile(lat, 50)) if len(lat) else None,
+        "p99_latency_ms": float(np.percentile(lat, 99)) if len(lat) else None,
+    }
+
+async def _run(args, frames):
+    if args.storage == "none":
+        return await run_load_test(frames, NullDatabase(), args.speed, args.disconnect_every, args.max_buffer, args.slow_ms)
+    database = create_repository(args.storage)
+    await database.connect_to_database()
+    database.start_background_tasks()
+    try:
+        return await run_load_test(frames, database, args.speed, args.disconnect_every, args.max_buffer, args.slow_ms)
+    finally:
+        await database.stop_background_tasks()
+        await database.close_database_connection()
+
+def main():
+    parser = argparse.ArgumentParser(description="Drive the ingest and strategy pipeline against a local replay server")
+    parser.add_argument("--input", help="Recording from app.tools.recorder; synthetic frames when omitted")
+    parser.add_argument("--frames", type=int, default=10000, help="Synthetic frame count")
+    parser.add_argument("--rate", type=float, default=1000.0, help="Synthetic frames per second at speed 1")
+    parser.add_argument("--symbols", type=int, default=10, help="Replay each frame under this many symbols")
+    parser.add_argument("--speed", type=float, default=0, help="1 real time, N times faster, 0 max speed")
+    parser.add_argument("--disconnect-every", type=int, default=None, help="Server closes the connection after this many frames")
+    parser.add_argument("--max-buffer", type=int, default=None, help="Server drops frames above this many buffered bytes")
+    parser.add_argument("--slow-ms", type=float, default=0, help="Extra delay per frame to simulate a slow consumer")
+    parser.add_argument("--storage", choices=["none", "memory", "sqlite", "mongo"], default="none",
+                        help="Storage backend; none discards writes")
+    args = parser.parse_args()
+
+    if args.input:
+        frames = fan_out(load_frames(args.input), args.symbols)
+    else:
+        frames = synthetic_frames([f"SYM{n:04d}USDT" for n in range(args.symbols)], args.frames, args.rate)
+    for key, value in asyncio.run(_run(args, frames)).items():
+        print(f"{key}: {value}")
+
+if __name__ == "__main__":
+    main()
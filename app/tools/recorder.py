@@ -0,0 +1,54 @@
+import argparse
+import asyncio
+import gzip
+import ssl
+import time
+import websockets
+from app.core.config import settings
+from app.services.websocket import combined_stream_url
+
+# Recordings are gzipped text, one frame per line: "<receive time ms>\t<raw frame>"
+
+def write_recording(path: str, frames):
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        for received_ms, frame in frames:
+            f.write(f"{received_ms}\t{frame}\n")
+
+def read_recording(path: str):
+    frames = []
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            received_ms, frame = line.rstrip("\n").split("\t", 1)
+            frames.append((int(received_ms), frame))
+    return frames
+
+async def record(path: str, symbols, duration: float = None, count: int = None):
+    # Raw frames are written as received, before any decoding
+    url = combined_stream_url(symbols)
+    recorded = 0
+    deadline = time.monotonic() + duration if duration else None
+    async with websockets.connect(url, ssl=ssl.create_default_context()) as websocket:
+        with gzip.open(path, "wt", encoding="utf-8") as f:
+            while (count is None or recorded < count) and (deadline is None or time.monotonic() < deadline):
+                timeout = deadline - time.monotonic() if deadline else None
+                try:
+                    frame = await asyncio.wait_for(websocket.recv(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                f.write(f"{int(time.time() * 1000)}\t{frame}\n")
+                recorded += 1
+    return recorded
+
+def main():
+    parser = argparse.ArgumentParser(description="Record raw Binance kline frames to a gzipped file")
+    parser.add_argument("--symbols", default=",".join(settings.TRADING_PAIRS), help="Comma separated symbols")
+    parser.add_argument("--duration", type=float, default=60.0, help="Seconds to record")
+    parser.add_argument("--count", type=int, default=None, help="Stop after this many frames")
+    parser.add_argument("--output", required=True)
+    args = parser.parse_args()
+
+    recorded = asyncio.run(record(args.output, args.symbols.split(","), args.duration, args.count))
+    print(f"Recorded {recorded} frames to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+import argparse
+import asyncio
+import json
+import random
+import re
+import threading
+import time
+import websockets
+from app.core.config import settings
+from app.services.websocket import stream_name
+from app.tools.recorder import read_recording
+
+EVENT_TIME = re.compile(r'"E":\d+(?:\.\d+)?')
+
+def load_frames(path: str):
+    # (offset in seconds from the first frame, raw frame)
+    recording = read_recording(path)
+    if not recording:
+        return []
+    first = recording[0][0]
+    return [((received_ms - first) / 1000, frame) for received_ms, frame in recording]
+
+def synthetic_frames(symbols, count: int, rate: float = 1000.0, start_price: float = 50000.0):
+    # Random-walk kline frames, round-robin across symbols, `rate` frames per second
+    prices = {symbol: start_price for symbol in symbols}
+    open_time = int(time.time()) * 1000
+    frames = []
+    for i in range(count):
+        symbol = symbols[i % len(symbols)]
+        prices[symbol] = price = max(prices[symbol] * (1 + random.gauss(0, 0.0005)), 0.01)
+        kline_start = open_time + (i // len(symbols)) * 1000
+        frames.append((i / rate, json.dumps({
+            "stream": stream_name(symbol),
+            "data": {
+                "e": "kline", "E": kline_start + 999, "s": symbol,
+                "k": {
+                    "t": kline_start, "T": kline_start + 999, "s": symbol, "i": settings.KLINE_INTERVAL,
+                    "o": f"{price:.2f}", "c": f"{price:.2f}", "h": f"{price:.2f}", "l": f"{price:.2f}",
+                    "v": "1.0", "n": 1, "x": True
+                }
+            }
+        }, separators=(",", ":"))))
+    return frames
+
+def fan_out(frames, copies: int):
+    # Replays each frame under `copies` renamed symbols (BTCUSDT -> BTCUSDT0001, ...)
+    if copies <= 1:
+        return frames
+    fanned = []
+    for offset, frame in frames:
+        message = json.loads(frame)
+        data = message.get("data", message)
+        symbol = data["s"]
+        for n in range(copies):
+            renamed = f"{symbol}{n:04d}"
+            data["s"] = data["k"]["s"] = renamed
+            if "stream" in message:
+                message["stream"] = stream_name(renamed)
+            fanned.append((offset, json.dumps(message, separators=(",", ":"))))
+    return fanned
+
+def frame_symbols(frames):
+    symbols = []
+    for _, frame in frames:
+        message = json.loads(frame)
+        symbol = message.get("data", message)["s"]
+        if symbol not in symbols:
+            symbols.append(symbol)
+    return symbols
+
+class ReplayServer:
+    # Serves frames to every client from one shared cursor, so a client that
+    # reconnects resumes where the previous connection stopped. Each frame's
+    # event time is restamped when sent so end-to-end latency can be measured.
+    #
+    # speed: 1 is real time, N is N times faster, 0 sends as fast as possible.
+    # disconnect_every: close the connection after this many frames.
+    # max_buffer: drop frames instead of sending once more than this many
+    # bytes are waiting for a slow client.
+    def __init__(self, frames, speed: float = 1.0, host: str = "127.0.0.1", port: int = 0,
+                 disconnect_every: int = None, max_buffer: int = None):
+        self.frames = frames
+        self.speed = speed
+        self.host = host
+        self.port = port
+        self.disconnect_every = disconnect_every
+        self.max_buffer = max_buffer
+        self.cursor = 0
+        self.sent = 0
+        self.dropped = 0
+        self.connections = 0
+        self.finished = threading.Event()
+        self._server = None
+        self._loop = None
+        self._thread = None
+
+    @property
+    def url(self):
+        return f"ws://{self.host}:{self.port}"
+
+    async def start(self):
+        self._server = await websockets.serve(self._handle, self.host, self.port, compression=None)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    def start_in_thread(self):
+        # Keeps the server off the event loop under test
+        ready = threading.Event()
+        self._loop = asyncio.new_event_loop()
+
+        def run():
+            asyncio.set_event_loop(self._loop)
+            self._loop.run_until_complete(self.start())
+            ready.set()
+            self._loop.run_forever()
+
+        self._thread = threading.Thread(target=run, daemon=True)
+        self._thread.start()
+        ready.wait()
+
+    def stop_thread(self):
+        if self._thread:
+            asyncio.run_coroutine_threadsafe(self.stop(), self._loop).result()
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop.close()
+            self._thread = None
+
+    async def _handle(self, websocket):
+        self.connections += 1
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        base = self.frames[self.cursor][0] if self.cursor < len(self.frames) else 0.0
+        sent_here = 0
+        while self.cursor < len(self.frames):
+            offset, frame = self.frames[self.cursor]
+            if self.speed:
+                delay = (offset - base) / self.speed - (loop.time() - started)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            self.cursor += 1
+            if self.max_buffer is not None and websocket.transport.get_write_buffer_size() > self.max_buffer:
+                self.dropped += 1
+                await asyncio.sleep(0)
+                continue
+            frame = EVENT_TIME.sub(f'"E":{time.time() * 1000:.3f}', frame, count=1)
+            try:
+                await websocket.send(frame)
+            except websockets.ConnectionClosed:
+                self.dropped += 1
+                return
+            self.sent += 1
+            sent_here += 1
+            if self.disconnect_every and sent_here >= self.disconnect_every and self.cursor < len(self.frames):
+                await websocket.close(1012, "Replay disconnect")
+                return
+            if not self.speed:
+                await asyncio.sleep(0)
+        self.finished.set()
+        # Stay connected so the client doesn't reconnect in a loop
+        await websocket.wait_closed()
+
+async def serve_forever(server: ReplayServer):
+    await server.start()
+    print(f"Replaying {len(server.frames)} frames on {server.url}")
+    await asyncio.Future()
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded (or synthetic) kline frames over a local WebSocket")
+    parser.add_argument("--input", help="Recording from app.tools.recorder; synthetic frames when omitted")
+    parser.add_argument("--frames", type=int, default=100000, help="Synthetic frame count")
+    parser.add_argument("--rate", type=float, default=1000.0, help="Synthetic frames per second at speed 1")
+    parser.add_argument("--symbols", type=int, default=1, help="Replay each frame under this many symbols")
+    parser.add_argument("--speed", type=float, default=1.0, help="1 real time, N times faster, 0 max speed")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--disconnect-every", type=int, default=None)
+    parser.add_argument("--max-buffer", type=int, default=None, help="Drop frames above this many buffered bytes")
+    args = parser.parse_args()
+
+    if args.input:
+        frames = fan_out(load_frames(args.input), args.symbols)
+    else:
+        frames = synthetic_frames([f"SYM{n:04d}USDT" for n in range(args.symbols)], args.frames, args.rate)
+    server = ReplayServer(frames, args.speed, port=args.port,
+                          disconnect_every=args.disconnect_every, max_buffer=args.max_buffer)
+    asyncio.run(serve_forever(server))
+
+if __name__ == "__main__":
+    main()
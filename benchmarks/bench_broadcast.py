@@ -0,0 +1,40 @@
+"""Live stream fan-out: publish cost per tick as subscribers grow, and the
+cost of one JSON encoding vs one per subscriber.
+
+Run with: python -m benchmarks.bench_broadcast
+"""
+import asyncio
+import time
+from datetime import datetime, timezone
+from app.core.serialization import dumps
+from app.models.models import Tick
+from app.services.broadcast import Broadcaster
+
+TICKS = 2_000
+SYMBOLS = ["BTCUSDT", "ETHUSDT", "BNBUSDT", "SOLUSDT"]
+
+async def run(subscribers: int):
+    hub = Broadcaster()
+    # Half follow one symbol, half everything; nobody drains, so queues stay
+    # full and every publish exercises conflation
+    clients = [hub.subscribe(["tick"], [SYMBOLS[n % len(SYMBOLS)]] if n % 2 else None) for n in range(subscribers)]
+    ticks = [Tick(datetime.now(tz=timezone.utc), SYMBOLS[n % len(SYMBOLS)], 100.0 + n, 1.0) for n in range(TICKS)]
+    start = time.perf_counter()
+    for tick in ticks:
+        hub.publish_tick(tick)
+    shared = (time.perf_counter() - start) / TICKS
+    start = time.perf_counter()
+    for tick in ticks[:200]:
+        for _ in clients:
+            dumps({"topic": "tick", "symbol": tick.symbol, "data": tick.to_document()})
+    per_client = (time.perf_counter() - start) / 200
+    return shared, per_client
+
+def main():
+    print(f"{'subscribers':>12}{'publish us':>14}{'encode-per-client us':>24}")
+    for subscribers in (10, 100, 1_000, 5_000):
+        shared, per_client = asyncio.run(run(subscribers))
+        print(f"{subscribers:>12,}{shared * 1e6:>14,.1f}{per_client * 1e6:>24,.1f}")
+
+if __name__ == "__main__":
+    main()
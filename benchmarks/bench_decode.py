@@ -0,0 +1,46 @@
+"""Ingest decode throughput per JSON backend, with pydantic vs slotted ticks.
+
+Run with: python -m benchmarks.bench_decode
+"""
+import json
+import time
+from datetime import datetime, timezone
+from app.core.serialization import available_decoders
+from app.models.models import PriceData, Tick
+
+MESSAGES = 100_000
+
+FRAME = json.dumps({
+    "stream": "btcusdt@kline_1s",
+    "data": {
+        "e": "kline", "E": 1619999999999, "s": "BTCUSDT",
+        "k": {
+            "t": 1619999940000, "T": 1619999999999, "s": "BTCUSDT", "i": "1s",
+            "f": 100, "L": 200, "o": "50000.00", "c": "51000.00", "h": "51100.00",
+            "l": "49900.00", "v": "10.5", "n": 100, "x": False, "q": "525000.00",
+            "V": "5.2", "Q": "260000.00", "B": "0"
+        }
+    }
+}, separators=(",", ":"))
+
+def run(decode, build):
+    start = time.perf_counter()
+    for _ in range(MESSAGES):
+        data = decode(FRAME)["data"]
+        kline = data["k"]
+        build(data["s"], float(kline["c"]), float(kline["v"]))
+    return MESSAGES / (time.perf_counter() - start)
+
+def build_price_data(symbol, price, quantity):
+    PriceData(timestamp=datetime.now(tz=timezone.utc), symbol=symbol, price=price, quantity=quantity).model_dump()
+
+def build_tick(symbol, price, quantity):
+    Tick(datetime.now(tz=timezone.utc), symbol, price, quantity).to_document()
+
+def main():
+    print(f"{'decoder':<10}{'pydantic msg/s':>18}{'tick msg/s':>18}")
+    for backend, decode in available_decoders().items():
+        print(f"{backend:<10}{run(decode, build_price_data):>18,.0f}{run(decode, build_tick):>18,.0f}")
+
+if __name__ == "__main__":
+    main()
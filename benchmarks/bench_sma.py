@@ -0,0 +1,54 @@
+"""Per-tick SMA cost: pandas rebuild (old generate_signal path) vs the rolling engine.
+
+Run with: python -m benchmarks.bench_sma
+"""
+import asyncio
+import time
+from datetime import datetime, timezone, timedelta
+import numpy as np
+from app.core.config import settings
+from app.models.models import PriceData
+from app.services.indicators import SMACrossover
+from app.services.trading import TradingStrategy
+
+TICKS = 2_000
+
+def make_prices(n):
+    base_time = datetime.now(tz=timezone.utc)
+    values = 50000 + np.cumsum(np.random.default_rng(7).normal(0, 5, n))
+    return [
+        PriceData(timestamp=base_time + timedelta(seconds=i), symbol="BTCUSDT", price=float(v), quantity=1.0)
+        for i, v in enumerate(values)
+    ]
+
+async def bench_pandas(strategy, prices):
+    window = strategy.long_period
+    start = time.perf_counter()
+    for i in range(window, len(prices)):
+        recent = prices[i - window:i]
+        await strategy.calculate_sma(recent)
+        await strategy.calculate_sma(recent[:-1])
+    return (time.perf_counter() - start) / (len(prices) - window)
+
+def bench_engine(strategy, prices):
+    window = strategy.long_period
+    indicator = SMACrossover(strategy.short_period, strategy.long_period)
+    indicator.seed(p.price for p in prices[:window])
+    start = time.perf_counter()
+    for p in prices[window:]:
+        indicator.update(p.price)
+        indicator.crossover()
+    return (time.perf_counter() - start) / (len(prices) - window)
+
+def main():
+    strategy = TradingStrategy()
+    prices = make_prices(TICKS + settings.LONG_TERM_PERIOD)
+    pandas_tick = asyncio.run(bench_pandas(strategy, prices))
+    engine_tick = bench_engine(strategy, prices)
+    print(f"windows: short={strategy.short_period} long={strategy.long_period}, ticks={TICKS}")
+    print(f"pandas rebuild : {pandas_tick * 1e6:10.2f} us/tick")
+    print(f"rolling engine : {engine_tick * 1e6:10.2f} us/tick")
+    print(f"speedup        : {pandas_tick / engine_tick:10.1f}x")
+
+if __name__ == "__main__":
+    main()
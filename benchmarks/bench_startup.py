@@ -0,0 +1,46 @@
+"""Startup: how long `import app.main` takes in a fresh interpreter, and how
+long the lifespan takes until /ready would report ready, with in-memory
+storage, no backfill and an exchange socket that never connects.
+
+Run with: python -m benchmarks.bench_startup
+"""
+import os
+import statistics
+import subprocess
+import sys
+
+RUNS = 7
+
+READY = """
+import asyncio, time
+start = time.perf_counter()
+from app.main import app, lifespan
+from app.services.startup import startup
+async def main():
+    async with lifespan(app):
+        while not startup.ready:
+            await asyncio.sleep(0.001)
+        print("elapsed", time.perf_counter() - start)
+asyncio.run(main())
+"""
+
+def fresh(script: str, env: dict = None):
+    result = subprocess.run(
+        [sys.executable, "-c", script], capture_output=True, text=True, check=True,
+        env={**os.environ, **(env or {})}
+    )
+    # The app prints its own progress; the timing line is tagged
+    return next(float(line.split()[1]) for line in result.stdout.splitlines() if line.startswith("elapsed "))
+
+def main():
+    imports = [
+        fresh("import time; start = time.perf_counter(); import app.main; print('elapsed', time.perf_counter() - start)")
+        for _ in range(RUNS)
+    ]
+    print(f"import app.main: median {statistics.median(imports) * 1000:.0f} ms over {RUNS} runs")
+    env = {"STORAGE_BACKEND": "memory", "BACKFILL_ENABLED": "false", "BINANCE_WS_URL": "ws://127.0.0.1:9"}
+    ready = [fresh(READY, env) for _ in range(RUNS)]
+    print(f"import to ready: median {statistics.median(ready) * 1000:.0f} ms over {RUNS} runs")
+
+if __name__ == "__main__":
+    main()